@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import gc
+import io
+import tracemalloc
+
+from steno_summary import parse_dict as pd
+from steno_summary.brief_info import stroke_rows, write_grid
+
+""" Memory held by the parsed dictionary.
+
+The bytes held per entry are recorded in the ``extra_info`` of each benchmark, which is
+saved along with the timings, both once parsed and once the grid has been drawn.
+"""
+
+
+def bench_memory_per_entry(benchmark, dict_path, size):
+    # Build the tables of rows first, as these are shared by every entry
+    stroke_rows(0)
+
+    def load():
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            briefs = pd.read_dict(dict_path, processes=1)
+            gc.collect()
+            parsed = tracemalloc.get_traced_memory()[0] - start
+            write_grid(briefs, io.StringIO(), 120)
+            gc.collect()
+            rendered = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        return parsed, rendered
+
+    parsed, rendered = benchmark.pedantic(load, rounds=1, iterations=1)
+    benchmark.extra_info["bytes_per_entry"] = parsed / size
+    benchmark.extra_info["bytes_per_entry_rendered"] = rendered / size
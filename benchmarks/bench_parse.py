@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import os
+
+from steno_summary import letters
+from steno_summary import parse_dict as pd
+from steno_summary.brief_info import Brief, clear_parse_cache
+
+""" Parsing the shorthand keys and reading and writing the dictionary.
+
+The parsed keys are cached, see ``brief_info.parse_keys``, so the parsing benchmarks
+clear the cache before each round. The ``_warm`` variants time the later reads, with
+the cache filled by the earlier rounds.
+"""
+
+# Rounds of the benchmarks that clear the parse cache beforehand
+cold_rounds = 5
+
+
+def bench_split_on_capital(benchmark, briefs):
+    keys = [b.keys_full for b in briefs]
+    benchmark(lambda: [letters.split_on_capital(k) for k in keys])
+
+
+def bench_brief_init(benchmark, briefs):
+    entries = [(b.name, b.keys_full, b.tags) for b in briefs]
+    benchmark.pedantic(
+        lambda: [Brief(name, keys, tags=tags) for name, keys, tags in entries],
+        setup=clear_parse_cache,
+        rounds=cold_rounds,
+    )
+
+
+def bench_brief_init_warm(benchmark, briefs):
+    entries = [(b.name, b.keys_full, b.tags) for b in briefs]
+    benchmark(lambda: [Brief(name, keys, tags=tags) for name, keys, tags in entries])
+
+
+def bench_read_dict(benchmark, dict_path):
+    benchmark.pedantic(
+        pd.read_dict,
+        (dict_path,),
+        {"processes": 1},
+        setup=clear_parse_cache,
+        rounds=cold_rounds,
+    )
+
+
+def bench_read_dict_warm(benchmark, dict_path):
+    benchmark(pd.read_dict, dict_path, processes=1)
+
+
+def bench_read_dict_parallel(benchmark, dict_path):
+    # The workers are forked, so they would otherwise share the cache of this process
+    benchmark.pedantic(
+        pd.read_dict,
+        (dict_path,),
+        {"processes": max(2, os.cpu_count() or 1)},
+        setup=clear_parse_cache,
+        rounds=cold_rounds,
+    )
+
+
+def bench_save_dict_to_file(benchmark, briefs, tmp_path):
+    save_path = tmp_path / "saved_dict.tsv"
+    save_path.touch()
+    benchmark(pd.save_dict_to_file, briefs, save_path)
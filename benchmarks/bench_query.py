@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+import pytest
+
+from steno_summary import compiled_dict as cd
+from steno_summary import daemon
+
+""" Answering the manager queries from the compiled dictionary. """
+
+
+@pytest.fixture(scope="session")
+def compiled(dict_path):
+    return cd.load_compiled(dict_path)
+
+
+def bench_compile_dict(benchmark, dict_path, tmp_path):
+    benchmark(cd.compile_dict, dict_path, tmp_path / "bench.compiled")
+
+
+def bench_load_compiled(benchmark, compiled, dict_path):
+    # The session fixture has already compiled the dictionary, so it is only opened
+    benchmark(cd.load_compiled, dict_path)
+
+
+def bench_contains(benchmark, compiled):
+    benchmark(daemon.run_query, compiled, "cont", ["en"])
+
+
+def bench_starting_with(benchmark, compiled):
+    benchmark(daemon.run_query, compiled, "start", ["th"])
+
+
+def bench_matches_tag(benchmark, compiled):
+    benchmark(daemon.run_query, compiled, "tag", ["suffix | punctuation"])
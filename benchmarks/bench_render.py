@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+import io
+
+from steno_summary.brief_info import Brief, write_grid
+
+""" Drawing the grid of briefs. """
+
+grid_width = 120
+
+
+def bench_brief_grid(benchmark, briefs):
+    entries = [(b.name, b.keys_full) for b in briefs]
+
+    def render():
+        # The briefs are built as the grid is drawn, as they are by the commands
+        stream = io.StringIO()
+        write_grid((Brief(n, k) for n, k in entries), stream, grid_width)
+
+    benchmark(render)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+from pathlib import Path
+import os
+
+import pytest
+
+from steno_summary import generate
+from steno_summary import parse_dict as pd
+
+""" Shared fixtures for the benchmarks.
+
+Outline
+-------
+
+Each benchmark is run against dictionaries of every size in ``STENO_BENCH_SIZES``, a
+comma separated list of entry counts, by default 1k, 10k, 100k and 1M entries. The
+dictionaries are generated once per session, see ``generate``, with the same seed so
+that each run is given the same entries.
+
+Results are saved by ``pytest-benchmark`` under ``.benchmarks``, named by the commit, so
+a run may be compared with an earlier one using ``--benchmark-compare``.
+"""
+
+default_sizes = "1000,10000,100000,1000000"
+bench_sizes = [
+    int(s) for s in os.environ.get("STENO_BENCH_SIZES", default_sizes).split(",")
+]
+
+
+def pytest_generate_tests(metafunc):
+    """ Run each benchmark taking a ``size`` at every dictionary size. """
+    if "size" in metafunc.fixturenames:
+        metafunc.parametrize("size", bench_sizes, indirect=True, ids=str)
+
+
+@pytest.fixture(scope="session")
+def size(request) -> int:
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def dict_path(size, tmp_path_factory) -> Path:
+    """ Dictionary with ``size`` entries. """
+    path = tmp_path_factory.mktemp(f"dict_{size}") / "bench_dict.tsv"
+    with open(path, "w") as f:
+        generate.write_dict(size, f)
+    return path
+
+
+@pytest.fixture(scope="session")
+def briefs(dict_path):
+    """ Parsed entries of the dictionary. """
+    return pd.read_dict(dict_path)
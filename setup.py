@@ -3,4 +3,7 @@ from setuptools import setup
 setup(name='steno_summary',
       version=0.1,
       author='Carl Jones',
+      entry_points={
+          'console_scripts': ['steno-manager=steno_summary.cli:main'],
+      },
       )
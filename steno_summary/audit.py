@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+from typing import Dict, List, NamedTuple, Tuple
+
+from steno_summary import letters
+from steno_summary.compiled_dict import CompiledDict
+
+""" Find conflicts and ambiguities across the whole dictionary.
+
+Outline
+-------
+
+Every entry is hashed on the tuple of its stroke masks in a single pass, after which
+each problem is found from the groups of entries sharing strokes:
+
+    conflicts   a stroke that gives more than one word, Plover will only keep one
+    aliases     different shorthand keys that give the same stroke
+    prefixes    a multi-stroke entry that starts with the strokes of another entry, so
+                the shorter entry is output until the later strokes are written
+
+The prefixes of each entry are looked up in the same hash, so the audit takes time in
+proportion to the total number of strokes.
+"""
+
+Strokes = Tuple[int, ...]
+
+
+class StrokeGroup(NamedTuple):
+    """ Entries that share the same strokes. """
+
+    strokes: Strokes
+    ids: List[int]
+
+
+class PrefixCollision(NamedTuple):
+    """ Entries whose strokes start the strokes of a longer entry. """
+
+    prefix: Strokes
+    ids: List[int]
+    longer: int
+
+
+class AuditReport(NamedTuple):
+    """ Problems found in the dictionary, see the module notes. """
+
+    conflicts: List[StrokeGroup]
+    aliases: List[StrokeGroup]
+    prefixes: List[PrefixCollision]
+
+
+def audit(compiled: CompiledDict) -> AuditReport:
+    """ Find the conflicts, aliases and prefix collisions of the dictionary. """
+    groups: Dict[Strokes, List[int]] = {}
+    for i in compiled.ids():
+        groups.setdefault(compiled.strokes(i), []).append(i)
+
+    conflicts = []
+    aliases = []
+    prefixes = []
+    for strokes, ids in groups.items():
+        if len({compiled.name(i) for i in ids}) > 1:
+            conflicts.append(StrokeGroup(strokes, ids))
+        if len({compiled.keys(i) for i in ids}) > 1:
+            aliases.append(StrokeGroup(strokes, ids))
+        for length in range(1, len(strokes)):
+            shorter = groups.get(strokes[:length])
+            if shorter is not None:
+                prefixes.extend(
+                    PrefixCollision(strokes[:length], shorter, i) for i in ids
+                )
+
+    prefixes.sort(key=lambda p: compiled.sort_key(p.longer))
+    return AuditReport(conflicts, aliases, prefixes)
+
+
+def format_strokes(strokes: Strokes) -> str:
+    """ The strokes in steno notation. """
+    return "/".join(letters.stroke_to_steno(s) for s in strokes)
+
+
+def format_report(compiled: CompiledDict, report: AuditReport) -> List[str]:
+    """ Lines describing each problem in the report. """
+    lines = [f"Stroke conflicts ({len(report.conflicts)})"]
+    for group in report.conflicts:
+        names = ", ".join(compiled.name(i) for i in group.ids)
+        lines.append(f"  {format_strokes(group.strokes):<20} {names}")
+
+    lines.append(f"Shorthand aliases ({len(report.aliases)})")
+    for group in report.aliases:
+        names = ", ".join(f"{compiled.name(i)} ({compiled.keys(i)})" for i in group.ids)
+        lines.append(f"  {format_strokes(group.strokes):<20} {names}")
+
+    lines.append(f"Prefix collisions ({len(report.prefixes)})")
+    for collision in report.prefixes:
+        longer = compiled.strokes(collision.longer)
+        names = ", ".join(compiled.name(i) for i in collision.ids)
+        lines.append(
+            f"  {format_strokes(longer):<20} {compiled.name(collision.longer)}"
+            f" starts with {format_strokes(collision.prefix)} ({names})"
+        )
+    return lines
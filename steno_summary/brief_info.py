@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
-from typing import List, Optional, Set
-from steno_summary import letters
-from functools import cached_property
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, TextIO
+from typing import Tuple, Union
+from steno_summary import letters, profiling
+from steno_summary.profiling import stage
+from functools import lru_cache
 import shutil
+import sys
 
 """ The Brief object holds and displays the keystrokes for a brief.
 
@@ -14,7 +17,7 @@ allow for searching and filtering. We have made a particular choice to record a
 shorthand notation with the brief, for instance, the key for "family" is stroked
 as TPAEPL however the breif can be shorted handed to FAM
 
-The object has two stores, one for each hand, first we attempt to place the
+The keys are stored as a single bit mask (see ``letters``), first we attempt to place the
 letter on the left hand side before moving onto the right. Once we have placed
 something in the right hand column we disable the left hand store in order to
 emulate the steno order.
@@ -26,15 +29,70 @@ TODO: Steno order: This doesn't really respect the steno order too well, we
       should address this better. Mostly this effects the cannonical output and
       occassionally requires an additional "-" in the brief description. Might
       be enough to sort the hands separately?
+
+Parse Cache
+-----------
+
+Many briefs share the same shorthand, or the same stroke within longer shorthand, so
+the key masks given by ``parse_keys`` are held in an LRU cache of ``parse_cache_size``
+entries for both the whole of the keys and each "/" separated stroke. The hit rates are
+given by ``parse_cache_info`` and are included when profiling a command.
 """
 
-letter_dict = letters.__dict__
+letter_dict = letters.chunk_table
+# Entries held in each of the caches of parsed keys
+parse_cache_size = 2 ** 16
+
+# Rows of the block for each hand, with the keys numbered by their position in steno
+# order. The star of the right hand is never drawn.
+left_rows = ("{k0} {k1} {k3} {k5} {k9}", "{k0} {k2} {k4} {k6} {k9}", "    {k7} {k8}  ")
+right_rows = (
+    "  {k2} {k4} {k6} {k8} {k10}",
+    "  {k3} {k5} {k7} {k9} {k11}",
+    "{k0} {k1}      ",
+)
+
 
-left_hand = frozenset(["S", "T", "K", "P", "W", "H", "R", "A", "O"])
-right_hand = frozenset(["E", "U", "F", "R", "P", "B", "L", "G", "T", "S", "D", "Z"])
+class _StrokeKeys:
+    """ Keys of the first stroke, given by the ``stroke`` mask. """
 
+    __slots__ = ()
+    stroke: int
 
-class Brief:
+    @property
+    def left_letters(self) -> Set[str]:
+        """ Letters that are used on the left hand side. """
+        return letters.mask_to_keys(self.stroke, letters.left_key_masks)
+
+    @property
+    def right_letters(self) -> Set[str]:
+        """ Letters that are used on the right hand side. """
+        return letters.mask_to_keys(self.stroke, letters.right_key_masks)
+
+    @property
+    def starred(self) -> bool:
+        """ Whether the star key is used in the stroke. """
+        return bool(self.stroke & letters.star_mask)
+
+    @property
+    def remaining_left(self):
+        """" Letters that are not used on the left hand side. """
+        remaining = letters.left_hand_mask & ~self.stroke
+        return letters.mask_to_keys(remaining, letters.left_key_masks)
+
+    @property
+    def remaining_right(self):
+        """" Letters that are not used on the right hand side. """
+        remaining = letters.right_hand_mask & ~self.stroke
+        return letters.mask_to_keys(remaining, letters.right_key_masks)
+
+    @property
+    def sorted_keys(self):
+        """ The keys of the stroke in steno order. """
+        return letters.stroke_to_string(self.stroke)
+
+
+class Brief(_StrokeKeys):
     """Key stroke summary for a word.
 
     This allows us to not only display the briefs is a more visual format, but also store
@@ -59,73 +117,86 @@ class Brief:
     cases, "-" may be used to clarify. For instance, a chunk Z may be the single letter
     "-Z" or the shorthand "S*" on the left. We therefore give the right hand command as
     "-Z".
+
+    Storage
+    -------
+
+    The brief is immutable and only holds the name, the shorthand keys, a tuple of the
+    key masks of each stroke and the tags, which are interned so that entries with the
+    same tags share a single tuple. Everything else, including the block, is worked out
+    from these when needed. The placing of the keys is done by ``StrokeBuilder``.
     """
 
-    def __init__(self, name: str, keys: str, tags: Optional[List] = None):
-        self.name = name
-        self.left_valid = True
-        self.keys = keys
-        self.left_letters: Set[str] = set()
-        self.right_letters: Set[str] = set()
-        self.tags = tags if tags is not None else []
-        self.starred = False
-        self.next_ = None
-        self.keys_full = self.keys
-
-        letter_list = letters.split_on_capital(keys)
-        for num, l in enumerate(letter_list):
-            if l.lower() in letter_dict:
-                steno_key = letter_dict[l.lower()]
-                self._parse_key_stroke(steno_key)
-            elif l in ["-", "*"]:
-                self._parse_key_stroke(l)
-            elif l == "/":
-                formatted_keys = "".join(letter_list[num + 1 :])
-                self.keys = "".join(letter_list[:num])
-                self.next_ = Brief("", formatted_keys)
-                break
-            else:
-                raise ValueError(f"Cannot parse letter {l} is it in letter_dict?")
-
-        # Flatten the next_ items into array
-        self.next_items = []
-        next_item = self.next_
-        while next_item is not None:
-            self.next_items.append(next_item)
-            next_item = next_item.next_
+    __slots__ = ("name", "keys_full", "strokes", "tags")
+    name: str
+    keys_full: str
+    strokes: Tuple[int, ...]
+    tags: Tuple[str, ...]
+
+    def __init__(self, name: str, keys: str, tags: Optional[Iterable[str]] = None):
+        _set_fields(self, name, keys, parse_keys(keys), tags)
+
+    @classmethod
+    def from_strokes(
+        cls,
+        name: str,
+        keys: str,
+        strokes: Sequence[int],
+        tags: Optional[Iterable[str]] = None,
+    ) -> "Brief":
+        """Build the brief from the key masks of its strokes, without parsing the keys.
+
+        The masks must be those given by parsing the keys, see ``parse_dict.read_dict``.
+        """
+        brief = cls.__new__(cls)
+        _set_fields(brief, name, keys, tuple(strokes), tags)
+        return brief
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Brief is immutable, cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Brief is immutable, cannot delete {name}")
+
+    def __reduce__(self):
+        fields = (self.name, self.keys_full, self.strokes, self.tags)
+        return (Brief.from_strokes, fields)
 
     def __str__(self):
         return f"Brief: {self.name}\tStroke: {self.keys}"
 
     def __lt__(self, other):
-        """ Sort on the name of Brief. """
+        """Sort on the name of Brief.
+
+        Briefs with the same name are equal, so sorting keeps them in the order given.
+        """
         if not isinstance(other, Brief):
             raise NotImplementedError("Sorting not supported for non-Brief objects")
-        # return self.name <= other.name
-        return self.name <= other.name
+        return self.name < other.name
 
     def __len__(self):
         """ Return the number of strokes required for the brief """
-        return len(self.next_items) + 1
+        return len(self.strokes)
 
     @property
-    def cannonical(self):
-        """ The key squence without abreviations. """
-        cannonical = self.sorted_keys
+    def keys(self) -> str:
+        """ The shorthand keys of the first stroke. """
+        return self.keys_full.partition("/")[0]
 
-        for next_ in self.next_items:
-            cannonical += "/" + next_.sorted_keys
-        return cannonical
+    @property
+    def stroke(self) -> int:
+        """ Key mask of the first stroke. """
+        return self.strokes[0]
 
     @property
-    def remaining_left(self):
-        """" Letters that are not used on the left hand side. """
-        return left_hand - set(self.left_letters)
+    def stroke_keys(self) -> Tuple[str, ...]:
+        """ The shorthand keys of each stroke. """
+        return tuple(self.keys_full.split("/"))
 
     @property
-    def remaining_right(self):
-        """" Letters that are not used on the right hand side. """
-        return right_hand - set(self.right_letters)
+    def cannonical(self):
+        """ The key squence without abreviations. """
+        return "/".join(letters.stroke_to_string(s) for s in self.strokes)
 
     @property
     def short(self):
@@ -138,14 +209,54 @@ class Brief:
         tags = ",".join(self.tags)
         return f"{self.name}\t{self.keys_full}\t{self.cannonical}\t{tags}\n"
 
-    def _parse_key_stroke(self, key: letters.Letter):
-        """ Attempt to add a letter to the letter store """
+    @property
+    def block(self):
+        """ Print out the array while showing the structure of the keyboard. """
+        return render_block(self.name, self.keys, self.stroke)
+
+    def print_block(self):
+        print(self.block)
+
+
+# Tuples of tags shared between the briefs
+_tag_tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _set_fields(
+    brief: Brief,
+    name: str,
+    keys: str,
+    strokes: Tuple[int, ...],
+    tags: Optional[Iterable[str]],
+):
+    """ Fill in the fields of the new, otherwise immutable, brief. """
+    tags = tuple(sys.intern(t) for t in tags) if tags else ()
+    object.__setattr__(brief, "name", name)
+    object.__setattr__(brief, "keys_full", keys)
+    object.__setattr__(brief, "strokes", strokes)
+    object.__setattr__(brief, "tags", _tag_tuples.setdefault(tags, tags))
+
+
+class StrokeBuilder(_StrokeKeys):
+    """Place the chunks of a stroke onto the keyboard in turn.
+
+    See ``Brief`` for the order in which the chunks are placed.
+    """
+
+    __slots__ = ("stroke", "left_valid")
+
+    def __init__(self):
+        self.stroke = 0
+        self.left_valid = True
+
+    def add(self, key: Union[letters.Letter, str]):
+        """ Attempt to add a letter, or "-" and "*", to the stroke. """
         # Dash is not key stroke but shows that we should move side
         if key == "-":
             self.left_valid = False
             return None
         if key == "*":
-            self.starred = True
+            self.stroke |= letters.star_mask
             return None
 
         # Parse the
@@ -167,123 +278,167 @@ class Brief:
         if not self.left_valid or not key.left:
             return False
 
-        # Remove command chars
-        starred = "*" in key.left
-        formatted_keys = set(filter(lambda l: l not in ["*", "-"], key.left))
-
-        if formatted_keys <= self.remaining_left:
-            # If we are unable to place it in the left we disable it (steno order)
-            self.left_letters |= formatted_keys
-            if starred:
-                self.starred = True
-            return True
-        return False
+        if key.left_mask & self.stroke:
+            return False
+        self.stroke |= key.left_mask
+        if key.left_starred:
+            self.stroke |= letters.star_mask
+        return True
 
     def fit_on_right(self, key) -> bool:
         """ Attempt to fit the key onto the right hand side of the keyboard. """
 
-        # Remove control chars
-        # TODO: Will have to deal with letters that have - in them
-
         # Deal with blank cases
         if not key.right:
             return False
 
-        # Remove command chars
-        starred = "*" in key.right
-        formatted_keys = set(filter(lambda l: l not in ["*", "-"], key.right))
+        if key.right_mask & self.stroke:
+            return False
+        # If we are able to place it on the right we disable the left (steno order)
+        self.left_valid = False
+        self.stroke |= key.right_mask
+        if key.right_starred:
+            self.stroke |= letters.star_mask
+        return True
 
-        if formatted_keys <= self.remaining_right:
-            # If we are unable to place it in the left we disable it (steno order)
-            self.left_valid = False
-            self.right_letters |= formatted_keys
-            if starred:
-                self.starred = True
-            return True
-        return False
 
-    @cached_property
-    def sorted_keys(self):
-        """ Sort the keys on the left hand side of the keyboard. """
-        left = "STKPWHRAO"
-        right = "EUFRPBLGTSDZ"
-
-        sorted_left = [k for k in left if k in self.left_letters]
-        sorted_right = [k for k in right if k in self.right_letters]
-
-        sorted_left = "".join(sorted_left)
-        sorted_right = "".join(sorted_right)
-
-        # if  RPST in right but not left add dash
-        div = ""
-        if sorted_right == "S" and sorted_left == "":
-            div = "-"
-        elif sorted_right.startswith("T") and self.ends_with_list(sorted_left, "S"):
-            div = "-"
-        elif sorted_right.startswith("P") and self.ends_with_list(sorted_left, "STK"):
-            div = "-"
-        elif sorted_right.startswith("R") and self.ends_with_list(
-            sorted_left, "STKPWH"
-        ):
-            div = "-"
-
-        if self.starred:
-            div = "*"
-
-        return sorted_left + div + sorted_right
-
-    @staticmethod
-    def ends_with_list(string: str, letters: str):
-        """ Test if the string ends with one of the provided letters. """
-        ends = [l for l in letters if string.endswith(l)]
-        return True if ends else False
-
-    @cached_property
-    def block(self):
-        """ Print out the array while showing the structure of the keyboard. """
-        # empty = "□"
-        # full = "■"
-        # null = "▢"
-        empty = "▧"
-        null = " "
-
-        left_fmt = {"*": "*" if self.starred else null}
-        for key in left_hand:
-            left_fmt[key] = key if key in self.left_letters else empty
-
-        right_fmt = {"*": null}
-        for key in right_hand:
-            right_fmt[key] = key if key in self.right_letters else empty
-
-        left_top = " ".join(left_fmt[k] for k in "STPH*")
-        left_mid = " ".join(left_fmt[k] for k in "SKWR*")
-        left_bot = f"{' '*4}{left_fmt['A']} {left_fmt['O']}  "
-
-        right_top = " ".join(right_fmt[k] for k in "*FPLTD")
-        right_mid = " ".join(right_fmt[k] for k in "*RBGSZ")
-        right_bot = f"{right_fmt['E']} {right_fmt['U']}      "
-
-        merge_block = (
-            f"{left_top} {right_top}\n{left_mid} {right_mid}\n{left_bot}   {right_bot}"
-        )
-        block = f"{self.name:^21}\n" + f"{self.keys:^21}\n" + merge_block
-        return block
+@lru_cache(maxsize=parse_cache_size)
+def parse_keys(keys: str) -> Tuple[int, ...]:
+    """The key masks of each "/" separated stroke of the shorthand keys.
 
-    def print_block(self):
-        print(self.block)
+    The masks are cached for both the whole of the keys and each stroke, see the module
+    notes, so the returned tuple is shared between briefs. Only the last stroke may be
+    empty, as in "A/".
+    """
+    strokes = keys.split("/")
+    if not all(strokes[:-1]):
+        raise ValueError(f"Empty stroke in keys - {keys}")
+    return tuple(_parse_stroke(s) for s in strokes)
+
+
+@lru_cache(maxsize=parse_cache_size)
+def _parse_stroke(keys: str) -> int:
+    """ The key mask of the shorthand keys of a single stroke. """
+    builder = StrokeBuilder()
+    for l in letters.split_on_capital(keys):
+        if l.lower() in letter_dict:
+            builder.add(letter_dict[l.lower()])
+        elif l in ["-", "*"]:
+            builder.add(l)
+        else:
+            raise ValueError(f"Cannot parse letter {l} is it in letter_dict?")
+    return builder.stroke
+
+
+def parse_cache_info() -> Dict[str, float]:
+    """ Hits, misses and the hit rate of the caches of the keys and of each stroke. """
+    info = {}
+    for name, cache in [("keys", parse_keys), ("stroke", _parse_stroke)]:
+        hits, misses, _, size = cache.cache_info()
+        info[f"{name}_hits"] = hits
+        info[f"{name}_misses"] = misses
+        info[f"{name}_size"] = size
+        info[f"{name}_hit_rate"] = round(hits / max(hits + misses, 1), 3)
+    return info
+
+
+def clear_parse_cache():
+    """ Empty the caches of the keys and of each stroke, see ``parse_keys``. """
+    parse_keys.cache_clear()
+    _parse_stroke.cache_clear()
 
 
-def brief_grid(briefs: List[Brief], width: Optional[int] = None):
+profiling.add_stats("parse_cache", parse_cache_info)
+
+
+def render_block(name: str, keys: str, stroke: int) -> str:
+    """ Draw the stroke on the keyboard, beneath the name and shorthand keys. """
+    top, mid, bot = stroke_rows(stroke)
+    return f"{name:^21}\n{keys:^21}\n{top}\n{mid}\n{bot}"
+
+
+def stroke_rows(stroke: int) -> Tuple[str, str, str]:
+    """The three rows of the keyboard for the stroke.
+
+    Each hand is looked up in a table of prebuilt rows, indexed by the bits of the
+    stroke for that hand. The star belongs with the left hand.
+    """
+    left_top, left_mid, left_bot = _left_rows()[stroke >> 1 & 0x3FF]
+    right_top, right_mid, right_bot = _right_rows()[stroke >> 11 & 0xFFF]
+    return (
+        f"{left_top} {right_top}",
+        f"{left_mid} {right_mid}",
+        f"{left_bot}   {right_bot}",
+    )
+
+
+@lru_cache(maxsize=None)
+def _left_rows() -> Tuple[Tuple[str, str, str], ...]:
+    """ Rows of the left hand for each combination of the keys "STKPWHRAO*". """
+    return tuple(_hand_rows(bits, "STKPWHRAO*", left_rows) for bits in range(1 << 10))
+
+
+@lru_cache(maxsize=None)
+def _right_rows() -> Tuple[Tuple[str, str, str], ...]:
+    """ Rows of the right hand for each combination of the keys "EUFRPBLGTSDZ". """
+    return tuple(
+        _hand_rows(bits, "EUFRPBLGTSDZ", right_rows) for bits in range(1 << 12)
+    )
+
+
+def _hand_rows(bits: int, order: str, rows: Tuple[str, str, str]) -> Tuple[str, ...]:
+    """Fill in the row templates for one hand given the bits of the keys in ``order``.
+
+    In the templates each key is given by its position in the order, with unused keys
+    drawn as empty.
+    """
+    # empty = "□"
+    # full = "■"
+    # null = "▢"
+    empty = "▧"
+    null = " "
+
+    fmt = {}
+    for n, key in enumerate(order):
+        pressed = bits >> n & 1
+        if key == "*":
+            fmt[f"k{n}"] = key if pressed else null
+        else:
+            fmt[f"k{n}"] = key if pressed else empty
+    return tuple(row.format(**fmt) for row in rows)
+
+
+def brief_grid(briefs: Iterable[Brief], width: Optional[int] = None) -> str:
     """ Print the briefs in a grid """
+    return "\n".join(iter_grid(briefs, width))
+
+
+def write_grid(
+    briefs: Iterable[Brief],
+    stream: Optional[TextIO] = None,
+    width: Optional[int] = None,
+):
+    """Write the grid of briefs to the stream, by default ``stdout``.
+
+    Each row is written once it is complete, so only a single row of the grid is held in
+    memory at once.
+    """
+    stream = stream if stream is not None else sys.stdout
+    with stage("render"):
+        for row in iter_grid(briefs, width):
+            stream.write(row + "\n")
+
+
+def iter_grid(briefs: Iterable[Brief], width: Optional[int] = None) -> Iterator[str]:
+    """ Yield each row of the grid of briefs, as the lines of the row joined. """
     # Calculate the number of strokes we can fit per line
     grid_width = width if width is not None else _get_term_width()
     grid_gap = "  │  "
     block_len = 21 + len(grid_gap)
     blocks_per_line = grid_width // block_len
 
-    # We have to write the lines conncurrently
-    lines = ["" for i in range(6)]
-    row = ""
+    # We have to write the lines conncurrently, so collect the cells of each line
+    lines: List[List[str]] = [[] for i in range(6)]
     current_pos = 0
 
     for brief in briefs:
@@ -294,32 +449,31 @@ def brief_grid(briefs: List[Brief], width: Optional[int] = None):
             continue
         current_pos += stroke_len
         if current_pos > blocks_per_line:
-            row += "\n".join(lines)
-            row += "\n"
-            lines = ["" for i in lines]
+            yield "\n".join("".join(l) for l in lines)
+            lines = [[] for i in lines]
             current_pos = stroke_len
 
-        # Add the new block alongside the previous entry
-        _append_block(brief, lines, grid_gap)
-        for next_word in brief.next_items:
-            _append_block(next_word, lines, grid_gap)
+        # Add the blocks of each stroke alongside the previous entry, only the first
+        # stroke is named
+        name = brief.name
+        for n, (keys, stroke) in enumerate(zip(brief.stroke_keys, brief.strokes)):
+            boundary = grid_gap if n == stroke_len - 1 else "     "
+            block = render_block(name, keys, stroke)
+            _append_block(block.split("\n"), lines, boundary)
+            name = ""
 
     # Process any remaning rows
     if lines[0]:
-        row += "\n".join(lines)
-
-    return row
+        yield "\n".join("".join(l) for l in lines)
 
 
-def _append_block(brief: Brief, lines: str, grid_gap: str):
+def _append_block(block_lines: List[str], lines: List[List[str]], boundary: str):
     """ Add the new entry in the cell to the left of the current entry. """
-    boundary = "     " if brief.next_items else grid_gap
-    strings = brief.block.split("\n")
-    for i in range(5):
-        lines[i] += strings[i] + boundary
+    for line, string in zip(lines, block_lines):
+        line.append(string + boundary)
 
     # Draw the row boundary
-    lines[5] += " " * 21 + boundary
+    lines[5].append(" " * 21 + boundary)
 
 
 def _get_term_width() -> int:
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+from typing import Dict, List, Optional, Tuple
+import sys
+
+from steno_summary import daemon, profiling
+from steno_summary.brief_info import write_grid
+from steno_summary.parse_dict import _line_to_brief
+from steno_summary.profiling import stage
+
+""" Entry point for the ``steno-manager`` command.
+
+Outline
+-------
+
+Most runs are a single lookup, so the time taken to start the interpreter and import
+the package is a large part of the wait. Queries that are given in full on the command
+line are answered here, importing only what is needed to send the query and print the
+grid. Anything else, such as the interactive prompts, ``--block`` or ``--help``, is
+handed to the full ``argh`` interface in ``manager``.
+
+The ``--profile`` option, see ``profiling``, is accepted by every command and is removed
+from the arguments before they are read.
+
+The options match those generated by ``argh`` for the commands in ``manager``.
+"""
+
+# Command name and aliases, mapped to the daemon query, the options it accepts and the
+# order of the query arguments
+fast_commands: Dict[str, Tuple[str, Dict[str, str], Tuple[str, ...]]] = {
+    "contains": ("cont", {"-s": "string", "--string": "string"}, ("string",)),
+    "starting-with": (
+        "start",
+        {"-s": "string", "--string": "string", "-l": "limit", "--limit": "limit"},
+        ("string", "limit"),
+    ),
+    "matches-tag": ("tag", {"-t": "string", "--tag": "string"}, ("string",)),
+    "lookup-stroke": ("stroke", {"-s": "string", "--stroke": "string"}, ("string",)),
+    "fuzzy": (
+        "fuzzy",
+        {
+            "-s": "string",
+            "--string": "string",
+            "-d": "distance",
+            "--distance": "distance",
+        },
+        ("string", "distance"),
+    ),
+    "misstroke": (
+        "near",
+        {
+            "-s": "string",
+            "--stroke": "string",
+            "-d": "distance",
+            "--distance": "distance",
+        },
+        ("string", "distance"),
+    ),
+    "keys": (
+        "keys",
+        {
+            "-u": "uses",
+            "--uses": "uses",
+            "-e": "excludes",
+            "--excludes": "excludes",
+            "-l": "left",
+            "--left": "left",
+            "-r": "right",
+            "--right": "right",
+        },
+        ("uses", "excludes", "left", "right"),
+    ),
+}
+fast_commands["cont"] = fast_commands["contains"]
+fast_commands["start"] = fast_commands["starting-with"]
+fast_commands["tag"] = fast_commands["matches-tag"]
+
+
+def main(argv: Optional[List[str]] = None):
+    """ Answer simple queries directly, otherwise dispatch to the manager. """
+    argv = sys.argv[1:] if argv is None else argv
+    argv, destination = profiling.options(argv)
+    with profiling.session(argv, destination):
+        request = parse_fast(argv)
+        if request is None:
+            with stage("import"):
+                from steno_summary import manager
+
+            manager.main(argv)
+            return
+
+        lines = daemon.lookup(*request)
+        with stage("parse"):
+            briefs = [_line_to_brief(l) for l in lines]
+        write_grid(briefs)
+
+
+def parse_fast(argv: List[str]) -> Optional[Tuple[str, ...]]:
+    """Read the arguments of a simple query, giving the daemon query and arguments.
+
+    ``None`` is returned if the arguments should be handled by the manager.
+    """
+    if not argv or argv[0] not in fast_commands:
+        return None
+    query, flags, fields = fast_commands[argv[0]]
+
+    values = {}
+    args = argv[1:]
+    while args:
+        flag, *args = args
+        if "=" in flag:
+            flag, value = flag.split("=", 1)
+        elif args and (args[0] == "-" or not args[0].startswith("-")):
+            value, *args = args
+        else:
+            # As with argh, a value starting with "-" must be given as "--uses=-PBG"
+            return None
+        if flag not in flags:
+            return None
+        values[flags[flag]] = value
+
+    if not any(values.values()) or ("string" in fields and not values.get("string")):
+        return None
+    if not all(values.get(f, "0").isdigit() for f in ("limit", "distance")):
+        return None
+    return (query,) + tuple(values.get(f, "") for f in fields)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from pathlib import Path
+
+import numpy as np
+
+from steno_summary.brief_info import Brief
+from steno_summary.compiled_dict import CompiledDict, load_compiled
+from steno_summary.index import fold
+
+""" Columnar store of the dictionary held in NumPy arrays.
+
+Outline
+-------
+
+Queries that look at every entry, such as analytics over the whole dictionary or
+filters on the keys that are used, are slow when each entry is a ``Brief``. Instead the
+fields used for filtering are held as columns:
+
+    strokes         uint32 key mask of every stroke, concatenated
+    stroke_offsets  start of the strokes of each entry, with ``n + 1`` entries
+    stroke_counts   number of strokes in each entry
+    key_union       all keys used over the strokes of each entry
+    names           utf8 encoded, case-folded, names concatenated with their offsets
+    tag_bits        bitset of the tags of each entry, 64 tags to a column
+
+Each filter gives a boolean array over the entries, so filters are combined with the
+usual ``&``, ``|`` and ``~`` operators. ``Brief``s are only built for the rows that are
+selected.
+
+When loaded from the compiled dictionary the strokes are read from the memory mapped
+file without copying, and only the names and tags are converted. The entries of the
+journal follow the compiled entries, as with the ids of ``CompiledDict``.
+"""
+
+Selection = Union[np.ndarray, Sequence[int]]
+
+
+class ColumnarDict:
+    """ Entries of the dictionary held as columns, see the module notes. """
+
+    def __init__(
+        self,
+        strokes: np.ndarray,
+        stroke_offsets: np.ndarray,
+        names: bytes,
+        name_offsets: np.ndarray,
+        tags: List[str],
+        tag_bits: np.ndarray,
+        brief: Callable[[int], Brief],
+    ):
+        self.strokes = strokes
+        self.stroke_offsets = stroke_offsets
+        self.stroke_counts = np.diff(stroke_offsets)
+        self.key_union = np.zeros(len(self.stroke_counts), dtype=np.uint32)
+        if len(self.key_union):
+            self.key_union = np.bitwise_or.reduceat(strokes, stroke_offsets[:-1])
+        self.names = np.frombuffer(names, dtype=np.uint8)
+        self.name_offsets = name_offsets
+        self.tags = tags
+        self.tag_bits = tag_bits
+        self._brief = brief
+
+    @classmethod
+    def from_compiled(cls, compiled: CompiledDict) -> "ColumnarDict":
+        """ Build the columns from the compiled dictionary. """
+        strokes = np.frombuffer(compiled.sections[b"STRO"], dtype=np.uint32)
+        stroke_offsets = np.frombuffer(compiled.sections[b"SOFF"], dtype=np.uint32)
+        names = bytes(compiled.sections[b"NAME"])
+        name_offsets = np.frombuffer(compiled.sections[b"NOFF"], dtype=np.uint32)
+        n_compiled = len(name_offsets) - 1
+        if names.isascii():
+            names = names.lower()
+        else:
+            compiled_names = (compiled.name(i) for i in range(n_compiled))
+            names, name_offsets = _folded_names(compiled_names)
+
+        tag_index = compiled.tag_index
+        postings = {t: tag_index.posting(t) for t in tag_index.tags}
+        journal = compiled.journal
+        if journal:
+            # The entries of the journal follow the compiled entries
+            columns = cls.from_briefs(journal.briefs)
+            strokes = np.concatenate([strokes, columns.strokes])
+            stroke_offsets = np.concatenate(
+                [stroke_offsets, columns.stroke_offsets[1:] + stroke_offsets[-1]]
+            )
+            names += columns.names.tobytes()
+            name_offsets = np.concatenate(
+                [name_offsets, columns.name_offsets[1:] + name_offsets[-1]]
+            )
+            for tag in journal.tag_index.tags:
+                posting = [n_compiled + j for j in journal.tag_index.posting(tag)]
+                postings[tag] = list(postings.get(tag, [])) + posting
+
+        tags = sorted(postings)
+        tag_bits = _tag_bits(len(compiled), [postings[t] for t in tags])
+        return cls(
+            strokes,
+            stroke_offsets,
+            names,
+            name_offsets,
+            tags,
+            tag_bits,
+            compiled.brief,
+        )
+
+    @classmethod
+    def from_briefs(cls, briefs: Sequence[Brief]) -> "ColumnarDict":
+        """ Build the columns from the parsed dictionary, see ``read_dict``. """
+        strokes = np.array([s for b in briefs for s in b.strokes], dtype=np.uint32)
+        stroke_offsets = np.zeros(len(briefs) + 1, dtype=np.uint32)
+        np.cumsum([len(b) for b in briefs], out=stroke_offsets[1:])
+        names, name_offsets = _folded_names(b.name for b in briefs)
+
+        postings: Dict[str, List[int]] = {}
+        for i, b in enumerate(briefs):
+            for tag in set(b.tags):
+                if tag:
+                    postings.setdefault(tag, []).append(i)
+        tags = sorted(postings)
+        tag_bits = _tag_bits(len(briefs), [postings[t] for t in tags])
+        return cls(
+            strokes,
+            stroke_offsets,
+            names,
+            name_offsets,
+            tags,
+            tag_bits,
+            briefs.__getitem__,
+        )
+
+    def __len__(self):
+        return len(self.stroke_counts)
+
+    def starting_with(self, prefix: str) -> np.ndarray:
+        """ Entries whose name starts with the prefix, ignoring case. """
+        prefix_bytes = np.frombuffer(fold(prefix).encode("utf8"), dtype=np.uint8)
+        starts = self.name_offsets[:-1].astype(np.int64)
+        lengths = np.diff(self.name_offsets)
+
+        selected = lengths >= len(prefix_bytes)
+        candidates = np.flatnonzero(selected)
+        for n, byte in enumerate(prefix_bytes):
+            matches = self.names[starts[candidates] + n] == byte
+            selected[candidates[~matches]] = False
+            candidates = candidates[matches]
+        return selected
+
+    def with_tag(self, tag: str) -> np.ndarray:
+        """ Entries that have the tag. """
+        if tag not in self.tags:
+            return np.zeros(len(self), dtype=bool)
+        n = self.tags.index(tag)
+        bit = np.uint64(1) << np.uint64(n % 64)
+        return (self.tag_bits[:, n // 64] & bit) != 0
+
+    def using_keys(self, required: int = 0, forbidden: int = 0) -> np.ndarray:
+        """Entries using all of the ``required`` keys and none of the ``forbidden``.
+
+        The keys are given as masks, see ``letters``, and are compared against the keys
+        of every stroke of the entry combined.
+        """
+        union = self.key_union
+        has_required = (union & np.uint32(required)) == required
+        has_forbidden = (union & np.uint32(forbidden)) != 0
+        return has_required & ~has_forbidden
+
+    def with_stroke_keys(
+        self, required: int = 0, forbidden: int = 0, fixed: int = 0, fixed_keys: int = 0
+    ) -> np.ndarray:
+        """Entries with a stroke matching the key pattern.
+
+        The stroke must use all of the ``required`` keys and none of the ``forbidden``,
+        while of the keys in ``fixed`` exactly the ``fixed_keys`` must be used. For
+        instance fixing the left hand to "TP" is given by the ``left_hand_mask`` and the
+        mask of "TP".
+        """
+        if not len(self):
+            return np.zeros(0, dtype=bool)
+        strokes = self.strokes
+        matches = (strokes & np.uint32(required)) == required
+        matches &= (strokes & np.uint32(forbidden)) == 0
+        matches &= (strokes & np.uint32(fixed)) == fixed_keys
+        starts = self.stroke_offsets[:-1].astype(np.int64)
+        return np.logical_or.reduceat(matches, starts)
+
+    def with_stroke_count(self, count: int) -> np.ndarray:
+        """ Entries made from the number of strokes. """
+        return self.stroke_counts == count
+
+    def ids(self, selected: np.ndarray) -> np.ndarray:
+        """ Ids of the selected entries, in dictionary order. """
+        return np.flatnonzero(selected)
+
+    def briefs(self, selected: Selection, limit: Optional[int] = None) -> List[Brief]:
+        """Build the ``Brief``s for the selection, either a boolean array or ids.
+
+        Only the first ``limit`` entries are built if a limit is given.
+        """
+        ids = np.asarray(selected)
+        if ids.dtype == bool:
+            ids = np.flatnonzero(ids)
+        return [self._brief(int(i)) for i in ids[:limit]]
+
+
+def load_columnar(dict_location: Optional[Path] = None) -> ColumnarDict:
+    """ Load the columns of the user dictionary, by way of the compiled dictionary. """
+    return ColumnarDict.from_compiled(load_compiled(dict_location))
+
+
+def _folded_names(names: Iterable[str]) -> Tuple[bytes, np.ndarray]:
+    """ The concatenated, folded and encoded names along with their offsets. """
+    encoded = [fold(name).encode("utf8") for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+def _tag_bits(n_entries: int, postings: Sequence[Sequence[int]]) -> np.ndarray:
+    """ Bitset of the tags of each entry, given the entries with each tag. """
+    tag_bits = np.zeros((n_entries, max(1, -(-len(postings) // 64))), dtype=np.uint64)
+    for n, posting in enumerate(postings):
+        bit = np.uint64(1) << np.uint64(n % 64)
+        tag_bits[np.asarray(posting, dtype=np.int64), n // 64] |= bit
+    return tag_bits
@@ -0,0 +1,704 @@
+#!/usr/bin/env python3
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Optional
+from typing import Sequence, Tuple
+from array import array
+from contextlib import ExitStack
+from functools import cached_property
+from pathlib import Path
+import bisect
+import fcntl
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+
+from steno_summary.brief_info import Brief
+from steno_summary import letters
+from steno_summary.index import BKTree, HammingIndex, PrefixIndex, StrokeIndex
+from steno_summary.index import TagIndex, TrigramIndex
+from steno_summary.index import bk_table, hamming_table, prefix_order, stroke_order
+from steno_summary.index import fold, tag_table, trigram_table
+from steno_summary.parse_dict import is_valid, journal_path, read_dict
+from steno_summary.parse_dict import _line_to_brief, _locked_journal, _validate_path
+from steno_summary.profiling import stage
+
+if TYPE_CHECKING:
+    from steno_summary.columnar import ColumnarDict
+
+""" Compiled, memory mapped form of the user dictionary.
+
+Outline
+-------
+
+Parsing the TSV dictionary requires every ``Brief`` to be built and sorted before we
+are able to answer a single query. Instead we compile the sorted dictionary once into a
+binary file next to the TSV and memory map it on later loads, so only the entries that
+are displayed are ever parsed.
+
+Layout
+------
+
+All integers are stored in native byte order, the file is a cache and is not intended
+to be shared between machines.
+
+    header      magic, version, number of sections and entries, the sha256 digest,
+                size and modification time of the source file
+    sections    table of (tag, offset, length) for each section
+    data        8 byte aligned sections
+
+Entries are stored in sorted order and refered to by their index. The variable length
+fields are given by a data section along with an offset table of ``n + 1`` entries, so
+the field for entry ``i`` is ``data[offsets[i]:offsets[i + 1]]``.
+
+    STRO/SOFF   stroke masks for each stroke, one uint32 per stroke
+    NAME/NOFF   utf8 encoded names
+    KEYS/KOFF   utf8 encoded shorthand keys
+    TAGS/TOFF   utf8 encoded, comma separated, tags
+    PREF        entry ids sorted by their case-folded name, see ``index.PrefixIndex``
+    TRIK/TRIO   sorted uint64 trigram keys and the offsets of their posting lists
+    TRIP        uint32 posting lists of entry ids, see ``index.TrigramIndex``
+    TGNM/TGNO   utf8 encoded, sorted, tag names
+    TGPO/TGPP   offsets of the posting lists for each tag and the posting lists
+    STRK        entry ids sorted by their stroke masks, see ``index.StrokeIndex``
+    HMSK        sorted distinct stroke masks, over every stroke of the entries
+    HMEO        offsets of the entries using each distinct stroke
+    HMEI/HMEP   ids of the entries using each stroke and the position of the stroke
+    HMC0/HMC1   distinct strokes ordered by each chunk, see ``index.HammingIndex``
+
+The compiled file is rebuilt whenever the digest of the source dictionary no longer
+matches.
+
+Journal
+-------
+
+Entries added to the journal (see ``parse_dict``) are left out of the compiled file, so
+that adding an entry does not rebuild it. Instead the journal is parsed when the
+dictionary is loaded and its entries are given the ids following the compiled entries.
+The journal only holds the entries added since it was last compacted, so its indexes
+are built in memory and each query merges the matching entries of both, in dictionary
+order. The compiled file is rebuilt once the journal is compacted into the dictionary.
+
+Fuzzy Index
+-----------
+
+The tree of the names by edit distance takes several times longer to build than the
+rest of the compiled file, so it is kept in a second file with the suffix
+``.fuzzy.compiled``, built on the first fuzzy search after each compile. This has the
+same layout, with the digest of the source to match it to the compiled file:
+
+    BKID/BKIO   entry ids of each node of the tree of names and their offsets
+    BKCN/BKCD   child nodes of each node and their edit distances, along with the
+    BKCO        offsets of the children of each node, see ``index.BKTree``
+"""
+
+magic = b"STENODIC"
+fuzzy_magic = b"STENOFZY"
+version = 8
+header_fmt = struct.Struct("=8sHHI32sQQ")
+section_fmt = struct.Struct("=4sQQ")
+
+
+class SourceInfo(NamedTuple):
+    """ Fingerprint of the dictionary that a compiled file was built from. """
+
+    digest: bytes
+    size: int
+    mtime_ns: int
+
+
+class Journal:
+    """Entries of the journal, searched alongside the compiled entries.
+
+    The indexes are built in memory on first use, see the module notes.
+    """
+
+    def __init__(
+        self, briefs: Sequence[Brief] = (), stat: Optional[Tuple[int, int]] = None
+    ):
+        self.briefs = sorted(briefs)
+        # Size and modification time of the journal file when read
+        self.stat = stat
+        self.names = [b.name for b in self.briefs]
+
+    def __len__(self):
+        return len(self.briefs)
+
+    @cached_property
+    def prefix_index(self) -> PrefixIndex:
+        """ Index of the names by prefix. """
+        return PrefixIndex.from_names(self.names)
+
+    @cached_property
+    def trigram_index(self) -> TrigramIndex:
+        """ Index of the names by their trigrams. """
+        return TrigramIndex.from_names(self.names)
+
+    @cached_property
+    def tag_index(self) -> TagIndex:
+        """ Index of the entries by tag. """
+        return TagIndex.from_tags([b.tags for b in self.briefs])
+
+    @cached_property
+    def stroke_index(self) -> StrokeIndex:
+        """ Index of the entries by their strokes. """
+        return StrokeIndex.from_strokes([b.strokes for b in self.briefs])
+
+    @cached_property
+    def hamming_index(self) -> HammingIndex:
+        """ Index of the strokes by key flips. """
+        return HammingIndex.from_strokes([b.strokes for b in self.briefs])
+
+    @cached_property
+    def fuzzy_index(self) -> BKTree:
+        """ Tree of the names by edit distance. """
+        return BKTree.from_names(self.names)
+
+
+class CompiledDict:
+    """Read only view of a compiled dictionary.
+
+    The sections are memory mapped and accessed through ``memoryview`` casts so loading
+    the dictionary does no parsing, each entry is only decoded when requested. The
+    entries of the journal follow the compiled entries, see the module notes.
+    """
+
+    def __init__(self, compiled_path: Path, journal: Optional[Journal] = None):
+        self.path = compiled_path
+        self._map, n_entries, self.source, self.sections = _map_sections(
+            compiled_path, magic
+        )
+        self.journal = journal if journal is not None else Journal()
+        self._n_compiled = n_entries
+        self._len = n_entries + len(self.journal)
+
+        self._strokes = self.sections[b"STRO"].cast("I")
+        self._stroke_offsets = self.sections[b"SOFF"].cast("I")
+        self._names = self.sections[b"NAME"]
+        self._name_offsets = self.sections[b"NOFF"].cast("I")
+        self._keys = self.sections[b"KEYS"]
+        self._key_offsets = self.sections[b"KOFF"].cast("I")
+        self._tags = self.sections[b"TAGS"]
+        self._tag_offsets = self.sections[b"TOFF"].cast("I")
+
+    def __len__(self):
+        return self._len
+
+    def name(self, i: int) -> str:
+        """ The name of the ``i``th entry. """
+        if i >= self._n_compiled:
+            return self.journal.briefs[i - self._n_compiled].name
+        return str(_field(self._names, self._name_offsets, i), "utf8")
+
+    def keys(self, i: int) -> str:
+        """ The shorthand keys of the ``i``th entry. """
+        if i >= self._n_compiled:
+            return self.journal.briefs[i - self._n_compiled].keys_full
+        return str(_field(self._keys, self._key_offsets, i), "utf8")
+
+    def tags(self, i: int) -> List[str]:
+        """ The tags of the ``i``th entry. """
+        if i >= self._n_compiled:
+            return list(self.journal.briefs[i - self._n_compiled].tags)
+        tags = str(_field(self._tags, self._tag_offsets, i), "utf8")
+        return tags.split(",") if tags else []
+
+    def strokes(self, i: int) -> Tuple[int, ...]:
+        """ The key masks for each stroke of the ``i``th entry. """
+        if i >= self._n_compiled:
+            return self.journal.briefs[i - self._n_compiled].strokes
+        return tuple(_field(self._strokes, self._stroke_offsets, i))
+
+    def cannonical(self, i: int) -> str:
+        """ The key sequence of the ``i``th entry without abbreviations. """
+        return "/".join(letters.stroke_to_string(s) for s in self.strokes(i))
+
+    def tsv(self, i: int) -> str:
+        """ Tab separated values of the ``i``th entry, as saved in the dictionary. """
+        if i >= self._n_compiled:
+            tags = ",".join(self.tags(i))
+        else:
+            tags = str(_field(self._tags, self._tag_offsets, i), "utf8")
+        return f"{self.name(i)}\t{self.keys(i)}\t{self.cannonical(i)}\t{tags}\n"
+
+    def sort_key(self, i: int) -> Tuple[str, int]:
+        """ Key giving the dictionary order of the entries. """
+        return self.name(i), i
+
+    def ids(self) -> Iterator[int]:
+        """ Iterate over the ids of all of the entries, in dictionary order. """
+        compiled_ids = range(self._n_compiled)
+        if not self.journal:
+            return iter(compiled_ids)
+        journal_ids = range(self._n_compiled, self._len)
+        return heapq.merge(compiled_ids, journal_ids, key=self.sort_key)
+
+    def names(self) -> Iterator[str]:
+        """ Iterate over the names of all of the entries. """
+        return (self.name(i) for i in self.ids())
+
+    @cached_property
+    def digest(self) -> bytes:
+        """ Digest of the entries, the digest of the source along with the journal. """
+        if not self.journal:
+            return self.source.digest
+        digest = hashlib.sha256(self.source.digest)
+        for b in self.journal.briefs:
+            digest.update(b.tsv.encode("utf8"))
+        return digest.digest()
+
+    def _in_order(self, ids: List[int], journal_ids: Iterable[int]) -> List[int]:
+        """ Insert the ids of the matching journal entries, in dictionary order. """
+        for j in journal_ids:
+            bisect.insort(ids, self._n_compiled + j, key=self.sort_key)
+        return ids
+
+    def _closest_first(
+        self, matches: List[Tuple[int, int]], journal_matches: List[Tuple[int, int]]
+    ) -> List[int]:
+        """ Ids of the (distance, id) matches of both, closest and then in order. """
+        for distance, j in journal_matches:
+            bisect.insort(
+                matches,
+                (distance, self._n_compiled + j),
+                key=lambda m: (m[0], self.sort_key(m[1])),
+            )
+        return [i for _, i in matches]
+
+    @cached_property
+    def prefix_index(self) -> PrefixIndex:
+        """ Index of the names by prefix, read from the compiled file. """
+        return PrefixIndex(self.name, self.sections[b"PREF"].cast("I"))
+
+    def starting_with(self, prefix: str, limit: Optional[int] = None) -> List[int]:
+        """Ids of the entries whose name starts with the prefix.
+
+        If a limit is given only the first entries in folded order are returned.
+        """
+        ids = self.prefix_index.search(prefix, limit)
+        journal_ids = self.journal.prefix_index.search(prefix, limit)
+        if limit is None or not journal_ids:
+            return self._in_order(ids, journal_ids)
+
+        ids += [self._n_compiled + j for j in journal_ids]
+        ids.sort(key=lambda i: (fold(self.name(i)), self.sort_key(i)))
+        return sorted(ids[:limit], key=self.sort_key)
+
+    @cached_property
+    def trigram_index(self) -> TrigramIndex:
+        """ Index of the names by their trigrams, read from the compiled file. """
+        return TrigramIndex(
+            self.name,
+            self._n_compiled,
+            self.sections[b"TRIK"].cast("Q"),
+            self.sections[b"TRIO"].cast("I"),
+            self.sections[b"TRIP"].cast("I"),
+        )
+
+    def containing(self, string: str) -> List[int]:
+        """ Ids of the entries whose name contains the string. """
+        return self._in_order(
+            self.trigram_index.search(string),
+            self.journal.trigram_index.search(string),
+        )
+
+    @cached_property
+    def tag_index(self) -> TagIndex:
+        """ Index of the entries by tag, read from the compiled file. """
+        names = self.sections[b"TGNM"]
+        offsets = self.sections[b"TGNO"].cast("I")
+        tags = [str(_field(names, offsets, n), "utf8") for n in range(len(offsets) - 1)]
+        return TagIndex(
+            self._n_compiled,
+            tags,
+            self.sections[b"TGPO"].cast("I"),
+            self.sections[b"TGPP"].cast("I"),
+        )
+
+    def tag_names(self) -> List[str]:
+        """ Sorted names of the tags used by the entries. """
+        if not self.journal:
+            return list(self.tag_index.tags)
+        return sorted(set(self.tag_index.tags).union(self.journal.tag_index.tags))
+
+    def matching_tags(self, expression: str) -> List[int]:
+        """ Ids of the entries matching the tag expression. """
+        return self._in_order(
+            self.tag_index.search(expression),
+            self.journal.tag_index.search(expression),
+        )
+
+    @cached_property
+    def stroke_index(self) -> StrokeIndex:
+        """ Index of the entries by their strokes, read from the compiled file. """
+        return StrokeIndex(self.strokes, self.sections[b"STRK"].cast("I"))
+
+    def with_strokes(self, strokes: str) -> List[int]:
+        """ Ids of the entries given by the strokes in steno notation, eg "TPHO/E". """
+        masks = letters.parse_strokes(strokes)
+        return self._in_order(
+            self.stroke_index.search(masks), self.journal.stroke_index.search(masks)
+        )
+
+    @cached_property
+    def hamming_index(self) -> HammingIndex:
+        """ Index of the strokes by key flips, read from the compiled file. """
+        return HammingIndex(
+            self.strokes,
+            self.sections[b"HMSK"].cast("I"),
+            self.sections[b"HMEO"].cast("I"),
+            self.sections[b"HMEI"].cast("I"),
+            self.sections[b"HMEP"].cast("I"),
+            [self.sections[b"HMC0"].cast("I"), self.sections[b"HMC1"].cast("I")],
+        )
+
+    def misstrokes(self, strokes: str, max_distance: int = 1) -> List[int]:
+        """Ids of the entries within ``max_distance`` key flips of the strokes.
+
+        A single stroke is compared against each stroke of the entries, so the parts of
+        multi-stroke entries are found as well.
+        """
+        masks = letters.parse_strokes(strokes)
+        return self._closest_first(
+            self.hamming_index.matches(masks, max_distance),
+            self.journal.hamming_index.matches(masks, max_distance),
+        )
+
+    @cached_property
+    def fuzzy_index(self) -> BKTree:
+        """ Tree of the names by edit distance, see the module notes. """
+        fuzzy_path = self.path.with_suffix(".fuzzy.compiled")
+        sections = self._map_fuzzy(fuzzy_path)
+        if sections is None:
+            with stage("fuzzy_index"):
+                names = [self.name(i) for i in range(self._n_compiled)]
+                tree_sections = _fuzzy_sections(names)
+                n_entries = self._n_compiled
+                _write_sections(
+                    fuzzy_path, tree_sections, n_entries, self.source, fuzzy_magic
+                )
+            sections = self._map_fuzzy(fuzzy_path)
+
+        return BKTree(
+            self.name,
+            sections[b"BKID"].cast("I"),
+            sections[b"BKIO"].cast("I"),
+            sections[b"BKCN"].cast("I"),
+            sections[b"BKCD"].cast("I"),
+            sections[b"BKCO"].cast("I"),
+        )
+
+    def _map_fuzzy(self, fuzzy_path: Path) -> Optional[Dict[bytes, memoryview]]:
+        """ Sections of the fuzzy index, if built for the same source as this file. """
+        try:
+            fuzzy_map, n_entries, source, sections = _map_sections(
+                fuzzy_path, fuzzy_magic
+            )
+        except (OSError, ValueError, struct.error):
+            return None
+        if n_entries != self._n_compiled or source.digest != self.source.digest:
+            return None
+        self._fuzzy_map = fuzzy_map
+        return sections
+
+    def fuzzy(self, string: str, max_distance: Optional[int] = None) -> List[int]:
+        """Ids of the entries whose name is within the edit distance, closest first.
+
+        By default one edit is allowed for strings of up to four characters, and two
+        for longer strings.
+        """
+        if max_distance is None:
+            max_distance = 1 if len(string) <= 4 else 2
+        return self._closest_first(
+            self.fuzzy_index.search(string, max_distance),
+            self.journal.fuzzy_index.search(string, max_distance),
+        )
+
+    @cached_property
+    def columns(self) -> "ColumnarDict":
+        """ Columns of the dictionary for vectorised filters, built on first use. """
+        from steno_summary.columnar import ColumnarDict
+
+        return ColumnarDict.from_compiled(self)
+
+    def matching_keys(
+        self, uses: str = "", excludes: str = "", left: str = "", right: str = ""
+    ) -> List[int]:
+        """Ids of the entries with a stroke matching the key pattern.
+
+        The stroke must use all of the keys in ``uses`` and none in ``excludes``, both
+        given in steno notation. If ``left`` or ``right`` are given the keys of that
+        hand must be exactly these, eg ``left="TP"`` and ``right="PBG"``.
+        """
+        pattern = letters.key_pattern(uses, excludes, left, right)
+        ids = self.columns.ids(self.columns.with_stroke_keys(*pattern)).tolist()
+        # The journal entries follow the compiled entries in the columns
+        n = bisect.bisect_left(ids, self._n_compiled)
+        return self._in_order(ids[:n], [i - self._n_compiled for i in ids[n:]])
+
+    def brief(self, i: int) -> Brief:
+        """ Build the ``Brief`` for the ``i``th entry. """
+        return Brief(self.name(i), self.keys(i), tags=self.tags(i))
+
+    def briefs(self, ids: Optional[Iterable[int]] = None) -> List[Brief]:
+        """ Build the ``Brief``s for the given entries, or all of them if not given. """
+        ids = self.ids() if ids is None else ids
+        return [self.brief(i) for i in ids]
+
+
+def load_compiled(
+    dict_location: Optional[Path] = None,
+    compiled_location: Optional[Path] = None,
+    processes: Optional[int] = None,
+    journal: bool = True,
+) -> CompiledDict:
+    """Load the compiled dictionary, rebuilding it if the source has changed.
+
+    By default the compiled dictionary is stored alongside the source with the suffix
+    ``.compiled``. The source is parsed over ``processes``, see ``read_dict``. The
+    entries of the journal are included unless ``journal`` is false.
+    """
+    dict_path = _validate_path(dict_location)
+    compiled_path = (
+        compiled_location
+        if compiled_location is not None
+        else dict_path.with_suffix(".compiled")
+    )
+
+    with ExitStack() as stack:
+        entries = Journal()
+        if journal and journal_path(dict_path).is_file():
+            # Hold the lock so the journal is not compacted while the file is compiled
+            f = stack.enter_context(_locked_journal(dict_path, "r", fcntl.LOCK_SH))
+            entries = _read_journal(f)
+
+        if compiled_path.is_file():
+            try:
+                compiled = CompiledDict(compiled_path, entries)
+            except (ValueError, struct.error, KeyError):
+                compiled = None
+            if compiled is not None and _source_current(compiled, dict_path):
+                return compiled
+
+        with stage("compile"):
+            compile_dict(dict_path, compiled_path, processes)
+        return CompiledDict(compiled_path, entries)
+
+
+def _read_journal(f) -> Journal:
+    """ Parse the entries of the open journal. """
+    stat = os.fstat(f.fileno())
+    briefs = [_line_to_brief(l) for l in f.readlines() if is_valid(l)]
+    return Journal(briefs, (stat.st_size, stat.st_mtime_ns))
+
+
+def compile_dict(dict_path: Path, compiled_path: Path, processes: Optional[int] = None):
+    """ Parse the source dictionary, without its journal, into the compiled form. """
+    source = source_info(dict_path)
+    briefs = read_dict(dict_path, processes, journal=False)
+
+    with stage("index"):
+        sections = _sections(briefs)
+    with stage("write"):
+        _write_sections(compiled_path, sections, len(briefs), source)
+
+
+def _sections(briefs: List[Brief]) -> List[Tuple[bytes, bytes]]:
+    """ The sections of the compiled dictionary holding the entries and indexes. """
+    strokes = array("I")
+    stroke_offsets = array("I", [0])
+    for b in briefs:
+        strokes.extend(b.strokes)
+        stroke_offsets.append(len(strokes))
+
+    names, name_offsets = _string_table(b.name for b in briefs)
+    keys, key_offsets = _string_table(b.keys_full for b in briefs)
+    tags, tag_offsets = _string_table(",".join(b.tags) for b in briefs)
+    prefix = array("I", prefix_order([b.name for b in briefs]))
+    trigram_keys, trigram_offsets, postings = trigram_table([b.name for b in briefs])
+    tag_names, tag_posting_offsets, tag_postings = tag_table([b.tags for b in briefs])
+    tag_names, tag_name_offsets = _string_table(tag_names)
+    entry_strokes = [b.strokes for b in briefs]
+    stroke_ids = array("I", stroke_order(entry_strokes))
+    masks, mask_offsets, mask_ids, mask_positions, chunk_orders = hamming_table(
+        entry_strokes
+    )
+
+    return [
+        (b"STRO", strokes.tobytes()),
+        (b"SOFF", stroke_offsets.tobytes()),
+        (b"NAME", names),
+        (b"NOFF", name_offsets.tobytes()),
+        (b"KEYS", keys),
+        (b"KOFF", key_offsets.tobytes()),
+        (b"TAGS", tags),
+        (b"TOFF", tag_offsets.tobytes()),
+        (b"PREF", prefix.tobytes()),
+        (b"TRIK", trigram_keys.tobytes()),
+        (b"TRIO", trigram_offsets.tobytes()),
+        (b"TRIP", postings.tobytes()),
+        (b"TGNM", tag_names),
+        (b"TGNO", tag_name_offsets.tobytes()),
+        (b"TGPO", tag_posting_offsets.tobytes()),
+        (b"TGPP", tag_postings.tobytes()),
+        (b"STRK", stroke_ids.tobytes()),
+        (b"HMSK", masks.tobytes()),
+        (b"HMEO", mask_offsets.tobytes()),
+        (b"HMEI", mask_ids.tobytes()),
+        (b"HMEP", mask_positions.tobytes()),
+        (b"HMC0", chunk_orders[0].tobytes()),
+        (b"HMC1", chunk_orders[1].tobytes()),
+    ]
+
+
+def _fuzzy_sections(names: List[str]) -> List[Tuple[bytes, bytes]]:
+    """ The sections of the fuzzy index, see the module notes. """
+    ids, id_offsets, children, distances, child_offsets = bk_table(names)
+    return [
+        (b"BKID", ids.tobytes()),
+        (b"BKIO", id_offsets.tobytes()),
+        (b"BKCN", children.tobytes()),
+        (b"BKCD", distances.tobytes()),
+        (b"BKCO", child_offsets.tobytes()),
+    ]
+
+
+def source_info(dict_path: Path) -> SourceInfo:
+    """ Fingerprint the source dictionary, the journal is not included. """
+    digest = hashlib.sha256(dict_path.read_bytes())
+    size, mtime_ns = _source_stat(dict_path)
+    return SourceInfo(digest.digest(), size, mtime_ns)
+
+
+def _source_stat(dict_path: Path) -> Tuple[int, int]:
+    """ Size and modification time of the source dictionary. """
+    stat = dict_path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _journal_stat(dict_path: Path) -> Optional[Tuple[int, int]]:
+    """ Size and modification time of the journal, if it exists. """
+    try:
+        stat = journal_path(dict_path).stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _source_current(compiled: CompiledDict, dict_path: Path) -> bool:
+    """Test if the compiled dictionary was built from the current source.
+
+    The digest is only calculated if the size or modification time have changed. If
+    the digest still matches the new size and modification time are written to the
+    header, so that later loads do not calculate it again.
+    """
+    source = compiled.source
+    stat = _source_stat(dict_path)
+    if (source.size, source.mtime_ns) == stat:
+        return True
+    if source.digest != source_info(dict_path).digest:
+        return False
+
+    compiled.source = SourceInfo(source.digest, *stat)
+    _write_source_stat(compiled.path, compiled.source)
+    return True
+
+
+def _is_current(compiled: CompiledDict, dict_path: Path) -> bool:
+    """ Test if the loaded dictionary matches the source along with its journal. """
+    if compiled.journal.stat != _journal_stat(dict_path):
+        return False
+    return _source_current(compiled, dict_path)
+
+
+def _write_source_stat(compiled_path: Path, source: SourceInfo):
+    """Replace the size and modification time of the source in the header.
+
+    The file is left as it is if it has since been compiled from a different source, or
+    if it may not be written to, as the digest is only checked again on the next load.
+    """
+    try:
+        with open(compiled_path, "r+b") as f:
+            header = header_fmt.unpack(f.read(header_fmt.size))
+            if header[4] != source.digest:
+                return
+            f.seek(0)
+            f.write(header_fmt.pack(*header[:4], *source))
+    except (OSError, struct.error):
+        pass
+
+
+def _field(data: memoryview, offsets: memoryview, i: int) -> memoryview:
+    """ The ``i``th field of a section given its offset table. """
+    return data[offsets[i] : offsets[i + 1]]
+
+
+def _string_table(strings: Iterable[str]) -> Tuple[bytes, array]:
+    """ Concatenate the encoded strings and record the offset of each. """
+    encoded = [s.encode("utf8") for s in strings]
+    offsets = array("I", [0])
+    total = 0
+    for e in encoded:
+        total += len(e)
+        offsets.append(total)
+    return b"".join(encoded), offsets
+
+
+def _map_sections(
+    path: Path, file_magic: bytes
+) -> Tuple[mmap.mmap, int, SourceInfo, Dict[bytes, memoryview]]:
+    """Memory map the file written by ``_write_sections``.
+
+    The map is given along with the number of entries, the source and the sections.
+    """
+    with open(path, "rb") as f:
+        map_ = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header = header_fmt.unpack_from(map_, 0)
+    magic_, version_, n_sections, n_entries, digest, size, mtime_ns = header
+    if magic_ != file_magic or version_ != version:
+        raise ValueError(f"{path} is not a compiled dictionary.")
+
+    view = memoryview(map_)
+    sections: Dict[bytes, memoryview] = {}
+    for n in range(n_sections):
+        position = header_fmt.size + n * section_fmt.size
+        tag, offset, length = section_fmt.unpack_from(map_, position)
+        sections[tag] = view[offset : offset + length]
+    return map_, n_entries, SourceInfo(digest, size, mtime_ns), sections
+
+
+def _write_sections(
+    compiled_path: Path,
+    sections: List[Tuple[bytes, bytes]],
+    n_entries: int,
+    source: SourceInfo,
+    file_magic: bytes = magic,
+):
+    """ Write the sections to file, replacing any previous file atomically. """
+    offset = _align(header_fmt.size + len(sections) * section_fmt.size)
+    table = []
+    for tag, data in sections:
+        table.append((tag, offset, len(data)))
+        offset = _align(offset + len(data))
+
+    header = header_fmt.pack(file_magic, version, len(sections), n_entries, *source)
+    fd, tmp_name = tempfile.mkstemp(dir=compiled_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            for entry in table:
+                f.write(section_fmt.pack(*entry))
+            for (tag, data), (_, data_offset, _) in zip(sections, table):
+                f.write(b"\0" * (data_offset - f.tell()))
+                f.write(data)
+        os.replace(tmp_name, compiled_path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    """ Round up the offset to the next multiple of the alignment. """
+    return -(-offset // alignment) * alignment
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+from typing import TYPE_CHECKING, List, Optional
+from pathlib import Path
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+
+from steno_summary.profiling import stage
+
+if TYPE_CHECKING:
+    from steno_summary.compiled_dict import CompiledDict
+
+""" Lookup daemon holding the dictionary in memory.
+
+Outline
+-------
+
+Each lookup from dmenu starts a new process that has to load the dictionary before
+answering. The daemon keeps the compiled dictionary, along with any indexes that have
+been built, and answers queries over a Unix socket. The dictionary is reloaded if the
+source file or its journal changes, though an added entry only reads the journal again
+rather than recompiling.
+
+The indexes are stored in the compiled dictionary, so a query only waits on building
+them when the daemon has to recompile the dictionary, or for the first fuzzy search
+after each compile (see ``compiled_dict``). Once connected the client waits for the
+response, rather than answering the query itself, so the build is never done twice.
+
+Protocol
+--------
+
+A request is a single line of tab separated fields, the query followed by its
+arguments:
+
+    start   <prefix> [<limit>]
+    cont    <string>
+    tag     <expression>
+    stroke  <strokes>
+    keys    <uses> <excludes> <left> <right>
+    fuzzy   <string> [<distance>]
+    near    <strokes> [<distance>]
+    tags
+
+The response starts with a status line, either ``ok`` or ``error<tab><message>``,
+followed by the matching entries as lines of the dictionary TSV (or the tag names) and
+is finished by an empty line.
+
+The client side is used on every lookup, so the compiled dictionary is only imported
+when the query is answered in this process.
+"""
+
+socket_env = "STENO_SOCKET"
+# Seconds to wait to connect to the daemon, and then for the response to the query
+timeout = 5.0
+response_timeout = 120.0
+
+
+def socket_path() -> Path:
+    """ Location of the socket, this may be overridden by setting ``STENO_SOCKET``. """
+    if socket_env in os.environ:
+        return Path(os.environ[socket_env])
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "steno-summary.sock"
+    return Path(tempfile.gettempdir()) / f"steno-summary-{os.getuid()}.sock"
+
+
+def run_query(compiled: "CompiledDict", query: str, args: List[str]) -> List[str]:
+    """ Answer the query, returning the lines of the response. """
+    with stage("filter"):
+        return _run_query(compiled, query, args)
+
+
+def _run_query(compiled: "CompiledDict", query: str, args: List[str]) -> List[str]:
+    """ The lines of the response, see ``run_query``. """
+    if query == "tags":
+        return compiled.tag_names()
+
+    if query == "start":
+        limit = int(args[1]) if len(args) > 1 and args[1] else None
+        ids = compiled.starting_with(args[0], limit)
+    elif query == "cont":
+        ids = compiled.containing(args[0])
+    elif query == "tag":
+        ids = compiled.matching_tags(args[0])
+    elif query == "stroke":
+        ids = compiled.with_strokes(args[0])
+    elif query == "keys":
+        ids = compiled.matching_keys(*args[:4])
+    elif query == "fuzzy":
+        distance = int(args[1]) if len(args) > 1 and args[1] else None
+        ids = compiled.fuzzy(args[0], distance)
+    elif query == "near":
+        distance = int(args[1]) if len(args) > 1 and args[1] else 1
+        ids = compiled.misstrokes(args[0], distance)
+    else:
+        raise ValueError(f"Unknown query {query}")
+    return [compiled.tsv(i).rstrip("\n") for i in ids]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """ Answer each request line in turn until the client disconnects. """
+
+    def handle(self):
+        for line in self.rfile:
+            query, *args = line.decode("utf8").rstrip("\n").split("\t")
+            try:
+                lines = run_query(self.server.dictionary(), query, args)
+            except (ValueError, IndexError) as e:
+                response = f"error\t{e}\n\n"
+            else:
+                response = "ok\n" + "".join(l + "\n" for l in lines) + "\n"
+            self.wfile.write(response.encode("utf8"))
+
+
+class LookupServer(socketserver.ThreadingUnixStreamServer):
+    """ Serve lookups from the dictionary held in memory. """
+
+    daemon_threads = True
+
+    def __init__(self, path: Path, dict_location: Optional[Path] = None):
+        from steno_summary.compiled_dict import load_compiled
+        from steno_summary.parse_dict import _validate_path
+
+        self.dict_path = _validate_path(dict_location)
+        self._compiled = load_compiled(self.dict_path)
+        self._reload_lock = threading.Lock()
+        _remove_stale_socket(path)
+        super().__init__(str(path), _Handler)
+        self.path = path
+
+    def dictionary(self) -> "CompiledDict":
+        """The compiled dictionary, reloaded if the source has changed.
+
+        This is called from the handler threads, so the dictionary is parsed in this
+        process rather than forking a pool from a threaded process. Only one thread
+        reloads the dictionary, the others wait for it.
+        """
+        from steno_summary.compiled_dict import load_compiled, _is_current
+
+        with self._reload_lock:
+            if not _is_current(self._compiled, self.dict_path):
+                self._compiled = load_compiled(self.dict_path, processes=1)
+            return self._compiled
+
+    def server_close(self):
+        super().server_close()
+        if self.path.exists():
+            self.path.unlink()
+
+
+def serve(path: Optional[Path] = None, dict_location: Optional[Path] = None):
+    """ Run the daemon until interrupted. """
+    path = path if path is not None else socket_path()
+    with LookupServer(path, dict_location) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def send_query(
+    query: str, *args: str, path: Optional[Path] = None
+) -> Optional[List[str]]:
+    """Send the query to the daemon and return the lines of the response.
+
+    ``None`` is returned if the daemon is not running, or closes the connection before
+    the response is finished, so the caller can fall back to loading the dictionary
+    itself. Once connected the daemon may be reloading the dictionary, so the response
+    is waited on for ``response_timeout`` before raising a ``TimeoutError``.
+    """
+    path = path if path is not None else socket_path()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        try:
+            client.connect(str(path))
+        except (FileNotFoundError, ConnectionError, socket.timeout):
+            return None
+
+        client.settimeout(response_timeout)
+        request = "\t".join((query,) + args) + "\n"
+        try:
+            client.sendall(request.encode("utf8"))
+            with client.makefile("r", encoding="utf8") as f:
+                status = f.readline().rstrip("\n")
+                lines = []
+                finished = False
+                for line in f:
+                    if line == "\n":
+                        finished = True
+                        break
+                    lines.append(line.rstrip("\n"))
+        except ConnectionError:
+            return None
+        except socket.timeout:
+            raise TimeoutError(f"No response from the daemon on {path}")
+
+    if not status or not finished:
+        return None
+
+    if status.startswith("error"):
+        raise ValueError(status.partition("\t")[2])
+    return lines
+
+
+def lookup(query: str, *args: str) -> List[str]:
+    """ Send the query to the daemon, or answer it here if the daemon is not running. """
+    with stage("lookup"):
+        lines = send_query(query, *args)
+        if lines is None:
+            from steno_summary.compiled_dict import load_compiled
+
+            with stage("load"):
+                compiled = load_compiled()
+            lines = run_query(compiled, query, list(args))
+    return lines
+
+
+def _remove_stale_socket(path: Path):
+    """ Remove a socket left by a daemon that has exited, if one is running raise. """
+    if not path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(str(path))
+        except ConnectionRefusedError:
+            path.unlink()
+            return
+    raise OSError(f"A daemon is already listening on {path}")
@@ -1,29 +1,30 @@
 #!/usr/bin/env python3
-from steno_summary import manager
+from steno_summary import cli, daemon
 from enum import Enum
 from pathlib import Path
 from subprocess import PIPE, run, Popen
-from time import sleep
 import steno_summary
-import i3ipc
 import sys
 
 """ Use dmenu to lookup a brief using rofi/dmenu. """
 
-# ["echo", "awk", "-F'\t '$4 { print $4 }'", user_dict], shell=True, stdout=PIPE,
+# Number of matches shown when searching by the start of the word
+start_limit = 200
 
 
 def get_tags(user_dict: Path):
-    """ Get the tags from the dict."""
-    tags = run(["awk", "-F	", "$4 && NR>1 { print $4 }", user_dict], stdout=PIPE)
-    tags = _decode_stdout(tags)
+    """ Get the tags from the daemon, or the dict if it is not running. """
+    tags = daemon.send_query("tags")
+    if tags is None:
+        from steno_summary.compiled_dict import load_compiled
+
+        tags = load_compiled(user_dict).tag_names()
     return tags
 
 
 def dmenu_tags(user_dict: Path):
     """ Get the tags from the file. """
     tags = get_tags(user_dict)
-    tags = set(tags.split("\n"))
 
     # dmenu requires a new line seperated string
     tag_string = "\n".join(tags)
@@ -39,7 +40,7 @@ def _decode_stdout(selection) -> str:
 def launch_term(*lookup_args):
     """ Create the lookup terminal. """
     interactive_term = sys.stdout.isatty()
-    manager_path = Path(manager.__file__)
+    manager_path = Path(cli.__file__)
     run_command = manager_path
 
     if interactive_term:
@@ -70,7 +71,7 @@ def main():
     dict_path = Path(steno_summary.__file__).parent / "user_dict.tsv"
 
     if selection is Option.start:
-        launch_term("starting-with")
+        launch_term("starting-with", "--limit", str(start_limit))
     elif selection is Option.cont:
         launch_term("contains")
     elif selection is Option.tag:
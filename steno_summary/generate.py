@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+from typing import Iterator, List, Optional, Set, TextIO, Tuple
+from collections import Counter
+import random
+
+from steno_summary import letters
+from steno_summary.brief_info import Brief
+from steno_summary.parse_dict import dict_header
+
+""" Generate large random dictionaries for load testing.
+
+Outline
+-------
+
+Each stroke is built from the chunks of ``letters`` in the usual shorthand order: zero
+to two chunks on the left hand, an optional vowel and zero to two chunks on the right
+hand. A "-" is placed before the right hand chunks whenever the first of them could also
+be placed on the left, as in "N-S", and a small number of strokes are given the "*".
+Entries are made from one to three strokes separated by "/", and some are given tags.
+
+The keys are checked by building the ``Brief``, any that cannot be placed, or that have
+already been given, are drawn again. The names are spelled from the chunks, with a
+number added to repeated names.
+
+The random number generator is seeded, so the same dictionary is given for each seed.
+"""
+
+default_seed = 2020
+
+# Chunks available to each part of the stroke, vowels are placed between the hands
+vowel_chunks = sorted(
+    k
+    for k, v in letters.chunk_table.items()
+    if v.both or v.left | v.right <= set("AOEU")
+)
+left_chunks = sorted(
+    k for k, v in letters.chunk_table.items() if v.left and k not in vowel_chunks
+)
+right_chunks = sorted(
+    k for k, v in letters.chunk_table.items() if v.right and k not in vowel_chunks
+)
+# Tags of the bundled dictionary along with a few more
+tag_names = ["command", "name", "phrase", "prefix", "punctuation", "single", "suffix"]
+
+# Number of strokes in an entry with their relative frequency
+stroke_counts = (1, 2, 3)
+stroke_weights = (70, 25, 5)
+# Number of chunks on each hand of a stroke with their relative frequency
+chunk_counts = (0, 1, 2)
+chunk_weights = (1, 3, 2)
+star_rate = 0.1
+tag_rate = 0.25
+
+
+def random_stroke(rng: random.Random) -> Tuple[str, str]:
+    """ The shorthand keys of a random stroke, along with the chunks as spelled. """
+    left = rng.sample(left_chunks, rng.choices(chunk_counts, chunk_weights)[0])
+    vowel = [rng.choice(vowel_chunks)] if rng.random() < 0.8 else []
+    right = rng.sample(right_chunks, rng.choices(chunk_counts, chunk_weights)[0])
+    if not (left or vowel or right):
+        vowel = [rng.choice(vowel_chunks)]
+
+    # The left hand is closed by vowels placed on the right, such as "E"
+    left_open = not any(letters.chunk_table[v].right for v in vowel)
+    chunks = [c.capitalize() for c in left + vowel]
+    if right and left_open and letters.chunk_table[right[0]].left:
+        chunks.append("-")
+    chunks.extend(c.capitalize() for c in right)
+    if rng.random() < star_rate:
+        chunks.append("*")
+    return "".join(chunks), "".join(left + vowel + right)
+
+
+def random_entry(rng: random.Random) -> Tuple[str, str, List[str]]:
+    """ The spelling, shorthand keys and tags of a random entry with valid keys. """
+    while True:
+        n_strokes = rng.choices(stroke_counts, stroke_weights)[0]
+        strokes = [random_stroke(rng) for _ in range(n_strokes)]
+        keys = "/".join(k for k, _ in strokes)
+        try:
+            Brief("", keys)
+        except ValueError:
+            continue
+
+        name = "".join(s for _, s in strokes).capitalize()
+        tags = []
+        if rng.random() < tag_rate:
+            tags = rng.sample(tag_names, rng.randint(1, 2))
+        return name, keys, tags
+
+
+def generate_briefs(size: int, seed: int = default_seed) -> Iterator[Brief]:
+    """Generate ``size`` random entries, in the order that they are drawn.
+
+    Entries with keys that have already been given are drawn again, as the dictionary
+    does not accept repeated keys.
+    """
+    rng = random.Random(seed)
+    seen: Counter = Counter()
+    seen_keys: Set[str] = set()
+    for _ in range(size):
+        name, keys, tags = random_entry(rng)
+        while keys in seen_keys:
+            name, keys, tags = random_entry(rng)
+        seen_keys.add(keys)
+        seen[name] += 1
+        if seen[name] > 1:
+            name = f"{name} {seen[name]}"
+        yield Brief(name, keys, tags=tags)
+
+
+def write_dict(size: int, stream: TextIO, seed: Optional[int] = None):
+    """ Write a random dictionary of ``size`` entries, sorted by name, as TSV. """
+    seed = default_seed if seed is None else seed
+    lines = sorted((b.name, b.tsv) for b in generate_briefs(size, seed))
+    stream.write(dict_header)
+    stream.writelines(line for _, line in lines)
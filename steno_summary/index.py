@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+from typing import Tuple
+from array import array
+import bisect
+import itertools
+import re
+
+""" Search indexes over the dictionary entries.
+
+Outline
+-------
+
+Entries are refered to by their position in the sorted dictionary, so the indexes are
+able to be stored in the compiled dictionary as arrays of ids and are shared between the
+in memory lists of ``Brief``s and the compiled form.
+
+Names are compared after case folding.
+"""
+
+re_tag_token = re.compile(r"\s*([&|!()]|[^\s&|!()]+)")
+
+
+def fold(name: str) -> str:
+    """ The case-folded form of the name used by the indexes. """
+    return name.casefold()
+
+
+class PrefixIndex:
+    """Find the entries whose name starts with a string.
+
+    The entry ids are held in the order of their folded names, so the matching entries
+    form a single range which is found with a binary search.
+    """
+
+    def __init__(self, name: Callable[[int], str], order: Sequence[int]):
+        self._folded = _FoldedNames(name, order)
+        self._order = order
+
+    @classmethod
+    def from_names(cls, names: Sequence[str]) -> "PrefixIndex":
+        """ Build the index for a list of names. """
+        return cls(names.__getitem__, prefix_order(names))
+
+    def search(self, prefix: str, limit: Optional[int] = None) -> List[int]:
+        """Ids of the entries starting with the prefix, in dictionary order.
+
+        If a limit is given only the first entries in folded order are returned.
+        """
+        prefix = fold(prefix)
+        start = bisect.bisect_left(self._folded, prefix)
+        stop = len(self._order)
+        if limit is not None:
+            stop = min(start + limit, stop)
+
+        ids = []
+        for position in range(start, stop):
+            if not self._folded[position].startswith(prefix):
+                break
+            ids.append(self._order[position])
+        return sorted(ids)
+
+
+def prefix_order(names: Sequence[str]) -> List[int]:
+    """ Ids of the names sorted by their folded form. """
+    return sorted(range(len(names)), key=lambda i: (fold(names[i]), i))
+
+
+class TrigramIndex:
+    """Find the entries whose name contains a string.
+
+    Each three character substring of the folded names is mapped to the sorted ids of
+    the entries that contain it. A query is answered by intersecting the posting lists
+    for each of its trigrams and confirming the match for the remaining candidates.
+    Queries shorter than a trigram fall back to a scan of the names.
+
+    The trigrams are stored as integers, see ``trigram_key``, along with an offset table
+    into the concatenated posting lists.
+    """
+
+    def __init__(
+        self,
+        name: Callable[[int], str],
+        n_entries: int,
+        keys: Sequence[int],
+        offsets: Sequence[int],
+        postings: Sequence[int],
+    ):
+        self._name = name
+        self._n_entries = n_entries
+        self._keys = keys
+        self._offsets = offsets
+        self._postings = postings
+
+    @classmethod
+    def from_names(cls, names: Sequence[str]) -> "TrigramIndex":
+        """ Build the index for a list of names. """
+        return cls(names.__getitem__, len(names), *trigram_table(names))
+
+    def search(self, string: str) -> List[int]:
+        """ Ids of the entries containing the string, in dictionary order. """
+        string = fold(string)
+        if len(string) < 3:
+            return [i for i in range(self._n_entries) if string in fold(self._name(i))]
+
+        postings = []
+        for key in {trigram_key(t) for t in _trigrams(string)}:
+            posting = self._posting(key)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = [i for i in candidates if _contains_sorted(posting, i)]
+        return [i for i in candidates if string in fold(self._name(i))]
+
+    def _posting(self, key: int) -> Sequence[int]:
+        """ Sorted ids of the entries containing the trigram. """
+        position = bisect.bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return []
+        return self._postings[self._offsets[position] : self._offsets[position + 1]]
+
+
+def trigram_key(trigram: str) -> int:
+    """ Pack the code points of the trigram into a single 63 bit integer. """
+    return ord(trigram[0]) << 42 | ord(trigram[1]) << 21 | ord(trigram[2])
+
+
+def trigram_table(names: Sequence[str]) -> Tuple[array, array, array]:
+    """ The sorted trigram keys, posting list offsets and posting lists of the names. """
+    table: Dict[int, List[int]] = {}
+    for i, name in enumerate(names):
+        for key in {trigram_key(t) for t in _trigrams(fold(name))}:
+            table.setdefault(key, []).append(i)
+
+    keys = array("Q", sorted(table))
+    offsets = array("I", [0])
+    postings = array("I")
+    for key in keys:
+        postings.extend(table[key])
+        offsets.append(len(postings))
+    return keys, offsets, postings
+
+
+def _trigrams(string: str) -> List[str]:
+    """ All three character substrings of the string. """
+    return [string[n : n + 3] for n in range(len(string) - 2)]
+
+
+def _contains_sorted(ids: Sequence[int], i: int) -> bool:
+    """ Test if the id is in the sorted sequence. """
+    position = bisect.bisect_left(ids, i)
+    return position != len(ids) and ids[position] == i
+
+
+class TagIndex:
+    """Find the entries matching a tag expression.
+
+    Each tag is mapped to the sorted ids of the entries that carry it. Expressions
+    combine tags with ``&`` (and), ``|`` (or), ``!`` (not) and parentheses, for instance
+    ``suffix & !punctuation``. Negated terms are carried through the evaluation as
+    complements so that the work is proportional to the size of the posting lists
+    rather than the dictionary, only a negated result is expanded against every entry.
+    """
+
+    def __init__(
+        self,
+        n_entries: int,
+        tags: Sequence[str],
+        offsets: Sequence[int],
+        postings: Sequence[int],
+    ):
+        self._n_entries = n_entries
+        self.tags = tags
+        self._offsets = offsets
+        self._postings = postings
+
+    @classmethod
+    def from_tags(cls, entry_tags: Sequence[Sequence[str]]) -> "TagIndex":
+        """ Build the index given the tags of each entry. """
+        return cls(len(entry_tags), *tag_table(entry_tags))
+
+    def posting(self, tag: str) -> Sequence[int]:
+        """ Sorted ids of the entries with the tag. """
+        position = bisect.bisect_left(self.tags, tag)
+        if position == len(self.tags) or self.tags[position] != tag:
+            return []
+        return self._postings[self._offsets[position] : self._offsets[position + 1]]
+
+    def search(self, expression: str) -> List[int]:
+        """ Ids of the entries matching the tag expression, in dictionary order. """
+        tokens = re_tag_token.findall(expression)
+        ids, negated, remaining = self._parse_or(tokens)
+        if remaining:
+            raise ValueError(f"Unexpected '{remaining[0]}' in tag expression.")
+        if negated:
+            return [i for i in range(self._n_entries) if i not in ids]
+        return sorted(ids)
+
+    def _parse_or(self, tokens: List[str]) -> Tuple[Set[int], bool, List[str]]:
+        """Evaluate ``term ('|' term)*``.
+
+        Each result is given as a set of ids along with a flag to show the result is the
+        complement of the set.
+        """
+        ids, negated, tokens = self._parse_and(tokens)
+        while tokens and tokens[0] == "|":
+            other, other_negated, tokens = self._parse_and(tokens[1:])
+            if negated and other_negated:
+                ids = ids & other
+            elif negated:
+                ids = ids - other
+            elif other_negated:
+                ids, negated = other - ids, True
+            else:
+                ids = ids | other
+        return ids, negated, tokens
+
+    def _parse_and(self, tokens: List[str]) -> Tuple[Set[int], bool, List[str]]:
+        """ Evaluate ``factor ('&' factor)*``. """
+        ids, negated, tokens = self._parse_not(tokens)
+        while tokens and tokens[0] == "&":
+            other, other_negated, tokens = self._parse_not(tokens[1:])
+            if negated and other_negated:
+                ids = ids | other
+            elif negated:
+                ids, negated = other - ids, False
+            elif other_negated:
+                ids = ids - other
+            else:
+                ids = ids & other
+        return ids, negated, tokens
+
+    def _parse_not(self, tokens: List[str]) -> Tuple[Set[int], bool, List[str]]:
+        """ Evaluate ``'!' factor | '(' expression ')' | tag``. """
+        if not tokens:
+            raise ValueError("Incomplete tag expression.")
+        token, tokens = tokens[0], tokens[1:]
+        if token == "!":
+            ids, negated, tokens = self._parse_not(tokens)
+            return ids, not negated, tokens
+        if token == "(":
+            ids, negated, tokens = self._parse_or(tokens)
+            if not tokens or tokens[0] != ")":
+                raise ValueError("Unmatched '(' in tag expression.")
+            return ids, negated, tokens[1:]
+        if token in ("&", "|", ")"):
+            raise ValueError(f"Unexpected '{token}' in tag expression.")
+        return set(self.posting(token)), False, tokens
+
+
+def tag_table(entry_tags: Sequence[Sequence[str]]) -> Tuple[List[str], array, array]:
+    """ The sorted tags, posting list offsets and posting lists of the entries. """
+    table: Dict[str, List[int]] = {}
+    for i, tags in enumerate(entry_tags):
+        for tag in set(tags):
+            if tag:
+                table.setdefault(tag, []).append(i)
+
+    tags = sorted(table)
+    offsets = array("I", [0])
+    postings = array("I")
+    for tag in tags:
+        postings.extend(table[tag])
+        offsets.append(len(postings))
+    return tags, offsets, postings
+
+
+class StrokeIndex:
+    """Find the entries given by a stroke.
+
+    The entry ids are held in the order of the tuple of key masks for each of their
+    strokes, see ``letters.parse_strokes`` to build the key from steno notation. The
+    entries with the same strokes form a single range which is found with a binary
+    search, as in ``PrefixIndex``.
+    """
+
+    def __init__(self, strokes: Callable[[int], Tuple[int, ...]], order: Sequence[int]):
+        self._strokes = _OrderedStrokes(strokes, order)
+        self._order = order
+
+    @classmethod
+    def from_strokes(cls, entry_strokes: Sequence[Tuple[int, ...]]) -> "StrokeIndex":
+        """ Build the index given the key masks of each entry. """
+        return cls(entry_strokes.__getitem__, stroke_order(entry_strokes))
+
+    def search(self, strokes: Tuple[int, ...]) -> List[int]:
+        """ Ids of the entries with exactly these strokes, in dictionary order. """
+        start = bisect.bisect_left(self._strokes, strokes)
+        stop = bisect.bisect_right(self._strokes, strokes, start)
+        return list(self._order[start:stop])
+
+
+def stroke_order(entry_strokes: Sequence[Tuple[int, ...]]) -> List[int]:
+    """ Ids of the entries sorted by their key masks, in dictionary order for ties. """
+    return sorted(range(len(entry_strokes)), key=lambda i: (entry_strokes[i], i))
+
+
+class HammingIndex:
+    """Find the entries with a stroke within a number of key flips of a stroke.
+
+    This uses multi-index hashing: the distinct strokes are split into chunks of bits and
+    hashed on each chunk. If two strokes differ by ``k`` keys then at least one of ``m``
+    chunks differs by no more than ``k // m`` keys, so only the strokes found by
+    flipping up to that many bits of each chunk of the query are compared.
+
+    For small searches the whole stroke is a single chunk, so every stroke within the
+    distance is looked up directly without any false candidates (24 lookups for one
+    flip, 277 for two). Larger searches, where the number of flips grows too quickly,
+    use two chunks of 12 and 11 keys.
+
+    Each stroke of a multi-stroke entry is indexed separately, along with its position.
+
+    So that the index is able to be stored in the compiled dictionary, the hashes are
+    held as sorted arrays, see ``hamming_table``: the distinct strokes in order along
+    with the entries and positions of each, and for each chunk the distinct strokes
+    sorted by the value of that chunk. Each lookup is a binary search.
+    """
+
+    n_bits = 23
+    # Largest search answered using a single chunk
+    single_chunk_distance = 3
+    # Offset and mask of the bits of each chunk
+    chunks = ((0, (1 << 12) - 1), (12, (1 << 11) - 1))
+
+    def __init__(
+        self,
+        strokes: Callable[[int], Tuple[int, ...]],
+        masks: Sequence[int],
+        entry_offsets: Sequence[int],
+        entry_ids: Sequence[int],
+        entry_positions: Sequence[int],
+        chunk_orders: Sequence[Sequence[int]],
+    ):
+        self._strokes = strokes
+        self._masks = masks
+        self._entry_offsets = entry_offsets
+        self._entry_ids = entry_ids
+        self._entry_positions = entry_positions
+        self._chunk_values = [
+            _ChunkValues(masks, order, start, bits)
+            for order, (start, bits) in zip(chunk_orders, self.chunks)
+        ]
+
+    @classmethod
+    def from_strokes(cls, entry_strokes: Sequence[Tuple[int, ...]]) -> "HammingIndex":
+        """ Build the index given the key masks of each entry. """
+        return cls(entry_strokes.__getitem__, *hamming_table(entry_strokes))
+
+    def search_stroke(self, stroke: int, max_distance: int) -> List[Tuple[int, int]]:
+        """ Distance and index of the distinct strokes within ``max_distance``. """
+        if max_distance <= self.single_chunk_distance:
+            all_bits = (1 << self.n_bits) - 1
+            matches = []
+            for flips in _bit_flips(all_bits, max_distance):
+                n = bisect.bisect_left(self._masks, stroke ^ flips)
+                if n < len(self._masks) and self._masks[n] == stroke ^ flips:
+                    matches.append((_hamming(flips, 0), n))
+            return matches
+
+        radius = max_distance // len(self.chunks)
+        candidates = set()
+        for (start, bits), values in zip(self.chunks, self._chunk_values):
+            chunk = stroke >> start & bits
+            for flips in _bit_flips(bits, radius):
+                candidates.update(values.positions(chunk ^ flips))
+
+        matches = []
+        for n in candidates:
+            distance = _hamming(self._masks[n], stroke)
+            if distance <= max_distance:
+                matches.append((distance, n))
+        return matches
+
+    def search(self, strokes: Tuple[int, ...], max_distance: int) -> List[int]:
+        """ Ids of the entries within ``max_distance`` key flips, closest first. """
+        return [i for _, i in self.matches(strokes, max_distance)]
+
+    def matches(
+        self, strokes: Tuple[int, ...], max_distance: int
+    ) -> List[Tuple[int, int]]:
+        """Distance and id of the entries within ``max_distance`` key flips.
+
+        A single stroke is compared with every stroke of each entry. Multiple strokes
+        are only compared with entries of the same length, with the flips summed over
+        all of the strokes.
+        """
+        best: Dict[int, int] = {}
+        for distance, n in self.search_stroke(strokes[0], max_distance):
+            for e in range(self._entry_offsets[n], self._entry_offsets[n + 1]):
+                i = self._entry_ids[e]
+                if len(strokes) > 1:
+                    if self._entry_positions[e] != 0:
+                        continue
+                    entry_strokes = self._strokes(i)
+                    if len(entry_strokes) != len(strokes):
+                        continue
+                    distance = sum(
+                        _hamming(a, b) for a, b in zip(entry_strokes, strokes)
+                    )
+                    if distance > max_distance:
+                        continue
+                if distance < best.get(i, max_distance + 1):
+                    best[i] = distance
+        return sorted((distance, i) for i, distance in best.items())
+
+
+def hamming_table(
+    entry_strokes: Sequence[Tuple[int, ...]]
+) -> Tuple[array, array, array, array, List[array]]:
+    """The arrays of the index of the strokes, see ``HammingIndex``.
+
+    These are the sorted distinct strokes, the offsets of the entries of each stroke,
+    the ids and positions of the entries, and for each chunk the strokes ordered by the
+    value of the chunk.
+    """
+    table: Dict[int, List[Tuple[int, int]]] = {}
+    for i, strokes in enumerate(entry_strokes):
+        for position, stroke in enumerate(strokes):
+            table.setdefault(stroke, []).append((i, position))
+
+    masks = array("I", sorted(table))
+    entry_offsets = array("I", [0])
+    entry_ids = array("I")
+    entry_positions = array("I")
+    for mask in masks:
+        for i, position in table[mask]:
+            entry_ids.append(i)
+            entry_positions.append(position)
+        entry_offsets.append(len(entry_ids))
+
+    chunk_orders = []
+    for start, bits in HammingIndex.chunks:
+        order = sorted(range(len(masks)), key=lambda n: (masks[n] >> start & bits, n))
+        chunk_orders.append(array("I", order))
+    return masks, entry_offsets, entry_ids, entry_positions, chunk_orders
+
+
+class _ChunkValues(Sequence):
+    """ Value of one chunk of each distinct stroke, in the order of that chunk. """
+
+    def __init__(
+        self, masks: Sequence[int], order: Sequence[int], start: int, bits: int
+    ):
+        self._masks = masks
+        self._order = order
+        self._start = start
+        self._bits = bits
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, position: int) -> int:
+        return self._masks[self._order[position]] >> self._start & self._bits
+
+    def positions(self, chunk: int) -> Sequence[int]:
+        """ Indexes of the distinct strokes with the value of the chunk. """
+        start = bisect.bisect_left(self, chunk)
+        stop = bisect.bisect_right(self, chunk, start)
+        return self._order[start:stop]
+
+
+def _hamming(a: int, b: int) -> int:
+    """ Number of keys that differ between the strokes. """
+    return bin(a ^ b).count("1")
+
+
+def _bit_flips(bits: int, radius: int) -> Iterator[int]:
+    """ Every mask within the bits having no more than ``radius`` bits set. """
+    positions = [1 << n for n in range(bits.bit_length()) if bits >> n & 1]
+    for count in range(radius + 1):
+        for flipped in itertools.combinations(positions, count):
+            yield sum(flipped)
+
+
+class BKTree:
+    """Find the entries whose name is within an edit distance of a string.
+
+    Each distinct folded name is a node of the tree, with the children of a node keyed
+    by their Levenshtein distance from it. By the triangle inequality a search within
+    ``k`` of a string only has to visit the children whose key is within ``k`` of the
+    distance to the node, so most names are never compared.
+
+    The tree is held as arrays, see ``bk_table``, so it is able to be stored in the
+    compiled dictionary: the ids of the entries at each node, the first of which gives
+    the name of the node, and the children of each node along with their distances, each
+    with an offset table.
+    """
+
+    def __init__(
+        self,
+        name: Callable[[int], str],
+        ids: Sequence[int],
+        id_offsets: Sequence[int],
+        children: Sequence[int],
+        distances: Sequence[int],
+        child_offsets: Sequence[int],
+    ):
+        self._name = name
+        self._ids = ids
+        self._id_offsets = id_offsets
+        self._children = children
+        self._distances = distances
+        self._child_offsets = child_offsets
+
+    @classmethod
+    def from_names(cls, names: Sequence[str]) -> "BKTree":
+        """ Build the tree for the names, given in order of their ids. """
+        return cls(names.__getitem__, *bk_table(names))
+
+    def __len__(self):
+        return len(self._id_offsets) - 1
+
+    def search(self, string: str, max_distance: int) -> List[Tuple[int, int]]:
+        """ Distance and id of the entries within ``max_distance``, closest first. """
+        if not len(self):
+            return []
+        string = fold(string)
+        matches = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            ids = self._ids[self._id_offsets[node] : self._id_offsets[node + 1]]
+            distance = levenshtein(string, fold(self._name(ids[0])))
+            if distance <= max_distance:
+                matches.extend((distance, i) for i in ids)
+            low, high = distance - max_distance, distance + max_distance
+            for c in range(self._child_offsets[node], self._child_offsets[node + 1]):
+                if low <= self._distances[c] <= high:
+                    stack.append(self._children[c])
+        return sorted(matches)
+
+
+def bk_table(names: Sequence[str]) -> Tuple[array, array, array, array, array]:
+    """The arrays of the tree of the names, see ``BKTree``.
+
+    These are the entry ids of each node and their offsets, followed by the child nodes
+    of each node, the distance to each child and their offsets.
+    """
+    folded: List[str] = []
+    node_ids: List[List[int]] = []
+    node_children: List[Dict[int, int]] = []
+    nodes: Dict[str, int] = {}
+    for i, name in enumerate(names):
+        name = fold(name)
+        if name in nodes:
+            node_ids[nodes[name]].append(i)
+            continue
+
+        node = nodes[name] = len(folded)
+        folded.append(name)
+        node_ids.append([i])
+        node_children.append({})
+        parent = 0
+        while node:
+            distance = levenshtein(name, folded[parent])
+            child = node_children[parent].setdefault(distance, node)
+            if child == node:
+                break
+            parent = child
+
+    ids = array("I")
+    id_offsets = array("I", [0])
+    for entry_ids in node_ids:
+        ids.extend(entry_ids)
+        id_offsets.append(len(ids))
+
+    children = array("I")
+    distances = array("I")
+    child_offsets = array("I", [0])
+    for table in node_children:
+        for distance in sorted(table):
+            children.append(table[distance])
+            distances.append(distance)
+        child_offsets.append(len(children))
+    return ids, id_offsets, children, distances, child_offsets
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Number of insertions, deletions and substitutions to change ``a`` into ``b``.
+
+    This uses the bit-parallel algorithm of Myers, holding a column of the distance
+    matrix as the bits of an integer so each character of ``a`` is a few operations.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+
+    # Bits of the positions of each character in b
+    positions: Dict[str, int] = {}
+    for n, char in enumerate(b):
+        positions[char] = positions.get(char, 0) | 1 << n
+    mask = (1 << len(b)) - 1
+    last = 1 << (len(b) - 1)
+
+    # Vertical positive and negative differences between neighbouring cells
+    pv, mv, score = mask, 0, len(b)
+    for char in a:
+        eq = positions.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1 | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+class _FoldedNames(Sequence):
+    """ Folded names in the order of the index, only folded when accessed. """
+
+    def __init__(self, name: Callable[[int], str], order: Sequence[int]):
+        self._name = name
+        self._order = order
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, position: int) -> str:
+        return fold(self._name(self._order[position]))
+
+
+class _OrderedStrokes(Sequence):
+    """ Key masks of the entries in the order of the index. """
+
+    def __init__(self, strokes: Callable[[int], Tuple[int, ...]], order: Sequence[int]):
+        self._strokes = strokes
+        self._order = order
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, position: int) -> Tuple[int, ...]:
+        return self._strokes(self._order[position])
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-from typing import Set, Iterator, Optional, List
+from typing import Dict, Set, Iterator, Optional, List, Tuple
+from functools import lru_cache
 import re
 
 """ Database for each letter.
@@ -16,10 +17,52 @@ We don't quite get the steno order right, we might correct for this by using
 ordered sets, while overriding the sorting method, for introduction:
 https://stackoverflow.com/questions/1653970/does-python-have-an-ordered-set
 
+Key Masks
+---------
+
+Every key of the steno keyboard is given a single bit, in steno order, so that a stroke
+can be stored as one 23-bit integer:
+
+    bit:  0  1 2 3 4 5 6 7 8 9  10  11 12 13 14 15 16 17 18 19 20 21 22
+    key:  #  S T K P W H R A O  *   E  U  F  R  P  B  L  G  T  S  D  Z
+
+The number bar ``#`` is not used by the shorthand notation but is reserved so that
+strokes from Plover dictionaries share the same layout. Each ``Letter`` is compiled to
+these masks when it is created, so placing a chunk is a handful of bitwise operations.
+
+Module level names that are not letters contain an underscore, as any lower case
+name in this module is otherwise available as a chunk.
 """
 
 re_capital_split = re.compile(r"[A-Z\-\*/][^A-Z\-\*/]*")
 
+steno_order = "#STKPWHRAO*EUFRPBLGTSDZ"
+left_order = "STKPWHRAO"
+right_order = "EUFRPBLGTSDZ"
+
+number_mask = 1 << 0
+star_mask = 1 << 10
+left_key_masks = {k: 1 << (n + 1) for n, k in enumerate(left_order)}
+right_key_masks = {k: 1 << (n + 11) for n, k in enumerate(right_order)}
+left_hand_mask = sum(left_key_masks.values())
+right_hand_mask = sum(right_key_masks.values())
+
+# Keys that are only found once on the keyboard, and so may be given in any position
+unique_keys = frozenset("AO*EU")
+# Number keys given by Plover in place of the key along with the number bar
+number_keys = {
+    "1": "S",
+    "2": "T",
+    "3": "P",
+    "4": "H",
+    "5": "A",
+    "0": "O",
+    "6": "F",
+    "7": "P",
+    "8": "L",
+    "9": "T",
+}
+
 
 class Letter:
     left_hand_keys = frozenset(["S", "T", "K", "P", "W", "H", "R", "A", "O"])
@@ -45,6 +88,12 @@ class Letter:
         self.right = self._validate_right(right)
         self.both = both
 
+        # Precompiled forms used when placing the letter into a stroke
+        self.left_mask = keys_to_mask(self.left, left_key_masks)
+        self.right_mask = keys_to_mask(self.right, right_key_masks)
+        self.left_starred = "*" in self.left
+        self.right_starred = "*" in self.right
+
     def _validate_left(self, letters: Optional[str]) -> Set[str]:
         """ Ensure that given keys are in the left hand side of the keyboard. """
 
@@ -84,6 +133,135 @@ class DualSideLetter(Letter):
     """
 
 
+def keys_to_mask(keys: Iterator[str], key_masks: Dict[str, int]) -> int:
+    """ Combine the keys of one side of the keyboard into a mask, ignoring cmd chars. """
+    mask = 0
+    for key in keys:
+        mask |= key_masks.get(key, 0)
+    return mask
+
+
+def mask_to_keys(mask: int, key_masks: Dict[str, int]) -> Set[str]:
+    """ The keys from one side of the keyboard that are present in the mask. """
+    return {key for key, key_mask in key_masks.items() if mask & key_mask}
+
+
+@lru_cache(maxsize=None)
+def _keys_in_order(bits: int, order: str) -> str:
+    """ The keys of ``order`` whose bit, counting from the first key, is set. """
+    return "".join(k for n, k in enumerate(order) if bits >> n & 1)
+
+
+def stroke_to_string(mask: int) -> str:
+    """Write the stroke in steno order.
+
+    A "-" is added where the right hand keys could otherwise be read as belonging to the
+    left hand, and this is replaced with "*" in starred strokes.
+    """
+    sorted_left = _keys_in_order(mask >> 1 & 0x1FF, left_order)
+    sorted_right = _keys_in_order(mask >> 11 & 0xFFF, right_order)
+
+    div = ""
+    if sorted_right == "S" and sorted_left == "":
+        div = "-"
+    elif sorted_right.startswith("T") and sorted_left.endswith("S"):
+        div = "-"
+    elif sorted_right.startswith("P") and sorted_left.endswith(("S", "T", "K")):
+        div = "-"
+    elif sorted_right.startswith("R") and sorted_left.endswith(
+        ("S", "T", "K", "P", "W", "H")
+    ):
+        div = "-"
+
+    if mask & star_mask:
+        div = "*"
+
+    number = "#" if mask & number_mask else ""
+    return number + sorted_left + div + sorted_right
+
+
+def stroke_to_steno(mask: int) -> str:
+    """Write the stroke in the steno notation used by Plover.
+
+    Unlike ``stroke_to_string`` this is unambiguous, a "-" is placed before the right
+    hand keys whenever the stroke has no vowels or star.
+    """
+    sorted_left = _keys_in_order(mask >> 1 & 0x7F, "STKPWHR")
+    sorted_middle = _keys_in_order(mask >> 8 & 0x1F, "AO*EU")
+    sorted_right = _keys_in_order(mask >> 13 & 0x3FF, "FRPBLGTSDZ")
+
+    div = "-" if sorted_right and not sorted_middle else ""
+    number = "#" if mask & number_mask else ""
+    return number + sorted_left + sorted_middle + div + sorted_right
+
+
+def parse_stroke(stroke: str) -> int:
+    """Convert a stroke given in steno notation, as used by Plover, into a key mask.
+
+    Keys are read in steno order, so ambiguous keys are placed on the left hand until a
+    later key, a vowel, "*" or "-", moves us onto the right. As the vowels and star are
+    unique they may be given either side of a "-", so "TPHOE" and "TPH-OE" are the same.
+    """
+    mask = 0
+    position = 1
+    for char in stroke.upper():
+        if char == "-":
+            position = max(position, steno_order.index("*"))
+            continue
+        if char == "#":
+            mask |= number_mask
+            continue
+        if char in number_keys:
+            mask |= number_mask
+            char = number_keys[char]
+
+        if char in unique_keys:
+            n = steno_order.index(char)
+        else:
+            n = steno_order.find(char, position)
+        if n < 1:
+            raise ValueError(f"Unable to place key {char} in stroke - {stroke}")
+        mask |= 1 << n
+        position = max(position, n + 1)
+
+    if not mask:
+        raise ValueError(f"No keys given in stroke - '{stroke}'")
+    return mask
+
+
+def parse_strokes(strokes: str) -> Tuple[int, ...]:
+    """ Convert the "/" separated strokes into a tuple of key masks. """
+    return tuple(parse_stroke(s) for s in strokes.split("/"))
+
+
+def key_pattern(
+    uses: str = "", excludes: str = "", left: str = "", right: str = ""
+) -> Tuple[int, int, int, int]:
+    """Convert a partial stroke pattern into masks to test strokes against.
+
+    The keys in ``uses`` and ``excludes`` are given in steno notation. The ``left`` and
+    ``right`` keys fix the keys of that hand, and are always read on that hand, with
+    "-" fixing the hand to be unused. The masks of the required, forbidden and fixed
+    keys are returned, along with the keys that must be used of those fixed.
+    """
+    required = parse_stroke(uses) if uses else 0
+    forbidden = parse_stroke(excludes) if excludes else 0
+    fixed = fixed_keys = 0
+    if left:
+        left_keys = parse_stroke(left.rstrip("-")) if left.strip("-") else 0
+        if left_keys & ~left_hand_mask:
+            raise ValueError(f"Keys not on the left hand - '{left}'")
+        fixed |= left_hand_mask
+        fixed_keys |= left_keys
+    if right:
+        right_keys = parse_stroke("-" + right.lstrip("-")) if right.strip("-") else 0
+        if right_keys & ~right_hand_mask:
+            raise ValueError(f"Keys not on the right hand - '{right}'")
+        fixed |= right_hand_mask
+        fixed_keys |= right_keys
+    return required, forbidden, fixed, fixed_keys
+
+
 def split_on_capital(string: str) -> List[str]:
     """Break a string into lists starting starting with a single captial letter and then
     zero or more lower case letters.
@@ -156,3 +334,7 @@ rve = Letter(right="FRB")
 shun = Letter(right="GS")
 ent = Letter(left="SPW")
 ds = Letter(left="STK")
+
+
+# Lookup table of the chunks available to the shorthand notation
+chunk_table = {k: v for k, v in list(globals().items()) if isinstance(v, Letter)}
@@ -1,54 +1,114 @@
 #!/usr/bin/env python3
 from pathlib import Path
-from typing import Optional
-from subprocess import run, PIPE
+from typing import List, Optional
+import sys
 
 import argh
-import backtrace
 
 import steno_summary.parse_dict as pd
-from steno_summary.brief_info import Brief, brief_grid
-from steno_summary.parse_dict import read_dict, _validate_path
+from steno_summary import audit, daemon, plover, profiling
+from steno_summary import generate as gen
+from steno_summary.brief_info import Brief, write_grid
+from steno_summary.compiled_dict import load_compiled
+from steno_summary.profiling import stage
 
-""" Manager for the steno summary dictonary. """
+""" Manager for the steno summary dictonary.
 
-backtrace.hook(align=True, strip_path=True)
+The queries are sent to the lookup daemon (see ``serve``) when it is running, otherwise
+the dictionary is loaded by this process. Simple queries are answered by ``cli``
+without importing this module.
+
+Every command accepts ``--profile`` to time each stage of the command, see
+``profiling``.
+"""
 
 
 @argh.aliases("cont")
 def contains(string: Optional[str] = None, block: bool = False):
     """ Print the names that contains the string. """
     string = _query_user_if_none(string, "Search for words containing: ")
-    briefs = read_dict()
-    filtered_briefs = [b for b in briefs if string.lower() in b.name.lower()]
-    print(brief_grid(filtered_briefs))
+    write_grid(_search("cont", string))
     _wait_if(block)
 
 
 @argh.aliases("start")
-def starting_with(string: Optional[str] = None, block: bool = False):
+def starting_with(
+    string: Optional[str] = None, block: bool = False, limit: Optional[int] = None
+):
     """ Print the names that starts with the string. """
     string = _query_user_if_none(string, "Words starting with: ")
-    briefs = read_dict()
-    lower_str = string.lower()
-    filtered_briefs = [b for b in briefs if b.name.lower().startswith(lower_str)]
-    print(brief_grid(filtered_briefs))
+    limit = str(limit) if limit is not None else ""
+    write_grid(_search("start", string, limit))
     _wait_if(block)
 
 
 @argh.aliases("tag")
 def matches_tag(tag: Optional[str] = None, block: bool = False):
-    """ Print the names of the strokes that contain the tags. """
-    briefs = read_dict()
+    """Print the names of the strokes that match the tags.
 
+    Tags may be combined with "&", "|", "!" and parentheses, eg "suffix & !punctuation".
+    """
     if tag is None:
-        dict_path = _validate_path(None)
-        available_tags = _get_tags(dict_path)
-        print(f"Available tags: {available_tags}")
+        available_tags = daemon.lookup("tags")
+        print(f"Available tags: {set(available_tags)}")
         tag = _query_user_if_none(None, "Select the tag: ")
 
-    filtered_briefs = [b for b in briefs if tag in b.tags]
-    print(brief_grid(filtered_briefs))
+    write_grid(_search("tag", tag))
+    _wait_if(block)
+
+
+def lookup_stroke(stroke: Optional[str] = None, block: bool = False):
+    """ Print the words given by the stroke, eg "TPHOE", "TPH-OE" or "TPHO/E". """
+    stroke = _query_user_if_none(stroke, "Stroke: ")
+    write_grid(_search("stroke", stroke))
+    _wait_if(block)
+
+
+def misstroke(
+    stroke: Optional[str] = None, distance: Optional[int] = None, block: bool = False
+):
+    """Print the words with strokes within ``distance`` keys of the stroke.
+
+    By default strokes differing by a single key are shown, eg "TPHOE" finds "TPHOEU".
+    A single stroke is also compared with each stroke of multi-stroke words.
+    """
+    stroke = _query_user_if_none(stroke, "Stroke: ")
+    distance = str(distance) if distance is not None else ""
+    write_grid(_search("near", stroke, distance))
+    _wait_if(block)
+
+
+def fuzzy(
+    string: Optional[str] = None, distance: Optional[int] = None, block: bool = False
+):
+    """Print the names closest to the string, allowing for misspellings.
+
+    The names are within ``distance`` edits of the string, by default one edit for
+    strings of up to four characters and two for longer strings.
+    """
+    string = _query_user_if_none(string, "Search for words like: ")
+    distance = str(distance) if distance is not None else ""
+    write_grid(_search("fuzzy", string, distance))
+    _wait_if(block)
+
+
+def keys(
+    uses: Optional[str] = None,
+    excludes: Optional[str] = None,
+    left: Optional[str] = None,
+    right: Optional[str] = None,
+    block: bool = False,
+):
+    """Print the words with a stroke matching the key pattern.
+
+    The stroke must use all of the keys in ``uses`` and none in ``excludes``, eg "-PBG"
+    and "*". The keys of either hand may be fixed with ``left`` and ``right``. Keys
+    starting with "-" are given with "=", as in ``--uses=-PBG``.
+    """
+    if not any((uses, excludes, left, right)):
+        uses = _query_user_if_none(None, "Keys used: ")
+    pattern = [k if k is not None else "" for k in (uses, excludes, left, right)]
+    write_grid(_search("keys", *pattern))
     _wait_if(block)
 
 
@@ -58,19 +118,103 @@ def add(name: str = None, keys: str = None, tags: Optional[str] = None):
     name = _query_user_if_none(name, "Brief name: ")
     keys = _query_user_if_none(keys, "Brief keys: ")
     brief = Brief(name, keys, tags=tags)
+    pd.append_to_journal(brief)
+
+
+@argh.named("add-batch")
+def add_batch(path: str):
+    """Add the entries in the file with ``name<tab>keys<tab>tags`` rows, "-" for stdin.
+
+    The tags are optional and separated by commas.
+    """
+    if path == "-":
+        report = pd.add_batch(sys.stdin)
+    else:
+        with open(path, "r") as f:
+            report = pd.add_batch(f)
+    print(f"Added {report.added} entries, skipped {len(report.skipped)}.")
+    for row, reason in report.skipped:
+        print(f"{row:<40} {reason}")
 
-    briefs = read_dict()
-    briefs.sort()
-    pd.add_to_dict(brief, briefs)
 
-    pd.save_dict_to_file(briefs)
+def compact():
+    """ Fold the recently added entries into the sorted dictionary. """
+    pd.compact_dict()
+
+
+@argh.named("import")
+@argh.arg("-t", "--tags", nargs="+")
+def import_dict(path: str, tags: Optional[str] = None, errors: Optional[str] = None):
+    """Import a Plover JSON or RTF/CRE dictionary.
+
+    Entries that cannot be stored are listed, or written to the ``errors`` file.
+    """
+    report = plover.import_dict(Path(path), tags=tags)
+    print(f"Imported {report.imported} entries, skipped {len(report.bad)}.")
+
+    if errors is not None:
+        with open(errors, "w") as f:
+            f.writelines(
+                f"{b.stroke}\t{b.translation}\t{b.reason}\n" for b in report.bad
+            )
+    else:
+        for b in report.bad:
+            print(f"{b.stroke:<20} {b.translation:<20} {b.reason}")
+
+
+def export(path: str, incremental: bool = False):
+    """Export the dictionary as a Plover JSON dictionary.
+
+    With ``--incremental`` only the entries changed since the last incremental export
+    are written, if possible.
+    """
+    report = plover.export_dict(Path(path), incremental=incremental)
+    print(f"Export {report.mode}, wrote {report.written} entries.")
+
+
+@argh.named("audit")
+def audit_dict():
+    """ Report stroke conflicts, shorthand aliases and prefix collisions. """
+    with stage("load"):
+        compiled = load_compiled()
+    with stage("audit"):
+        report = audit.audit(compiled)
+    with stage("format"):
+        lines = audit.format_report(compiled, report)
+    print("\n".join(lines))
+
+
+def generate(size: int, output: str = "-", seed: Optional[int] = None):
+    """Write a random dictionary of ``size`` entries for load testing, "-" for stdout.
+
+    The same dictionary is written for each ``seed``.
+    """
+    if output == "-":
+        gen.write_dict(size, sys.stdout, seed)
+    else:
+        with open(output, "w") as f:
+            gen.write_dict(size, f, seed)
 
 
 @argh.aliases("all")
 def print_all():
     """ Print all of the words in the dictionary and then exit. """
-    briefs = read_dict()
-    print(brief_grid(briefs))
+    with stage("load"):
+        compiled = load_compiled()
+    write_grid(compiled.brief(i) for i in compiled.ids())
+
+
+def serve():
+    """ Run the lookup daemon, keeping the dictionary in memory between queries. """
+    print(f"Listening on {daemon.socket_path()}")
+    daemon.serve()
+
+
+def _search(query: str, *args: str) -> List[Brief]:
+    """ The ``Brief``s matching the query. """
+    lines = daemon.lookup(query, *args)
+    with stage("parse"):
+        return [pd._line_to_brief(l) for l in lines]
 
 
 def _query_user_if_none(string: Optional[str], message=str) -> str:
@@ -98,17 +242,35 @@ def _wait_if(block: Optional[bool] = False):
         matches_tag(*args, block=True)
 
 
-def _get_tags(user_dict: Path):
-    """ Get the tags from the dict."""
-    tags = run(["awk", "-F	", "$4 && NR>1 { print $4 }", user_dict], stdout=PIPE)
-    tags = _decode_stdout(tags)
-    return set(tags.split("\n"))
-
+def main(argv: Optional[List[str]] = None):
+    import backtrace
 
-def _decode_stdout(selection) -> str:
-    """ Return the stdout as a string. """
-    return selection.stdout.decode("utf8").strip("\r\n")
+    backtrace.hook(align=True, strip_path=True)
+    argv = sys.argv[1:] if argv is None else argv
+    argv, destination = profiling.options(argv)
+    with profiling.session(argv, destination):
+        argh.dispatch_commands(
+            [
+                contains,
+                starting_with,
+                matches_tag,
+                lookup_stroke,
+                misstroke,
+                fuzzy,
+                keys,
+                add,
+                add_batch,
+                compact,
+                import_dict,
+                export,
+                audit_dict,
+                generate,
+                print_all,
+                serve,
+            ],
+            argv=argv,
+        )
 
 
 if __name__ == "__main__":
-    argh.dispatch_commands([contains, starting_with, matches_tag, add, print_all])
+    main()
@@ -1,8 +1,16 @@
 #!/usr/bin/env python
-from typing import Optional, Iterable, Dict, List
+from typing import Optional, Iterable, Iterator, Dict, List, NamedTuple, Set, Tuple
+from array import array
+from contextlib import ExitStack, contextmanager
+from multiprocessing import Pool
 from pathlib import Path
 from steno_summary.brief_info import Brief
+from steno_summary.profiling import stage
 import bisect
+import fcntl
+import heapq
+import io
+import os
 
 """ Read and write to the user dictionary.
 
@@ -11,19 +19,189 @@ course, we could use pandas to parse the tsv, but for now we keep the data store
 classes rather than a dataframe. Hypothetically, this may lead to slower performance but
 I cannot see this becoming a noticable problem for now.
 
+Journal
+-------
+
+Rewriting the whole file for every new entry is slow for large dictionaries, so new
+entries are appended to a journal next to the dictionary (``user_dict.tsv.journal``)
+and merged with the dictionary when it is read. The compiled dictionary is built from
+the dictionary alone, with the journal searched alongside it (see ``compiled_dict``),
+so adding an entry does not recompile the dictionary. Once the journal holds
+``compact_threshold`` entries, or ``compact_dict`` is called, the entries are folded into
+the sorted dictionary and the journal is emptied. The journal is locked while it is
+read or written so that several processes may add entries at once.
+
+Batches
+-------
+
+Many entries may be added at once with ``add_batch``. The keys column is read into a set
+to check for duplicates, the new entries are sorted once and then merged with the lines
+of the sorted dictionary in a single pass, without parsing the existing entries, before
+the dictionary is written once.
+
+Parallel Reading
+----------------
+
+Dictionaries larger than ``parallel_threshold`` are parsed in a process pool. The file
+is split into byte ranges that end on a line break, and each worker parses and sorts the
+lines of its range. Rather than pickling the ``Brief``s, the worker returns compact
+``ChunkRecords``: the names, keys and tags along with the stroke masks in a single
+array. The sorted records of each range are then merged by name and the ``Brief``s are
+built from the masks, without parsing the keys again.
+
 """
 
+compact_threshold = 64
+dict_header = "# Names\tKeys\tCannonical\tTags\n"
+# Size of the dictionary file, in bytes, above which it is parsed in parallel
+parallel_threshold = 4 * 2 ** 20
+# Number of byte ranges given to each process, so that a slow range is balanced out
+chunks_per_process = 4
+
+
+class BatchReport(NamedTuple):
+    """ Number of entries added by a batch, and the rows skipped with the reason. """
+
+    added: int
+    skipped: List[Tuple[str, str]]
 
-def read_dict(dict_location: Optional[Path] = None) -> Iterable[Brief]:
-    """ Read the dictionary from file. """
+
+class ChunkRecords(NamedTuple):
+    """ Sorted entries parsed from part of the dictionary, see the module notes. """
+
+    names: List[str]
+    keys: List[str]
+    tags: List[Tuple[str, ...]]
+    # Masks of the strokes of each entry in turn, with the number for each entry
+    strokes: array
+    counts: array
+
+
+def read_dict(
+    dict_location: Optional[Path] = None,
+    processes: Optional[int] = None,
+    journal: bool = True,
+) -> Iterable[Brief]:
+    """Read the dictionary, along with any entries in the journal, from file.
+
+    The dictionary is parsed over ``processes``, by default one for each core if the
+    file is larger than ``parallel_threshold`` or otherwise parsed in this process. The
+    journal is left out if ``journal`` is false.
+    """
     dict_path = _validate_path(dict_location)
+    if processes is None:
+        large = dict_path.stat().st_size > parallel_threshold
+        processes = (os.cpu_count() or 1) if large else 1
+    if processes > 1:
+        return _read_dict_parallel(dict_path, processes, journal)
 
-    with open(dict_path, "r") as f:
-        # Skip the header
-        briefs = [_line_to_brief(l) for l in f.readlines() if is_valid(l)]
+    with stage("read"):
+        lines = _read_lines(dict_path, journal)
+    with stage("parse"):
+        briefs = [_line_to_brief(l) for l in lines if is_valid(l)]
 
     # Remove the None lines from comments
-    return sorted(briefs)
+    with stage("sort"):
+        return sorted(briefs)
+
+
+def _read_dict_parallel(
+    dict_path: Path, processes: int, journal: bool = True
+) -> List[Brief]:
+    """ Parse the dictionary in a process pool, see the module notes. """
+    journal_lines: List[str] = []
+    with ExitStack() as stack:
+        # Hold the journal lock, as in ``_read_lines``, until the workers have finished
+        if journal and journal_path(dict_path).is_file():
+            journal = stack.enter_context(
+                _locked_journal(dict_path, "r", fcntl.LOCK_SH)
+            )
+            journal_lines = journal.readlines()
+
+        ranges = _chunk_ranges(dict_path, processes * chunks_per_process)
+        with stage("parse"), Pool(processes) as pool:
+            records = pool.starmap(_parse_chunk, [(dict_path, s, e) for s, e in ranges])
+
+    records.append(_parse_lines(journal_lines))
+    with stage("merge"):
+        runs = [_record_briefs(r) for r in records]
+        return list(heapq.merge(*runs, key=lambda b: b.name))
+
+
+def _chunk_ranges(dict_path: Path, n_chunks: int) -> List[Tuple[int, int]]:
+    """ Split the file into about ``n_chunks`` byte ranges, each ending a line. """
+    size = dict_path.stat().st_size
+    bounds = [0]
+    with open(dict_path, "rb") as f:
+        for n in range(1, n_chunks):
+            f.seek(max(size * n // n_chunks, bounds[-1]))
+            f.readline()
+            if bounds[-1] < f.tell() < size:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _parse_chunk(dict_path: Path, start: int, end: int) -> ChunkRecords:
+    """ Parse the lines in the byte range of the dictionary. """
+    with open(dict_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode("utf8")
+    # Split the lines as when reading the whole file in text mode
+    return _parse_lines(io.StringIO(data, newline=None).readlines())
+
+
+def _parse_lines(lines: List[str]) -> ChunkRecords:
+    """ The records of the lines of the dictionary, sorted by name. """
+    briefs = [_line_to_brief(l) for l in lines if is_valid(l)]
+    briefs.sort(key=lambda b: b.name)
+    records = ChunkRecords([], [], [], array("I"), array("I"))
+    for b in briefs:
+        records.names.append(b.name)
+        records.keys.append(b.keys_full)
+        records.tags.append(b.tags)
+        records.strokes.extend(b.strokes)
+        records.counts.append(len(b))
+    return records
+
+
+def _record_briefs(records: ChunkRecords) -> Iterator[Brief]:
+    """ Build the ``Brief``s from the records, in order. """
+    offset = 0
+    for name, keys, tags, count in zip(*records[:3], records.counts):
+        strokes = records.strokes[offset : offset + count]
+        offset += count
+        yield Brief.from_strokes(name, keys, strokes, tags)
+
+
+def journal_path(dict_path: Path) -> Path:
+    """ Location of the journal for the dictionary. """
+    return dict_path.with_name(dict_path.name + ".journal")
+
+
+def _read_lines(dict_path: Path, journal: bool = True) -> List[str]:
+    """ Lines of the dictionary followed by the lines of the journal, if given. """
+    if not journal or not journal_path(dict_path).is_file():
+        with open(dict_path, "r") as f:
+            return f.readlines()
+
+    with _locked_journal(dict_path, "r", fcntl.LOCK_SH) as journal:
+        with open(dict_path, "r") as f:
+            lines = f.readlines()
+        return lines + journal.readlines()
+
+
+@contextmanager
+def _locked_journal(
+    dict_path: Path, mode: str = "a+", lock: int = fcntl.LOCK_EX
+) -> Iterator:
+    """ Open the journal while holding a lock on it. """
+    with open(journal_path(dict_path), mode) as f:
+        fcntl.flock(f, lock)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
 
 
 def is_valid(line: str) -> bool:
@@ -88,11 +266,135 @@ def add_to_dict(brief: Brief, briefs=List[Brief]):
     return
 
 
+def append_to_journal(brief: Brief, dict_location: Optional[Path] = None):
+    """Add the entry to the journal of the dictionary.
+
+    Duplicates are checked against the keys of the compiled dictionary, found by their
+    strokes, along with the journal. The journal is compacted once it reaches
+    ``compact_threshold`` entries.
+    """
+    from steno_summary.compiled_dict import load_compiled
+
+    if not isinstance(brief, Brief):
+        raise TypeError("brief should be of type Brief")
+    dict_path = _validate_path(dict_location)
+
+    with _locked_journal(dict_path) as journal:
+        journal.seek(0)
+        journal_lines = [l for l in journal.readlines() if is_valid(l)]
+        # The journal is already read under this lock, so only the compiled entries
+        compiled = load_compiled(dict_path, journal=False)
+        keys = {compiled.keys(i) for i in compiled.stroke_index.search(brief.strokes)}
+        keys |= _keys_in_lines(journal_lines)
+        if brief.keys_full in keys:
+            raise ValueError(f"Keys for already in collection: {brief.tsv}")
+
+        journal.write(brief.tsv)
+        journal.flush()
+        if len(journal_lines) + 1 >= compact_threshold:
+            _compact(dict_path, journal)
+
+
+def add_batch(rows: Iterable[str], dict_location: Optional[Path] = None) -> BatchReport:
+    """Add the rows to the dictionary, each given as ``name<tab>keys[<tab>tags]``.
+
+    The tags are separated by commas. Rows that cannot be parsed, or whose keys are
+    already in the dictionary, are skipped. Any entries in the journal are merged into
+    the dictionary at the same time.
+    """
+    dict_path = _validate_path(dict_location)
+    with _locked_journal(dict_path) as journal:
+        journal.seek(0)
+        journal_lines = [l for l in journal.readlines() if is_valid(l)]
+        with open(dict_path, "r") as f:
+            dict_lines = [l for l in f.readlines() if is_valid(l)]
+        keys = _keys_in_lines(dict_lines) | _keys_in_lines(journal_lines)
+
+        new_lines = []
+        skipped = []
+        for row in rows:
+            if not is_valid(row) or not row.strip():
+                continue
+            try:
+                brief = _row_to_brief(row)
+            except ValueError as e:
+                skipped.append((row.rstrip("\n"), str(e)))
+                continue
+            if brief.keys_full in keys:
+                skipped.append((row.rstrip("\n"), "already in dict"))
+                continue
+            keys.add(brief.keys_full)
+            new_lines.append(brief.tsv)
+
+        if not new_lines:
+            return BatchReport(0, skipped)
+
+        added = len(new_lines)
+        new_lines.extend(journal_lines)
+        new_lines.sort(key=_line_name)
+        # The dictionary is kept sorted, but may have been edited by hand
+        names = [_line_name(l) for l in dict_lines]
+        if any(a > b for a, b in zip(names, names[1:])):
+            dict_lines.sort(key=_line_name)
+        with open(dict_path, "w") as f:
+            f.write(dict_header)
+            for line in heapq.merge(dict_lines, new_lines, key=_line_name):
+                f.write(line if line.endswith("\n") else line + "\n")
+        journal.truncate(0)
+    return BatchReport(added, skipped)
+
+
+def _row_to_brief(row: str) -> Brief:
+    """ Convert a row of a batch, with the name, keys and tags, into a Brief. """
+    chunks = row.strip(" \n\r\t").split("\t")
+    if not 2 <= len(chunks) <= 3:
+        raise ValueError(f"Expected 2 or 3 entries in row but found {len(chunks)}.")
+    tags = chunks[2].strip(" ,").split(",") if len(chunks) == 3 else []
+    return Brief(name=chunks[0], keys=chunks[1], tags=[t.strip() for t in tags if t])
+
+
+def _line_name(line: str) -> str:
+    """ The name column of the line, which the dictionary is sorted on. """
+    return line.split("\t", 1)[0]
+
+
+def compact_dict(dict_location: Optional[Path] = None):
+    """ Fold the entries in the journal into the sorted dictionary. """
+    dict_path = _validate_path(dict_location)
+    with _locked_journal(dict_path) as journal:
+        _compact(dict_path, journal)
+
+
+def _compact(dict_path: Path, journal):
+    """ Merge the locked journal into the dictionary and empty it. """
+    journal.seek(0)
+    journal_lines = journal.readlines()
+    if not any(is_valid(l) for l in journal_lines):
+        return
+
+    with open(dict_path, "r") as f:
+        lines = f.readlines()
+    briefs = sorted(_line_to_brief(l) for l in lines + journal_lines if is_valid(l))
+    save_dict_to_file(briefs, dict_path)
+    journal.truncate(0)
+
+
+def _keys_in_lines(lines: Iterable[str]) -> Set[str]:
+    """ The keys column of the lines, without parsing the entries. """
+    keys = set()
+    for line in lines:
+        if is_valid(line):
+            chunks = line.split("\t", 2)
+            if len(chunks) > 1:
+                keys.add(chunks[1].strip(" \n\r"))
+    return keys
+
+
 def save_dict_to_file(brief_list: List[Brief], save_path: Optional[Path] = None):
     """ Save the directory to file. """
     save_path = _validate_path(save_path)
     with open(save_path, "w") as f:
-        f.writelines("# Names\tKeys\tCannonical\tTags\n")
+        f.writelines(dict_header)
         f.writelines([b.tsv for b in brief_list])
 
 
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, TextIO
+from typing import Tuple
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+
+from steno_summary import letters
+from steno_summary import parse_dict as pd
+from steno_summary.compiled_dict import CompiledDict, load_compiled
+
+""" Import and export dictionaries from Plover.
+
+Outline
+-------
+
+Plover dictionaries map strokes, given in steno notation, to their translation. Both
+the JSON and the RTF/CRE formats are read a piece at a time, so that dictionaries with
+hundreds of thousands of entries are not held in memory while they are read.
+
+The dictionary has no shorthand for imported strokes, so the keys are written out one
+at a time with a "-" before the right hand keys, eg "TPHOE" is given the keys "TPHO-E".
+Each key is a letter in ``letters`` that is placed on the same side of the keyboard, so
+the ``Brief`` gives back the original stroke. Strokes without left hand keys start with
+the "-", eg "*E" is given as "-*E".
+
+Entries that cannot be stored are collected and reported rather than stopping the
+import.
+
+Export
+------
+
+The dictionary is written as a Plover JSON dictionary, with the strokes in steno
+notation (see ``letters.stroke_to_steno``). Where several entries share a stroke only the
+first, in dictionary order, is exported as Plover would otherwise keep the last.
+
+In incremental mode a small state file is kept next to the export, holding the digest
+of the entries (see ``CompiledDict.digest``) along with a sorted hash of every exported
+entry. If the dictionary is unchanged nothing is written, and if entries have only been
+added they are appended to the end of the existing file. Otherwise the export is
+rewritten.
+"""
+
+re_rtf_entry = re.compile(r"\{\\\*\\cxs ([^}]*)\}(.*)")
+re_rtf_escape = re.compile(r"\\([\\{}])")
+
+batch_size = 4096
+
+state_magic = b"STENOEXP"
+state_fmt = struct.Struct("=8s32sQ")
+json_end = b"\n}\n"
+
+
+class BadEntry(NamedTuple):
+    """ An entry that could not be imported, along with the reason. """
+
+    stroke: str
+    translation: str
+    reason: str
+
+
+class ImportReport(NamedTuple):
+    """ Summary of the entries added to the dictionary. """
+
+    imported: int
+    bad: List[BadEntry]
+
+
+class ExportReport(NamedTuple):
+    """Summary of the entries written by an export.
+
+    The mode is one of "unchanged", "appended" or "rewritten".
+    """
+
+    written: int
+    mode: str
+
+
+class _ExportState(NamedTuple):
+    """ The source and entries of the previous export. """
+
+    digest: bytes
+    size: int
+    hashes: array
+
+
+def import_dict(
+    source: Path,
+    dict_location: Optional[Path] = None,
+    tags: Optional[List[str]] = None,
+) -> ImportReport:
+    """Add the entries of a Plover dictionary to the user dictionary.
+
+    The entries are validated in batches and appended to the journal, which is then
+    compacted into the dictionary once.
+    """
+    dict_path = pd._validate_path(dict_location)
+    tag_column = ",".join(tags) if tags else ""
+    imported = 0
+    bad: List[BadEntry] = []
+
+    with open(source, "r", encoding="utf-8-sig") as f:
+        entries = iter_entries(f, source.suffix.lower())
+        with pd._locked_journal(dict_path) as journal:
+            journal.seek(0)
+            with open(dict_path, "r") as d:
+                existing = pd._keys_in_lines(d) | pd._keys_in_lines(journal)
+
+            for batch in _batches(entries, batch_size):
+                lines = []
+                for stroke, translation in batch:
+                    try:
+                        keys, cannonical = validate_entry(stroke, translation)
+                    except ValueError as e:
+                        bad.append(BadEntry(stroke, translation, str(e)))
+                        continue
+                    if keys in existing:
+                        bad.append(BadEntry(stroke, translation, "already in dict"))
+                        continue
+                    existing.add(keys)
+                    lines.append(f"{translation}\t{keys}\t{cannonical}\t{tag_column}\n")
+                journal.writelines(lines)
+                imported += len(lines)
+
+            journal.flush()
+            pd._compact(dict_path, journal)
+
+    return ImportReport(imported, bad)
+
+
+def iter_entries(f: TextIO, suffix: str) -> Iterator[Tuple[str, str]]:
+    """ Stroke and translation pairs of the dictionary, with the format from suffix. """
+    if suffix == ".json":
+        return iter_json(f)
+    if suffix in (".rtf", ".cre"):
+        return iter_rtf(f)
+    raise ValueError(f"Unknown dictionary format {suffix}, expected json, rtf or cre.")
+
+
+def validate_entry(stroke: str, translation: str) -> Tuple[str, str]:
+    """Give the keys and the cannonical stroke for the entry.
+
+    A ``ValueError`` is raised if the entry is not able to be stored.
+    """
+    if not translation:
+        raise ValueError("empty translation")
+    if any(c in translation for c in "\t\n\r"):
+        raise ValueError("translation contains a tab or new line")
+    # The dictionary lines are stripped and those starting with "#" are comments
+    if translation != translation.strip():
+        raise ValueError("translation has leading or trailing whitespace")
+    if translation.startswith("#"):
+        raise ValueError("translation starts with #")
+
+    strokes = letters.parse_strokes(stroke)
+    if any(s & letters.number_mask for s in strokes):
+        raise ValueError("number bar is not supported")
+
+    keys = "/".join(stroke_to_keys(s) for s in strokes)
+    cannonical = "/".join(letters.stroke_to_string(s) for s in strokes)
+    return keys, cannonical
+
+
+def stroke_to_keys(mask: int) -> str:
+    """ Shorthand keys for the stroke, placing each key on the correct hand. """
+    left = letters.mask_to_keys(mask, letters.left_key_masks)
+    right = letters.mask_to_keys(mask, letters.right_key_masks)
+
+    left_keys = "".join(k for k in letters.left_order if k in left)
+    right_keys = "".join(k for k in letters.right_order if k in right)
+    star = "*" if mask & letters.star_mask else ""
+
+    # The shorthand must start with a letter or a dash
+    if not left_keys:
+        return "-" + star + right_keys
+    return left_keys + star + ("-" + right_keys if right_keys else "")
+
+
+def iter_json(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, str]]:
+    """ Read the pairs of a JSON dictionary, reading ``chunk_size`` characters at once. """
+    stream = _JsonStream(f, chunk_size)
+    stream.expect("{")
+    if stream.next_char() == "}":
+        return
+    while True:
+        stroke = stream.string()
+        stream.expect(":")
+        translation = stream.string()
+        yield stroke, translation
+        if stream.expect(",}") == "}":
+            return
+
+
+def iter_rtf(f: TextIO) -> Iterator[Tuple[str, str]]:
+    """Read the pairs of a RTF/CRE dictionary a line at a time.
+
+    Only the escaped braces and backslashes of the translation are converted, any other
+    RTF commands are kept as they are.
+    """
+    for line in f:
+        match = re_rtf_entry.match(line)
+        if match is None:
+            continue
+        stroke, translation = match.groups()
+        translation = re_rtf_escape.sub(r"\1", translation.rstrip())
+        yield stroke, translation
+
+
+class _JsonStream:
+    """ Buffered reader for the tokens of a flat JSON object. """
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, f: TextIO, chunk_size: int):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+
+    def next_char(self) -> str:
+        """ The next character that isn't whitespace, without consuming it. """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """ Consume the next character, which must be one of ``chars``. """
+        char = self.next_char()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of '{chars}' in JSON but found '{char}'")
+        self._pos += 1
+        return char
+
+    def string(self) -> str:
+        """ Consume the next JSON string. """
+        if self.next_char() != '"':
+            raise ValueError("Expected a string in JSON")
+        while True:
+            try:
+                value, self._pos = self.decoder.raw_decode(self._buffer, self._pos)
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise ValueError("Unterminated string in JSON")
+
+    def _fill(self) -> bool:
+        """ Read the next chunk, dropping the consumed part of the buffer. """
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    """ Split the items into lists of up to ``size`` items. """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_dict(
+    output: Path, dict_location: Optional[Path] = None, incremental: bool = False
+) -> ExportReport:
+    """Write the dictionary to ``output`` as a Plover JSON dictionary.
+
+    With ``incremental`` only the changes since the last incremental export are written
+    where possible, see the module notes.
+    """
+    compiled = load_compiled(dict_location)
+    state_path = output.with_name(output.name + ".state")
+    state = _read_state(state_path, output) if incremental else None
+    if state is not None and state.digest == compiled.digest:
+        return ExportReport(0, "unchanged")
+
+    if state is None or not state.hashes:
+        with _atomic_output(output) as f:
+            hashes = write_json(f, export_entries(compiled))
+        report = ExportReport(len(hashes), "rewritten")
+    else:
+        previous = set(state.hashes)
+        hashes = array("Q")
+        added = []
+        for entry in export_entries(compiled):
+            entry_hash = _entry_hash(*entry)
+            hashes.append(entry_hash)
+            if entry_hash not in previous:
+                added.append(entry)
+
+        if len(hashes) - len(added) < len(previous):
+            with _atomic_output(output) as f:
+                hashes = write_json(f, export_entries(compiled))
+            report = ExportReport(len(hashes), "rewritten")
+        elif added:
+            _append_json(output, state.size, added)
+            report = ExportReport(len(added), "appended")
+        else:
+            report = ExportReport(0, "unchanged")
+
+    if incremental:
+        _write_state(state_path, compiled.digest, output.stat().st_size, hashes)
+    return report
+
+
+def export_entries(compiled: CompiledDict) -> Iterator[Tuple[str, str]]:
+    """ Strokes in steno notation and the name of each entry, skipping repeated strokes. """
+    seen = set()
+    for i in compiled.ids():
+        strokes = compiled.strokes(i)
+        if strokes in seen:
+            continue
+        seen.add(strokes)
+        yield "/".join(letters.stroke_to_steno(s) for s in strokes), compiled.name(i)
+
+
+def write_json(f: BinaryIO, entries: Iterable[Tuple[str, str]]) -> array:
+    """Stream the entries to the file as a JSON object with one entry on each line.
+
+    The hashes of the entries are returned so that later exports are able to compare.
+    """
+    hashes = array("Q")
+    f.write(b"{")
+    separator = b"\n"
+    for stroke, translation in entries:
+        f.write(separator + _json_line(stroke, translation))
+        separator = b",\n"
+        hashes.append(_entry_hash(stroke, translation))
+    f.write(json_end)
+    return hashes
+
+
+def _append_json(output: Path, size: int, entries: List[Tuple[str, str]]):
+    """ Add the entries to the end of a non-empty export, in place. """
+    with open(output, "r+b") as f:
+        f.seek(size - len(json_end))
+        if f.read() != json_end:
+            raise ValueError(f"{output} does not end as expected for an export.")
+        f.seek(size - len(json_end))
+        f.truncate()
+        for stroke, translation in entries:
+            f.write(b",\n" + _json_line(stroke, translation))
+        f.write(json_end)
+
+
+def _json_line(stroke: str, translation: str) -> bytes:
+    """ A single entry of the JSON export. """
+    line = f"{json.dumps(stroke)}: {json.dumps(translation, ensure_ascii=False)}"
+    return line.encode("utf8")
+
+
+def _entry_hash(stroke: str, translation: str) -> int:
+    """ Hash of the exported entry that is stable between runs. """
+    digest = hashlib.blake2b(f"{stroke}\t{translation}".encode("utf8"), digest_size=8)
+    return int.from_bytes(digest.digest(), "little")
+
+
+def _read_state(state_path: Path, output: Path) -> Optional[_ExportState]:
+    """The state of the previous export.
+
+    ``None`` is given if there is no state, or the export has been changed since it was
+    written, in which case the export is rewritten.
+    """
+    try:
+        data = state_path.read_bytes()
+        size = output.stat().st_size
+    except FileNotFoundError:
+        return None
+    if len(data) < state_fmt.size:
+        return None
+    magic, digest, state_size = state_fmt.unpack_from(data)
+    if magic != state_magic or state_size != size:
+        return None
+    hashes = array("Q")
+    hashes.frombytes(data[state_fmt.size :])
+    return _ExportState(digest, state_size, hashes)
+
+
+def _write_state(state_path: Path, digest: bytes, size: int, hashes: array):
+    """ Record the state of the export, replacing any previous state atomically. """
+    with _atomic_output(state_path) as f:
+        f.write(state_fmt.pack(state_magic, digest, size))
+        f.write(array("Q", sorted(hashes)).tobytes())
+
+
+@contextmanager
+def _atomic_output(path: Path) -> Iterator[BinaryIO]:
+    """ Binary file that replaces ``path`` once closed without an error. """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+from contextlib import contextmanager
+import os
+import sys
+import time
+
+""" Time each stage of a command.
+
+Outline
+-------
+
+The work of a command is split into stages, such as reading the dictionary, parsing the
+entries, filtering and rendering, each of which is wrapped in ``stage``. Stages may be
+nested, so the stages are named by their path, eg ``lookup/load/read``, and a stage
+that is entered several times is summed.
+
+Profiling is enabled with ``--profile`` on any command, or by setting ``STENO_PROFILE``
+to the destination of the results:
+
+    --profile               print a summary to stderr, as does any other value of
+                            ``STENO_PROFILE`` such as "1"
+    --profile=FILE.json     append the results as a single line of JSON, so that the
+                            results of many runs may be collected in one file
+    --profile=FILE.prof     run under ``cProfile`` and dump the stats, along with the
+                            summary
+
+Along with the wall time, the growth of the heap over each stage is recorded as the
+change in the number of memory blocks held by the interpreter, from
+``sys.getallocatedblocks``. This is not a count of the allocations: blocks that are
+freed within the stage are not seen, and a stage that frees more than it keeps, such as
+one that drops a large list, shows a negative growth.
+
+Other modules may give stats to be included once the command has finished, such as the
+hit rate of a cache, with ``add_stats``.
+
+Notes
+-----
+
+When profiling is disabled ``stage`` only checks a global, so stages may be left in
+place around any work that takes more than a few microseconds.
+"""
+
+profile_env = "STENO_PROFILE"
+profile_flag = "--profile"
+
+
+class StageStats(NamedTuple):
+    """ Total wall time and heap growth, in blocks, of a stage over each time it ran. """
+
+    name: str
+    seconds: float
+    heap_growth: int
+    calls: int
+
+
+class Profile:
+    """ Stats of the stages run while the profile is active. """
+
+    def __init__(self, command: List[str]):
+        self.command = command
+        self.stats: Dict[str, StageStats] = {}
+        self.path: List[str] = []
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.extra: Dict[str, Dict[str, float]] = {}
+
+    def enter(self, name: str) -> str:
+        """ Enter the stage, giving its full name. """
+        self.path.append(name)
+        full_name = "/".join(self.path)
+        self.stats.setdefault(full_name, StageStats(full_name, 0.0, 0, 0))
+        return full_name
+
+    def exit(self, name: str, seconds: float, heap_growth: int):
+        """ Record a run of the stage, given by its full name. """
+        self.path.pop()
+        stats = self.stats[name]
+        self.stats[name] = StageStats(
+            name,
+            stats.seconds + seconds,
+            stats.heap_growth + heap_growth,
+            stats.calls + 1,
+        )
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start
+        self.extra = {name: source() for name, source in _stats_sources.items()}
+
+    def summary(self) -> List[str]:
+        """ Lines of a table of the stages, in the order they were first run. """
+        width = max([len(n) for n in self.stats] + [5])
+        lines = [f"{'stage':<{width}} {'ms':>10} {'heap growth':>12} {'calls':>6}"]
+        for s in self.stats.values():
+            ms = s.seconds * 1000
+            lines.append(
+                f"{s.name:<{width}} {ms:>10.2f} {s.heap_growth:>+12d} {s.calls:>6d}"
+            )
+        lines.append(f"{'total':<{width}} {self.seconds * 1000:>10.2f}")
+        for name, stats in self.extra.items():
+            lines.append(name + " " + " ".join(f"{k}={v}" for k, v in stats.items()))
+        return lines
+
+    def as_dict(self) -> Dict:
+        """ The results, as written to JSON. """
+        return {
+            "command": self.command,
+            "time": time.time(),
+            "seconds": self.seconds,
+            "stages": [s._asdict() for s in self.stats.values()],
+            "stats": self.extra,
+        }
+
+
+# Profile of the running command, if profiling is enabled
+_active: Optional[Profile] = None
+# Functions giving the extra stats to report, by name
+_stats_sources: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+
+def add_stats(name: str, source: Callable[[], Dict[str, float]]):
+    """ Report the stats given by ``source`` at the end of each profile. """
+    _stats_sources[name] = source
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """ Record the wall time and heap growth of the work within the context. """
+    profile = _active
+    if profile is None:
+        yield
+        return
+
+    name = profile.enter(name)
+    blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        profile.exit(name, seconds, sys.getallocatedblocks() - blocks)
+
+
+def options(argv: List[str]) -> Tuple[List[str], Optional[str]]:
+    """Remove the ``--profile`` option from the arguments, giving its destination.
+
+    The destination is an empty string when the summary is printed, or ``None`` when
+    profiling is disabled.
+    """
+    destination = os.environ.get(profile_env) or None
+    remaining = []
+    for arg in argv:
+        if arg == profile_flag:
+            destination = ""
+        elif arg.startswith(profile_flag + "="):
+            destination = arg.partition("=")[2]
+        else:
+            remaining.append(arg)
+    return remaining, destination
+
+
+@contextmanager
+def session(
+    command: List[str], destination: Optional[str], stream: Optional[TextIO] = None
+) -> Iterator[Optional[Profile]]:
+    """Profile the command run within the context, reporting to the destination.
+
+    Nothing is done if profiling is disabled, or if a session is already running.
+    """
+    global _active
+    if destination is None or _active is not None:
+        yield None
+        return
+
+    profiler = None
+    if destination.endswith(".prof"):
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    _active = profile = Profile(command)
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield profile
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        profile.finish()
+        _active = None
+        _report(profile, destination, profiler, stream)
+
+
+def _report(profile: Profile, destination: str, profiler, stream: Optional[TextIO]):
+    """ Write the results of the profile to the destination, see the module notes. """
+    if destination.endswith(".json"):
+        import json
+
+        with open(destination, "a") as f:
+            f.write(json.dumps(profile.as_dict()) + "\n")
+        return
+
+    if profiler is not None:
+        profiler.dump_stats(destination)
+    stream = stream if stream is not None else sys.stderr
+    stream.write("\n".join(profile.summary()) + "\n")
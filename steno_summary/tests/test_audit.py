@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import unittest
+from pathlib import Path
+import tempfile
+
+from steno_summary import audit
+from steno_summary import compiled_dict as cd
+
+dict_lines = [
+    "#Word\tSummary\tCannonical\tTags\n",
+    "Do\tDO\n",
+    "Doing\tDO/-G\n",
+    "Know\tNOE\n",
+    "Now\tNOE\n",
+    "Now\tTPHOE\n",
+    "Think\tThI\n",
+    "Would\tWOU\n",
+]
+
+
+class TestAudit(unittest.TestCase):
+    def setUp(self):
+        """ Compile a dictionary with each kind of problem. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        dict_path = Path(self.tmp_dir.name) / "audit_dict.tsv"
+        dict_path.write_text("".join(dict_lines))
+        self.compiled = cd.load_compiled(dict_path)
+        self.report = audit.audit(self.compiled)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def names(self, ids):
+        return [self.compiled.name(i) for i in ids]
+
+    def test_conflicts(self):
+        """ Strokes giving more than one word are reported. """
+        conflicts = [self.names(g.ids) for g in self.report.conflicts]
+        self.assertEqual(conflicts, [["Know", "Now", "Now"]])
+
+    def test_aliases(self):
+        """ Different shorthand for the same stroke is reported. """
+        self.assertEqual(len(self.report.aliases), 1)
+        keys = [self.compiled.keys(i) for i in self.report.aliases[0].ids]
+        self.assertEqual(sorted(keys), ["NOE", "NOE", "TPHOE"])
+
+    def test_prefixes(self):
+        """ Multi-stroke entries starting with another entry are reported. """
+        self.assertEqual(len(self.report.prefixes), 1)
+        collision = self.report.prefixes[0]
+        self.assertEqual(self.names(collision.ids), ["Do"])
+        self.assertEqual(self.compiled.name(collision.longer), "Doing")
+        self.assertEqual(audit.format_strokes(collision.prefix), "TKO")
+
+    def test_format(self):
+        lines = audit.format_report(self.compiled, self.report)
+        self.assertIn("Stroke conflicts (1)", lines)
+        self.assertIn("  TKO/-G               Doing starts with TKO (Do)", lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
 import unittest
+from pathlib import Path
+import io
+import itertools
+import pickle
 import steno_summary.brief_info as b
 import steno_summary.letters as l
 from parameterized import parameterized
@@ -31,8 +35,8 @@ class TestBrief(unittest.TestCase):
         self.assertEqual(right_letter_expected, right_letter_actual)
 
     def test_valid_left(self):
-        word = b.Brief(name="", keys="")
-        word.left_letters = {"T", "K"}
+        word = b.StrokeBuilder()
+        word.stroke = l.keys_to_mask({"T", "K"}, l.left_key_masks)
 
         remaining_letters_expected = left_set - {"T", "K"}
         remaining_letters_test = word.remaining_left
@@ -41,8 +45,8 @@ class TestBrief(unittest.TestCase):
 
     def test_add_left_letter(self):
         """" Add a key to the array """
-        word = b.Brief(name="", keys="")
-        word._parse_key_stroke(l.n)
+        word = b.StrokeBuilder()
+        word.add(l.n)
 
         remaining_letters_expeceted = left_set - {"T", "H", "P"}
         remaining_letters_actual = word.remaining_left
@@ -51,49 +55,49 @@ class TestBrief(unittest.TestCase):
 
     def test_add_left_letter_mult(self):
         """" Add multiple keys to the array """
-        word = b.Brief(name="", keys="")
-        word._parse_key_stroke(l.f)
-        word._parse_key_stroke(l.v)
-        word._parse_key_stroke(l.o)
+        word = b.StrokeBuilder()
+        word.add(l.f)
+        word.add(l.v)
+        word.add(l.o)
 
         left_keys = {l for l in "TPSRO"}
         self.validate_missing(word, left_keys, set())
 
     def test_add_right_letter(self):
         """" Add a single right hand letter """
-        word = b.Brief(name="", keys="")
-        word._parse_key_stroke(l.e)
+        word = b.StrokeBuilder()
+        word.add(l.e)
         self.validate_missing(word, set(), {"E"})
 
     def test_add_right_mult(self):
         """" Add a right hand letter followed by an ambigious letter"""
-        word = b.Brief(name="", keys="")
-        word._parse_key_stroke(l.e)
-        word._parse_key_stroke(l.s)
+        word = b.StrokeBuilder()
+        word.add(l.e)
+        word.add(l.s)
 
         self.validate_missing(word, set(), {l for l in "ES"})
 
     def test_add_right_left(self):
         """" We should get an error on trying left key after right. """
-        word = b.Brief(name="", keys="")
-        word._parse_key_stroke(l.e)
-        word._parse_key_stroke(l.n)
+        word = b.StrokeBuilder()
+        word.add(l.e)
+        word.add(l.n)
         with self.assertRaises(ValueError):
-            word._parse_key_stroke(l.o)
+            word.add(l.o)
 
     def test_parse_dash(self):
         """ Providing a dash should starting parsing on the right side. """
-        word = b.Brief(name="", keys="")
-        word._parse_key_stroke("-")
-        word._parse_key_stroke(l.s)
+        word = b.StrokeBuilder()
+        word.add("-")
+        word.add(l.s)
 
         self.validate_missing(word, set(), {"S"})
 
     def test_parse_double(self):
         """ Parse the left and right stroke of a letter """
-        word = b.Brief(name="", keys="")
-        word._parse_key_stroke(l.n)
-        word._parse_key_stroke(l.n)
+        word = b.StrokeBuilder()
+        word.add(l.n)
+        word.add(l.n)
 
         self.validate_missing(word, {l for l in "TPH"}, {l for l in "PB"})
 
@@ -298,6 +302,63 @@ class TestGrid(unittest.TestCase):
 
         self.assertTrue(False)
 
+    def grid_briefs(self):
+        names = ["Think", "Now", "Function", "Yours", "Have", "Do", "Example", "Family"]
+        strokes = ["ThI", "NOE", "FUKS", "URS", "V", "DO", "EKS/AM/PL", "FAM"]
+        return [b.Brief(name, stroke) for name, stroke in zip(names, strokes)]
+
+    def test_grid_layout(self):
+        """ Multi-stroke briefs are given a row of their own when they don't fit. """
+        grid_test = b.brief_grid(self.grid_briefs(), width=80)
+        with open(Path(__file__).parent / "data/grid_80.txt") as f:
+            grid_expected = f.read()
+        self.assertEqual(grid_test, grid_expected)
+
+    @parameterized.expand([(40,), (80,), (200,)])
+    def test_write_grid(self, width):
+        """ The rows written to the stream match the full grid. """
+        stream = io.StringIO()
+        b.write_grid(self.grid_briefs(), stream, width)
+        grid_expected = b.brief_grid(self.grid_briefs(), width)
+        self.assertEqual(stream.getvalue(), grid_expected + "\n")
+
+    def test_rows_streamed(self):
+        """ Rows are given before the remaining briefs are read. """
+        rows = b.iter_grid(itertools.cycle(self.grid_briefs()), width=80)
+        self.assertEqual(next(rows).count("\n"), 5)
+        self.assertIn("Yours", next(rows))
+
+
+class TestStrokeRows(unittest.TestCase):
+    """ Drawing the keyboard from the stroke mask. """
+
+    def test_all_keys(self):
+        rows_test = b.stroke_rows(l.parse_stroke("STKPWHRAO*EUFRPBLGTSDZ"))
+        rows_expected = (
+            "S T P H *   F P L T D",
+            "S K W R *   R B G S Z",
+            "    A O     E U      ",
+        )
+        self.assertEqual(rows_test, rows_expected)
+
+    def test_no_keys(self):
+        rows_test = b.stroke_rows(0)
+        rows_expected = (
+            "▧ ▧ ▧ ▧     ▧ ▧ ▧ ▧ ▧",
+            "▧ ▧ ▧ ▧     ▧ ▧ ▧ ▧ ▧",
+            "    ▧ ▧     ▧ ▧      ",
+        )
+        self.assertEqual(rows_test, rows_expected)
+
+    @parameterized.expand([("Now", "NOE"), ("Have", "V"), ("Think", "ThI")])
+    def test_block(self, name, keys):
+        """ The block of the brief is drawn from its stroke. """
+        brief = b.Brief(name, keys)
+        block_expected = "\n".join(
+            [f"{name:^21}", f"{keys:^21}", *b.stroke_rows(brief.stroke)]
+        )
+        self.assertEqual(brief.block, block_expected)
+
 
 class TestBriefMultiple(unittest.TestCase):
     """ Parsing of multi-stroke briefs. """
@@ -326,6 +387,11 @@ class TestBriefMultiple(unittest.TestCase):
 
         self.assertEqual(starred, word.starred, msg=f"{word} failed")
 
+    def next_stroke(self, word: b.Brief) -> b.Brief:
+        """ The brief made from the remaining strokes of the brief. """
+        keys = word.keys_full.partition("/")[2]
+        return b.Brief.from_strokes("", keys, word.strokes[1:])
+
     def test_double_simple(self):
         """ Test the keys in a simple double brief. """
         word = b.Brief(name="Double", keys="T/-S")
@@ -334,7 +400,7 @@ class TestBriefMultiple(unittest.TestCase):
 
         self.validate_missing(word, left, right)
 
-        child = word.next_
+        child = self.next_stroke(word)
         self.validate_missing(child, set(), {l for l in "S"})
 
     def test_double_complex(self):
@@ -346,7 +412,7 @@ class TestBriefMultiple(unittest.TestCase):
 
         self.validate_missing(word, left, right, starred=True)
 
-        child = word.next_
+        child = self.next_stroke(word)
         self.validate_missing(child, set(), {"G"})
 
     def test_triple_stroke(self):
@@ -354,14 +420,71 @@ class TestBriefMultiple(unittest.TestCase):
         word = b.Brief(name="Double", keys="L-Th/-G/KWRO-NG")
         self.validate_missing(word, {l for l in "HR"}, {"T"}, starred=True)
 
-        word = word.next_
+        word = self.next_stroke(word)
         self.validate_missing(word, set(), {"G"}, starred=False)
 
-        word = word.next_
+        word = self.next_stroke(word)
         self.validate_missing(
             word, {l for l in "KWRO"}, {l for l in "PBG"}, starred=False
         )
 
+    @parameterized.expand([("-G",), ("L-Th/-G/KWRO-NG",), ("T/-S",), ("A/",)])
+    def test_from_strokes(self, keys):
+        """ Briefs built from the masks of their strokes match the parsed brief. """
+        word = b.Brief(name="Word", keys=keys, tags=["tag"])
+        built = b.Brief.from_strokes("Word", keys, word.strokes, ["tag"])
+
+        self.assertEqual(built.tsv, word.tsv)
+        self.assertEqual(built.strokes, word.strokes)
+        self.assertEqual(built.stroke_keys, word.stroke_keys)
+        self.assertEqual(len(built.stroke_keys), len(word))
+
+    def test_empty_stroke(self):
+        """ Strokes between the separators may not be empty. """
+        with self.assertRaises(ValueError):
+            b.Brief("None", "TPH//O")
+
+    @parameterized.expand([("/N",), ("A//B",), ("WK//",)])
+    def test_empty_stroke_cached(self, keys):
+        """ Keys with empty strokes are rejected each time, not taken from the cache. """
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                b.Brief("None", keys)
+
+    def test_parse_cache(self):
+        """ Repeated keys, and strokes, are taken from the cache. """
+        b.parse_keys.cache_clear()
+        b._parse_stroke.cache_clear()
+        first = b.Brief("Department", "DPARMent")
+        second = b.Brief("Departments", "DPARMent/-S")
+        third = b.Brief("Dept", "DPARMent")
+
+        info = b.parse_cache_info()
+        self.assertIs(first.strokes, third.strokes)
+        self.assertEqual(second.strokes[0], first.stroke)
+        self.assertEqual((info["keys_hits"], info["keys_misses"]), (1, 2))
+        self.assertEqual((info["stroke_hits"], info["stroke_misses"]), (1, 2))
+        self.assertEqual(info["keys_hit_rate"], 0.333)
+
+    def test_parse_cache_bounded(self):
+        self.assertEqual(b.parse_keys.cache_info().maxsize, b.parse_cache_size)
+        self.assertEqual(b._parse_stroke.cache_info().maxsize, b.parse_cache_size)
+
+    def test_immutable(self):
+        word = b.Brief(name="Double", keys="T/-S", tags=["alt"])
+        with self.assertRaises(AttributeError):
+            word.tags = ["single"]
+        with self.assertRaises(AttributeError):
+            word.cache = word.block
+        self.assertEqual(pickle.loads(pickle.dumps(word)).tsv, word.tsv)
+
+    def test_tags_shared(self):
+        """ Briefs with the same tags share the one tuple. """
+        first = b.Brief("Do", "DO", tags=["single", "alt"])
+        second = b.Brief("Now", "NOE", tags=["single", "alt"])
+        self.assertEqual(first.tags, ("single", "alt"))
+        self.assertIs(first.tags, second.tags)
+
     def test_single_len(self):
         """ Get the number of keys in single stroke. """
         word = b.Brief(name="Single", keys="-G")
@@ -385,3 +508,11 @@ class TestBriefMultiple(unittest.TestCase):
         n_strokes_expected = 3
 
         self.assertEqual(n_strokes_test, n_strokes_expected)
+
+    def test_stroke_masks(self):
+        """ Each stroke of the brief is given as a key mask. """
+        word = b.Brief(name="Double", keys="T/-S")
+        strokes_expected = (l.left_key_masks["T"], l.right_key_masks["S"])
+
+        self.assertEqual(word.strokes, strokes_expected)
+        self.assertEqual(word.cannonical, "T/-S")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+import unittest
+from pathlib import Path
+from subprocess import PIPE, run
+from typing import Dict
+import sys
+
+from parameterized import parameterized
+from steno_summary import cli
+
+# Time allowed to import the entry point for the common queries (microseconds)
+import_budget = 100_000
+
+
+class TestParseFast(unittest.TestCase):
+    """ Reading the simple queries that skip the manager. """
+
+    @parameterized.expand(
+        [
+            (["cont", "-s", "ent"], ("cont", "ent")),
+            (["contains", "--string=ent"], ("cont", "ent")),
+            (["start", "-s", "fo"], ("start", "fo", "")),
+            (["starting-with", "-l", "10", "-s", "fo"], ("start", "fo", "10")),
+            (["tag", "-t", "suffix & !punctuation"], ("tag", "suffix & !punctuation")),
+            (["lookup-stroke", "--stroke", "TPHOE"], ("stroke", "TPHOE")),
+            (["fuzzy", "-s", "tecnology"], ("fuzzy", "tecnology", "")),
+            (["misstroke", "--stroke", "TPHOE"], ("near", "TPHOE", "")),
+            (["keys", "-e", "*", "--right=PBG"], ("keys", "", "*", "", "PBG")),
+            (["keys", "--uses=-PBG"], ("keys", "-PBG", "", "", "")),
+            (["keys", "-l", "-", "-r", "PBG"], ("keys", "", "", "-", "PBG")),
+        ]
+    )
+    def test_fast(self, argv, request_expected):
+        """ Queries given in full are answered directly. """
+        self.assertEqual(cli.parse_fast(argv), request_expected)
+
+    @parameterized.expand(
+        [
+            ([],),
+            (["-h"],),
+            (["add", "-n", "Now"],),
+            (["cont"],),
+            (["cont", "-s"],),
+            (["cont", "-s", "ent", "-b"],),
+            (["cont", "-h"],),
+            (["start", "-s", "fo", "-l", "ten"],),
+            (["keys"],),
+            (["keys", "-u", "-PBG"],),
+            (["fuzzy", "-s", "now", "-d", "two"],),
+        ]
+    )
+    def test_manager(self, argv):
+        """ Anything else is left for the manager. """
+        self.assertIsNone(cli.parse_fast(argv))
+
+
+class TestStartup(unittest.TestCase):
+    """ Guard the time taken to start the common queries. """
+
+    def import_times(self, module: str) -> Dict[str, int]:
+        """ Cumulative import time of each module, in microseconds. """
+        result = run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            stderr=PIPE,
+            cwd=Path(__file__).parents[2],
+            check=True,
+        )
+        times = {}
+        for line in result.stderr.decode("utf8").splitlines()[1:]:
+            _, cumulative, name = line.split("|")
+            times[name.strip()] = int(cumulative)
+        return times
+
+    def test_deferred_imports(self):
+        """ The argument parser and dictionary are not needed to send a query. """
+        times = self.import_times("steno_summary.cli")
+        for module in ["argh", "backtrace", "steno_summary.compiled_dict"]:
+            self.assertNotIn(module, times)
+
+    def test_import_budget(self):
+        """ Importing the entry point stays within the budget. """
+        times = self.import_times("steno_summary.cli")
+        import_time = times["steno_summary"] + times["steno_summary.cli"]
+        self.assertLess(import_time, import_budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import unittest
+from pathlib import Path
+import shutil
+import tempfile
+from parameterized import parameterized
+
+from steno_summary import columnar
+from steno_summary import letters
+from steno_summary import parse_dict as parse
+from steno_summary.brief_info import Brief
+
+
+class TestColumnarDict(unittest.TestCase):
+    def setUp(self):
+        """ Build the columns from both the compiled and parsed dictionary. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        test_dir_path = Path(__file__).parent
+        self.dict_path = Path(self.tmp_dir.name) / "test_dict_tags.tsv"
+        shutil.copy(test_dir_path / "data/test_dict_tags.tsv", self.dict_path)
+        with open(self.dict_path, "a") as f:
+            f.write("Ärger\tAER/KWR\n")
+
+        self.briefs = parse.read_dict(self.dict_path)
+        self.stores = [
+            columnar.load_columnar(self.dict_path),
+            columnar.ColumnarDict.from_briefs(self.briefs),
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def names(self, store, selected):
+        return [b.name for b in store.briefs(selected)]
+
+    def test_columns(self):
+        """ The stroke columns match the parsed dictionary. """
+        for store in self.stores:
+            self.assertEqual(len(store), len(self.briefs))
+            self.assertEqual(list(store.stroke_counts), [len(b) for b in self.briefs])
+            strokes_expected = [s for b in self.briefs for s in b.strokes]
+            self.assertEqual(list(store.strokes), strokes_expected)
+
+    @parameterized.expand(
+        [("r", ["Rather"]), ("FOR", ["Forget"]), ("är", ["Ärger"]), ("x", [])]
+    )
+    def test_starting_with(self, prefix, names_expected):
+        """ Select the names starting with the prefix, ignoring case. """
+        for store in self.stores:
+            names_test = self.names(store, store.starting_with(prefix))
+            self.assertEqual(names_test, names_expected)
+
+    def test_with_tag(self):
+        """ Select the entries by their tags. """
+        for store in self.stores:
+            selected = store.with_tag("single") & ~store.with_tag("alt")
+            self.assertEqual(self.names(store, selected), ["Comp", "Rather"])
+            self.assertFalse(store.with_tag("missing").any())
+
+    def test_using_keys(self):
+        """ Select the entries by the keys used over all of their strokes. """
+        required = letters.parse_stroke("-E")
+        forbidden = letters.parse_stroke("TP")
+        for store in self.stores:
+            names_test = self.names(store, store.using_keys(required, forbidden))
+            self.assertEqual(names_test, ["Ärger"])
+
+    def test_with_stroke_keys(self):
+        """ Any one stroke of the entry may match the pattern. """
+        pattern = letters.key_pattern(uses="KWR", left="KWR")
+        for store in self.stores:
+            names_test = self.names(store, store.with_stroke_keys(*pattern))
+            self.assertEqual(names_test, ["Ärger"])
+
+    def test_stroke_count(self):
+        for store in self.stores:
+            names_test = self.names(store, store.with_stroke_count(2))
+            self.assertEqual(names_test, ["Ärger"])
+
+    def test_briefs_limit(self):
+        """ Only the first entries are built when limited. """
+        for store in self.stores:
+            ids = store.ids(store.with_stroke_count(1))
+            self.assertEqual(len(store.briefs(ids, limit=2)), 2)
+
+    def test_many_tags(self):
+        """ Tags past the first 64 are held in further columns. """
+        tags = [f"tag{n}" for n in range(70)]
+        briefs = [self.briefs[0], Brief(self.briefs[1].name, "SKWR", tags=tags)]
+        store = columnar.ColumnarDict.from_briefs(briefs)
+
+        self.assertEqual(store.tag_bits.shape, (2, 2))
+        self.assertEqual(self.names(store, store.with_tag("tag9")), [briefs[1].name])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+import unittest
+from pathlib import Path
+from typing import Tuple
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+from parameterized import parameterized
+
+from steno_summary import compiled_dict as cd
+from steno_summary import generate
+from steno_summary import parse_dict as parse
+from steno_summary.brief_info import Brief
+from steno_summary.index import BKTree, HammingIndex
+
+
+class TestCompiledDict(unittest.TestCase):
+    def setUp(self):
+        """ Copy the test dictionary so that the compiled file is kept out of the tree. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        test_dir_path = Path(__file__).parent
+        self.dict_path = Path(self.tmp_dir.name) / "test_dict_tags.tsv"
+        shutil.copy(test_dir_path / "data/test_dict_tags.tsv", self.dict_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_matches_source(self):
+        """ The compiled entries are the same as the parsed dictionary. """
+        briefs_expected = parse.read_dict(self.dict_path)
+        compiled = cd.load_compiled(self.dict_path)
+
+        self.assertEqual(len(compiled), len(briefs_expected))
+        for i, brief in enumerate(briefs_expected):
+            self.assertEqual(compiled.name(i), brief.name)
+            self.assertEqual(compiled.keys(i), brief.keys_full)
+            self.assertEqual(compiled.tags(i), list(brief.tags))
+            self.assertEqual(compiled.strokes(i), brief.strokes)
+
+    def test_compiled_location(self):
+        """ The compiled file is stored next to the source by default. """
+        cd.load_compiled(self.dict_path)
+        self.assertTrue(self.dict_path.with_suffix(".compiled").is_file())
+
+    def test_briefs(self):
+        """ Build the briefs for a selection of entries. """
+        compiled = cd.load_compiled(self.dict_path)
+        names_test = [b.name for b in compiled.briefs([0, 2])]
+        names_expected = [compiled.name(0), compiled.name(2)]
+
+        self.assertEqual(names_test, names_expected)
+
+    def test_starting_with(self):
+        """ Search the persisted prefix index. """
+        compiled = cd.load_compiled(self.dict_path)
+        names_test = [compiled.name(i) for i in compiled.starting_with("r")]
+
+        self.assertEqual(names_test, ["Rather"])
+
+    def test_containing(self):
+        """ Search the persisted trigram index. """
+        compiled = cd.load_compiled(self.dict_path)
+        names_test = [compiled.name(i) for i in compiled.containing("ORGE")]
+
+        self.assertEqual(names_test, ["Forget"])
+
+    def test_matching_tags(self):
+        """ Search the persisted tag index. """
+        compiled = cd.load_compiled(self.dict_path)
+        names_test = [compiled.name(i) for i in compiled.matching_tags("single & !alt")]
+
+        self.assertEqual(compiled.tag_index.tags, ["alt", "single"])
+        self.assertEqual(names_test, ["Comp", "Rather"])
+
+    @parameterized.expand(["TPHOE", "TPH-OE", "tphoe"])
+    def test_with_strokes(self, stroke):
+        """ Look up the entries by their stroke in steno notation. """
+        compiled = cd.load_compiled(self.dict_path)
+        names_test = [compiled.name(i) for i in compiled.with_strokes(stroke)]
+
+        self.assertEqual(names_test, ["Now"])
+
+    def test_stroke_index(self):
+        """ Search the persisted stroke index, decoding only the entries compared. """
+        with open(self.dict_path, "a") as f:
+            f.write("Known\tNOE\n")
+        compiled = cd.load_compiled(self.dict_path)
+        strokes = compiled.strokes
+        decoded = []
+        compiled.strokes = lambda i: decoded.append(i) or strokes(i)
+
+        names_test = [compiled.name(i) for i in compiled.with_strokes("TPHOE")]
+        self.assertEqual(names_test, ["Known", "Now"])
+        self.assertLess(len(decoded), len(compiled))
+
+    @parameterized.expand(
+        [
+            ({"uses": "-T"}, ["Forget"]),
+            ({"uses": "T", "excludes": "O"}, ["Test"]),
+            ({"left": "SK"}, ["Ask"]),
+            ({"left": "TPHO", "right": "E"}, ["Now"]),
+            ({"right": "-"}, ["Ask", "Comp", "Rather", "Test"]),
+        ]
+    )
+    def test_matching_keys(self, pattern, names_expected):
+        """ Find the entries with a stroke matching the key pattern. """
+        compiled = cd.load_compiled(self.dict_path)
+        names_test = [compiled.name(i) for i in compiled.matching_keys(**pattern)]
+
+        self.assertEqual(names_test, names_expected)
+
+    @parameterized.expand(
+        [("TPHOE", 0, ["Now"]), ("TPHAOE", 1, ["Now"]), ("STK", 1, ["Ask", "Test"])]
+    )
+    def test_misstrokes(self, strokes, max_distance, names_expected):
+        """ Find the entries within the number of key flips, closest first. """
+        compiled = cd.load_compiled(self.dict_path)
+        ids = compiled.misstrokes(strokes, max_distance)
+        names_test = [compiled.name(i) for i in ids]
+
+        self.assertEqual(names_test, names_expected)
+
+    @parameterized.expand(
+        [
+            ("nw", None, ["Now"]),
+            ("tset", 2, ["Test"]),
+            ("asx", 3, ["Ask", "Now", "Test"]),
+        ]
+    )
+    def test_fuzzy(self, string, max_distance, names_expected):
+        """ Find the names within the edit distance, closest first. """
+        compiled = cd.load_compiled(self.dict_path)
+        names_test = [compiled.name(i) for i in compiled.fuzzy(string, max_distance)]
+
+        self.assertEqual(names_test, names_expected)
+
+    def test_fuzzy_persisted(self):
+        """ The persisted tree gives the same matches as a tree built from the names. """
+        with open(self.dict_path, "w") as f:
+            generate.write_dict(500, f)
+        compiled = cd.load_compiled(self.dict_path)
+        tree = BKTree.from_names(list(compiled.names()))
+
+        self.assertEqual(len(compiled.fuzzy_index), len(tree))
+        for string in ["tphoe", "kon", "stakt", "abcdefgh"]:
+            for max_distance in range(4):
+                matches_test = compiled.fuzzy_index.search(string, max_distance)
+                self.assertEqual(matches_test, tree.search(string, max_distance))
+
+    def test_fuzzy_built_on_use(self):
+        """ The fuzzy index is only built when searched, once for each source. """
+        fuzzy_path = self.dict_path.with_suffix(".fuzzy.compiled")
+        compiled = cd.load_compiled(self.dict_path)
+        self.assertFalse(fuzzy_path.exists())
+
+        compiled.fuzzy("nw")
+        built = fuzzy_path.stat().st_mtime_ns
+        cd.load_compiled(self.dict_path).fuzzy("nw")
+        self.assertEqual(fuzzy_path.stat().st_mtime_ns, built)
+
+        with open(self.dict_path, "a") as f:
+            f.write("Easy\tEZ\n")
+        compiled = cd.load_compiled(self.dict_path)
+        names_test = [compiled.name(i) for i in compiled.fuzzy("eas")]
+        self.assertEqual(names_test, ["Easy"])
+
+    def test_misstrokes_persisted(self):
+        """ The persisted index gives the same matches as an index built in memory. """
+        with open(self.dict_path, "w") as f:
+            generate.write_dict(500, f)
+        compiled = cd.load_compiled(self.dict_path)
+        hamming_index = HammingIndex.from_strokes(
+            [compiled.strokes(i) for i in range(len(compiled))]
+        )
+
+        for i in range(0, 500, 50):
+            strokes = compiled.strokes(i)
+            for max_distance in (1, 2, 5):
+                for query in (strokes[:1], strokes):
+                    ids_test = compiled.hamming_index.search(query, max_distance)
+                    self.assertEqual(ids_test, hamming_index.search(query, max_distance))
+
+    def test_rebuild_on_change(self):
+        """ Changing the source rebuilds the compiled dictionary. """
+        compiled = cd.load_compiled(self.dict_path)
+        n_entries = len(compiled)
+
+        with open(self.dict_path, "a") as f:
+            f.write("Easy\tEZ\n")
+        compiled = cd.load_compiled(self.dict_path)
+
+        self.assertEqual(len(compiled), n_entries + 1)
+        self.assertIn("Easy", list(compiled.names()))
+
+    def test_touched_source(self):
+        """ Touching the source records its new time rather than recompiling. """
+        cd.load_compiled(self.dict_path)
+        mtime_ns = self.dict_path.stat().st_mtime_ns + 10 ** 9
+        os.utime(self.dict_path, ns=(mtime_ns, mtime_ns))
+
+        with patch.object(cd, "source_info", wraps=cd.source_info) as source_info:
+            compiled = cd.load_compiled(self.dict_path)
+            cd.load_compiled(self.dict_path)
+            self.assertTrue(cd._is_current(compiled, self.dict_path))
+
+        self.assertEqual(source_info.call_count, 1)
+        self.assertEqual(compiled.source.mtime_ns, mtime_ns)
+
+    def test_journal_not_compiled(self):
+        """ Entries in the journal are found without rebuilding the compiled file. """
+        cd.load_compiled(self.dict_path)
+        compiled_path = self.dict_path.with_suffix(".compiled")
+        mtime_expected = compiled_path.stat().st_mtime_ns
+
+        parse.append_to_journal(Brief("Easy", "EZ"), self.dict_path)
+        compiled = cd.load_compiled(self.dict_path)
+
+        self.assertEqual(compiled_path.stat().st_mtime_ns, mtime_expected)
+        self.assertIn("Easy", list(compiled.names()))
+
+    def compiled_with_journal(self) -> Tuple[cd.CompiledDict, cd.CompiledDict]:
+        """Add entries to the journal, giving the loaded dictionary along with a copy
+        compiled with the journal compacted into the dictionary.
+        """
+        entries = [
+            ("Test", "TEFT", ["alt"]),
+            ("Now", "TPHOU", []),
+            ("Aim", "AEUPL", ["single"]),
+            ("Tess", "TES", ["new"]),
+        ]
+        for name, keys, tags in entries:
+            parse.append_to_journal(Brief(name, keys, tags=tags), self.dict_path)
+
+        compacted_path = Path(self.tmp_dir.name) / "compacted.tsv"
+        shutil.copy(self.dict_path, compacted_path)
+        shutil.copy(
+            parse.journal_path(self.dict_path), parse.journal_path(compacted_path)
+        )
+        parse.compact_dict(compacted_path)
+        compiled = cd.load_compiled(self.dict_path)
+        return compiled, cd.load_compiled(compacted_path)
+
+    @parameterized.expand(
+        [
+            ("starting_with", ("",)),
+            ("starting_with", ("", 3)),
+            ("starting_with", ("t",)),
+            ("containing", ("es",)),
+            ("matching_tags", ("single",)),
+            ("matching_tags", ("!alt",)),
+            ("with_strokes", ("TPHOE",)),
+            ("misstrokes", ("TES", 2)),
+            ("fuzzy", ("tes", 2)),
+            ("matching_keys", ("T",)),
+        ]
+    )
+    def test_journal_queries(self, query, args):
+        """ Entries in the journal are found as if compacted into the dictionary. """
+        compiled, compacted = self.compiled_with_journal()
+        tsv_test = [compiled.tsv(i) for i in getattr(compiled, query)(*args)]
+        tsv_expected = [compacted.tsv(i) for i in getattr(compacted, query)(*args)]
+
+        self.assertEqual(len(compiled), len(compacted))
+        self.assertEqual(tsv_test, tsv_expected)
+
+    def test_journal_order(self):
+        """ The entries and tags of the journal are merged in dictionary order. """
+        compiled, compacted = self.compiled_with_journal()
+        tsv_test = [compiled.tsv(i) for i in compiled.ids()]
+        tsv_expected = [compacted.tsv(i) for i in range(len(compacted))]
+
+        self.assertEqual(tsv_test, tsv_expected)
+        self.assertEqual(compiled.tag_names(), compacted.tag_names())
+
+    def test_reuse_unchanged(self):
+        """ The compiled dictionary is not rewritten if the source is unchanged. """
+        cd.load_compiled(self.dict_path)
+        compiled_path = self.dict_path.with_suffix(".compiled")
+        mtime_expected = compiled_path.stat().st_mtime_ns
+
+        cd.load_compiled(self.dict_path)
+        self.assertEqual(compiled_path.stat().st_mtime_ns, mtime_expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import unittest
+from pathlib import Path
+import shutil
+import socket
+import tempfile
+import threading
+from unittest.mock import patch
+
+from steno_summary import daemon
+from steno_summary import parse_dict
+from steno_summary.brief_info import Brief
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        """ Serve a copy of the test dictionary from a temporary socket. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = Path(self.tmp_dir.name)
+        self.dict_path = tmp_path / "test_dict_tags.tsv"
+        shutil.copy(Path(__file__).parent / "data/test_dict_tags.tsv", self.dict_path)
+
+        self.socket_path = tmp_path / "steno.sock"
+        self.server = daemon.LookupServer(self.socket_path, self.dict_path)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp_dir.cleanup()
+
+    def query_names(self, *args):
+        """ Names of the entries returned by the daemon. """
+        lines = daemon.send_query(*args, path=self.socket_path)
+        return [l.split("\t")[0] for l in lines]
+
+    def test_queries(self):
+        """ Each of the queries is answered by the daemon. """
+        self.assertEqual(self.query_names("start", "r"), ["Rather"])
+        self.assertEqual(self.query_names("cont", "orge"), ["Forget"])
+        self.assertEqual(self.query_names("tag", "single & !alt"), ["Comp", "Rather"])
+        self.assertEqual(self.query_names("stroke", "TPH-OE"), ["Now"])
+        self.assertEqual(self.query_names("keys", "O", "", "TPO"), ["Forget"])
+        self.assertEqual(self.query_names("fuzzy", "forgte"), ["Forget"])
+        self.assertEqual(self.query_names("near", "TPHOEU"), ["Now"])
+
+    def test_start_limit(self):
+        """ The number of matches may be limited. """
+        self.assertEqual(len(self.query_names("start", "", "2")), 2)
+
+    def test_tags(self):
+        """ List the available tags. """
+        tags = daemon.send_query("tags", path=self.socket_path)
+        self.assertEqual(tags, ["alt", "single"])
+
+    def test_tsv_lines(self):
+        """ The entries are returned as lines of the dictionary. """
+        lines = daemon.send_query("start", "test", path=self.socket_path)
+        self.assertEqual(lines, ["Test\tTS\tST\tsingle,alt"])
+
+    def test_error(self):
+        """ Errors in the query are raised by the client. """
+        with self.assertRaises(ValueError):
+            daemon.send_query("unknown", path=self.socket_path)
+        with self.assertRaises(ValueError):
+            daemon.send_query("tag", "single &", path=self.socket_path)
+
+    def test_reload(self):
+        """ The dictionary is reloaded when the source changes. """
+        with open(self.dict_path, "a") as f:
+            f.write("Easy\tEZ\n")
+        self.assertEqual(self.query_names("start", "eas"), ["Easy"])
+
+    def test_reload_journal(self):
+        """ Entries added to the journal are found without recompiling. """
+        compiled_path = self.dict_path.with_suffix(".compiled")
+        mtime_expected = compiled_path.stat().st_mtime_ns
+        parse_dict.append_to_journal(Brief("Easy", "EZ"), self.dict_path)
+
+        self.assertEqual(self.query_names("start", "eas"), ["Easy"])
+        self.assertEqual(compiled_path.stat().st_mtime_ns, mtime_expected)
+
+    def test_reload_serial(self):
+        """ The reload is parsed in the daemon, which is running threads. """
+        with open(self.dict_path, "a") as f:
+            f.write("Easy\tEZ\n")
+        with patch.object(parse_dict, "parallel_threshold", 0), patch(
+            "steno_summary.compiled_dict.read_dict", wraps=parse_dict.read_dict
+        ) as read_dict:
+            self.assertEqual(self.query_names("start", "eas"), ["Easy"])
+        self.assertEqual(read_dict.call_args[0][1], 1)
+
+    def test_not_running(self):
+        """ Without a daemon the client returns None. """
+        path = Path(self.tmp_dir.name) / "missing.sock"
+        self.assertIsNone(daemon.send_query("start", "r", path=path))
+
+    def test_closed_without_response(self):
+        """ A daemon closing the connection without a response is not running. """
+        path = Path(self.tmp_dir.name) / "closing.sock"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+            listener.bind(str(path))
+            listener.listen(1)
+            closer = threading.Thread(target=lambda: listener.accept()[0].close())
+            closer.start()
+            self.assertIsNone(daemon.send_query("start", "r", path=path))
+            closer.join()
+
+    def test_no_response(self):
+        """ Once connected the client waits for the daemon rather than falling back. """
+        path = Path(self.tmp_dir.name) / "silent.sock"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+            listener.bind(str(path))
+            listener.listen(1)
+            with patch.object(daemon, "response_timeout", 0.05):
+                with self.assertRaises(TimeoutError):
+                    daemon.send_query("start", "r", path=path)
+
+    def test_reload_once(self):
+        """ Queries arriving while the dictionary is reloaded do not reload it again. """
+        from steno_summary import compiled_dict
+
+        with open(self.dict_path, "a") as f:
+            f.write("Easy\tEZ\n")
+        results = []
+
+        def query():
+            results.append(self.query_names("start", "eas"))
+
+        with patch.object(
+            compiled_dict, "load_compiled", wraps=compiled_dict.load_compiled
+        ) as load_compiled:
+            threads = [threading.Thread(target=query) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(results, [["Easy"]] * 4)
+        self.assertEqual(load_compiled.call_count, 1)
+
+    def test_already_running(self):
+        """ A second daemon may not use the same socket. """
+        with self.assertRaises(OSError):
+            daemon.LookupServer(self.socket_path, self.dict_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import io
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+
+from steno_summary import generate
+from steno_summary import parse_dict as pd
+
+
+class TestGenerate(unittest.TestCase):
+    def setUp(self):
+        self.briefs = list(generate.generate_briefs(2000))
+
+    def written(self, size: int, seed=None) -> str:
+        stream = io.StringIO()
+        generate.write_dict(size, stream, seed)
+        return stream.getvalue()
+
+    def test_size(self):
+        self.assertEqual(len(self.briefs), 2000)
+
+    def test_seeded(self):
+        """ The same dictionary is given for the same seed. """
+        self.assertEqual(self.written(100), self.written(100, generate.default_seed))
+        self.assertNotEqual(self.written(100), self.written(100, seed=1))
+
+    def test_names_unique(self):
+        names = [b.name for b in self.briefs]
+        self.assertEqual(len(set(names)), len(names))
+
+    def test_keys_unique(self):
+        """ The dictionary does not accept repeated keys, see ``append_to_journal``. """
+        keys = [b.keys_full for b in self.briefs]
+        self.assertEqual(len(set(keys)), len(keys))
+
+    @parameterized.expand(
+        [
+            ("multi_stroke", lambda b: len(b) > 1),
+            ("three_strokes", lambda b: len(b) == 3),
+            ("star", lambda b: "*" in b.keys_full),
+            ("dash", lambda b: "-" in b.keys_full),
+            ("tags", lambda b: b.tags),
+            ("no_tags", lambda b: not b.tags),
+        ]
+    )
+    def test_features(self, _, feature):
+        """ Each feature of the shorthand is found in the generated entries. """
+        self.assertTrue(any(feature(b) for b in self.briefs))
+
+    def test_strokes_not_empty(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            keys, spelling = generate.random_stroke(rng)
+            self.assertTrue(keys)
+            self.assertEqual(keys.replace("-", "").replace("*", "").lower(), spelling)
+
+    def test_read_back(self):
+        """ The written dictionary is read back in sorted order. """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dict_path = Path(tmp_dir) / "generated.tsv"
+            dict_path.write_text(self.written(500))
+            briefs = pd.read_dict(dict_path)
+
+        lines = self.written(500).splitlines(keepends=True)
+        self.assertEqual(lines[0], pd.dict_header)
+        self.assertEqual([b.tsv for b in briefs], lines[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import unittest
+import random
+from parameterized import parameterized
+
+from steno_summary import index
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def setUp(self):
+        self.names = ["-able", "Ask", "Asked", "Now", "ask", "apple", "Éclair"]
+        self.prefix_index = index.PrefixIndex.from_names(self.names)
+
+    def search_names(self, prefix, limit=None):
+        """ Names of the entries that start with the prefix. """
+        return [self.names[i] for i in self.prefix_index.search(prefix, limit)]
+
+    def test_case_insensitive(self):
+        """ The prefix matches regardless of case and keeps dictionary order. """
+        self.assertEqual(self.search_names("AS"), ["Ask", "Asked", "ask"])
+
+    def test_no_match(self):
+        """ No entries are returned for a missing prefix. """
+        self.assertEqual(self.search_names("Q"), [])
+        self.assertEqual(self.search_names("zzz"), [])
+
+    def test_empty_prefix(self):
+        """ Every entry starts with the empty string. """
+        self.assertEqual(self.search_names(""), self.names)
+
+    def test_limit(self):
+        """ Only return the requested number of matches. """
+        self.assertEqual(len(self.search_names("a", limit=2)), 2)
+        self.assertEqual(len(self.search_names("a", limit=10)), 4)
+
+    def test_unicode(self):
+        """ Non ascii names are folded. """
+        self.assertEqual(self.search_names("éc"), ["Éclair"])
+
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.names = ["Department", "Apartment", "part", "Party", "Now", "Straße"]
+        self.trigram_index = index.TrigramIndex.from_names(self.names)
+
+    def search_names(self, string):
+        """ Names of the entries that contain the string. """
+        return [self.names[i] for i in self.trigram_index.search(string)]
+
+    def test_contains(self):
+        """ Find the names containing the string regardless of case. """
+        self.assertEqual(self.search_names("PART"), self.names[:4])
+        self.assertEqual(self.search_names("artme"), ["Department", "Apartment"])
+
+    def test_verify_candidates(self):
+        """ Names containing all of the trigrams, but not the string, are removed. """
+        names = ["abcxbcd", "abcd"]
+        trigram_index = index.TrigramIndex.from_names(names)
+        self.assertEqual(trigram_index.search("abcd"), [1])
+
+    def test_no_match(self):
+        """ Missing trigrams give no results. """
+        self.assertEqual(self.search_names("partz"), [])
+
+    def test_short_string(self):
+        """ Strings shorter than a trigram are still matched. """
+        self.assertEqual(self.search_names("ow"), ["Now"])
+        self.assertEqual(self.search_names(""), self.names)
+
+    def test_folded(self):
+        """ Names are matched after case folding. """
+        self.assertEqual(self.search_names("STRASS"), ["Straße"])
+
+
+class TestTagIndex(unittest.TestCase):
+    def setUp(self):
+        self.entry_tags = [
+            ["suffix"],
+            ["suffix", "punctuation"],
+            [],
+            ["punctuation"],
+            ["single", "suffix"],
+        ]
+        self.tag_index = index.TagIndex.from_tags(self.entry_tags)
+
+    def test_tags(self):
+        """ The available tags are listed in order. """
+        self.assertEqual(self.tag_index.tags, ["punctuation", "single", "suffix"])
+
+    @parameterized.expand(
+        [
+            ("suffix", [0, 1, 4]),
+            ("missing", []),
+            ("suffix & punctuation", [1]),
+            ("suffix | punctuation", [0, 1, 3, 4]),
+            ("suffix & !punctuation", [0, 4]),
+            ("!suffix", [2, 3]),
+            ("!suffix & !punctuation", [2]),
+            ("!suffix | punctuation", [1, 2, 3]),
+            ("!(suffix | punctuation)", [2]),
+            ("!!single", [4]),
+            ("(single | punctuation) & suffix", [1, 4]),
+        ]
+    )
+    def test_expression(self, expression, ids_expected):
+        """ Evaluate boolean tag expressions. """
+        self.assertEqual(self.tag_index.search(expression), ids_expected)
+
+    @parameterized.expand(["suffix &", "(suffix", "suffix)", "& suffix", ""])
+    def test_invalid_expression(self, expression):
+        """ Raise an error for malformed expressions. """
+        with self.assertRaises(ValueError):
+            self.tag_index.search(expression)
+
+
+class TestStrokeIndex(unittest.TestCase):
+    def setUp(self):
+        self.entry_strokes = [(1,), (2, 4), (1,), (2,)]
+        self.stroke_index = index.StrokeIndex.from_strokes(self.entry_strokes)
+
+    def test_single_stroke(self):
+        """ Find every entry with the stroke. """
+        self.assertEqual(self.stroke_index.search((1,)), [0, 2])
+
+    def test_multiple_strokes(self):
+        """ Multiple stroke entries only match the full sequence. """
+        self.assertEqual(self.stroke_index.search((2, 4)), [1])
+        self.assertEqual(self.stroke_index.search((2,)), [3])
+        self.assertEqual(self.stroke_index.search((4,)), [])
+
+
+class TestHammingIndex(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.entry_strokes = [
+            tuple(random.getrandbits(23) for _ in range(random.choice([1, 1, 2])))
+            for _ in range(500)
+        ]
+        self.hamming_index = index.HammingIndex.from_strokes(self.entry_strokes)
+
+    def scan(self, stroke, max_distance):
+        """ Ids of the entries with a stroke within the distance, from a full scan. """
+        distances = {}
+        for i, strokes in enumerate(self.entry_strokes):
+            distance = min(bin(s ^ stroke).count("1") for s in strokes)
+            if distance <= max_distance:
+                distances[i] = distance
+        return sorted(distances, key=lambda i: (distances[i], i))
+
+    @parameterized.expand([(0,), (1,), (2,), (3,), (4,), (6,)])
+    def test_matches_scan(self, max_distance):
+        """ The index finds every entry a scan of the strokes would. """
+        for i in range(0, 500, 50):
+            stroke = self.entry_strokes[i][-1] ^ 0b100100
+            ids_test = self.hamming_index.search((stroke,), max_distance)
+            self.assertEqual(ids_test, self.scan(stroke, max_distance))
+
+    def test_multiple_strokes(self):
+        """ The flips are summed over the strokes of the same length entries. """
+        i = next(i for i, s in enumerate(self.entry_strokes) if len(s) == 2)
+        first, second = self.entry_strokes[i]
+        strokes = (first ^ 1, second ^ 2)
+
+        self.assertNotIn(i, self.hamming_index.search(strokes, 1))
+        self.assertIn(i, self.hamming_index.search(strokes, 2))
+        self.assertEqual(self.hamming_index.search((first, second, 0), 2), [])
+
+
+class TestLevenshtein(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ("", "", 0),
+            ("", "abc", 3),
+            ("kitten", "sitting", 3),
+            ("flaw", "lawn", 2),
+            ("abc", "abc", 0),
+            ("éclair", "eclair", 1),
+            ("a" * 70, "b" + "a" * 70, 1),
+        ]
+    )
+    def test_distance(self, a, b, distance_expected):
+        self.assertEqual(index.levenshtein(a, b), distance_expected)
+        self.assertEqual(index.levenshtein(b, a), distance_expected)
+
+    def test_matches_table(self):
+        """ The bit-parallel distance matches the full table of edits. """
+        random.seed(0)
+        for _ in range(500):
+            a = "".join(random.choices("abc", k=random.randint(0, 8)))
+            b = "".join(random.choices("abc", k=random.randint(0, 8)))
+            self.assertEqual(index.levenshtein(a, b), _table_distance(a, b))
+
+
+def _table_distance(a: str, b: str) -> int:
+    """ Edit distance from the full table. """
+    table = [[i + j for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            table[i][j] = min(
+                table[i - 1][j] + 1,
+                table[i][j - 1] + 1,
+                table[i - 1][j - 1] + (a[i - 1] != b[j - 1]),
+            )
+    return table[-1][-1]
+
+
+class TestBKTree(unittest.TestCase):
+    def setUp(self):
+        self.names = ["Now", "Know", "Technology", "Ask", "ask", "Asked", "Task"]
+        self.tree = index.BKTree.from_names(self.names)
+
+    def search_names(self, string, max_distance):
+        """ Names within the distance of the string. """
+        return [self.names[i] for _, i in self.tree.search(string, max_distance)]
+
+    def test_exact(self):
+        """ Names are matched after case folding. """
+        self.assertEqual(self.search_names("ASK", 0), ["Ask", "ask"])
+
+    def test_closest_first(self):
+        """ Matches are ordered by their distance. """
+        self.assertEqual(self.search_names("ask", 1), ["Ask", "ask", "Task"])
+        self.assertEqual(self.search_names("tecnolgy", 2), ["Technology"])
+
+    def test_matches_scan(self):
+        """ The tree finds every name a scan of the names would. """
+        for string in ["now", "nw", "asks", "tech", "technical", ""]:
+            for max_distance in range(4):
+                matches_expected = sorted(
+                    (index.levenshtein(index.fold(n), string), i)
+                    for i, n in enumerate(self.names)
+                    if index.levenshtein(index.fold(n), string) <= max_distance
+                )
+                matches_test = self.tree.search(string, max_distance)
+                self.assertEqual(matches_test, matches_expected)
+
+    def test_unique_nodes(self):
+        """ Names that fold to the same string share a node. """
+        self.assertEqual(len(self.tree), len(self.names) - 1)
+
+    def test_empty(self):
+        self.assertEqual(index.BKTree.from_names([]).search("now", 2), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
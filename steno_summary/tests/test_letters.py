@@ -100,3 +100,95 @@ class TestSplitCapitalLetters(unittest.TestCase):
         """ Test that we split mixed strings with splits correctly. """
         split_test = l.split_on_capital(test_string)
         self.assertEqual(split_test, split_expected)
+
+
+class TestLetterMasks(unittest.TestCase):
+    """ Test the compiled bit masks for each letter. """
+
+    def test_left_mask(self):
+        """ Left hand keys are mapped to their bits in steno order. """
+        mask_expected = l.left_key_masks["T"] | l.left_key_masks["P"]
+        self.assertEqual(l.f.left_mask, mask_expected)
+        self.assertEqual(l.f.right_mask, l.right_key_masks["F"])
+
+    def test_starred_mask(self):
+        """ The star is recorded separately from the key mask. """
+        self.assertEqual(l.v.right_mask, l.right_key_masks["F"])
+        self.assertTrue(l.v.right_starred)
+        self.assertFalse(l.v.left_starred)
+
+    @parameterized.expand(
+        [
+            ({"left": "TPH", "right": "E"}, "TPHE"),
+            ({"right": "S"}, "-S"),
+            ({"left": "S", "right": "T"}, "S-T"),
+            ({"left": "HR", "right": "T"}, "HRT"),
+        ]
+    )
+    def test_stroke_to_string(self, keys, string_expected):
+        """ Write the masks in steno order with a dash where ambiguous. """
+        left = l.keys_to_mask(keys.get("left", ""), l.left_key_masks)
+        right = l.keys_to_mask(keys.get("right", ""), l.right_key_masks)
+        string_test = l.stroke_to_string(left | right)
+        self.assertEqual(string_test, string_expected)
+
+    def test_stroke_to_string_star(self):
+        """ The star replaces the dash. """
+        mask = l.left_key_masks["S"] | l.star_mask | l.right_key_masks["T"]
+        self.assertEqual(l.stroke_to_string(mask), "S*T")
+
+
+class TestParseStroke(unittest.TestCase):
+    """ Test reading strokes given in steno notation. """
+
+    @parameterized.expand(["TPHOE", "TPH-OE", "TPHO-E", "tphoe"])
+    def test_equivalent_notation(self, stroke):
+        """ The position of the dash is flexible around the vowels. """
+        mask_expected = l.keys_to_mask("TPHO", l.left_key_masks)
+        mask_expected |= l.right_key_masks["E"]
+        self.assertEqual(l.parse_stroke(stroke), mask_expected)
+
+    @parameterized.expand(
+        [
+            ("-S", {"right": "S"}),
+            ("S-S", {"left": "S", "right": "S"}),
+            ("SS", {"left": "S", "right": "S"}),
+            ("RPG", {"left": "R", "right": "PG"}),
+            ("-RPG", {"right": "RPG"}),
+            ("A*L", {"left": "A", "right": "L"}),
+        ]
+    )
+    def test_ambiguous_keys(self, stroke, keys):
+        """ Keys found on both hands are placed on the left until we move side. """
+        mask_expected = l.keys_to_mask(keys.get("left", ""), l.left_key_masks)
+        mask_expected |= l.keys_to_mask(keys.get("right", ""), l.right_key_masks)
+        if "*" in stroke:
+            mask_expected |= l.star_mask
+        self.assertEqual(l.parse_stroke(stroke), mask_expected)
+
+    def test_numbers(self):
+        """ Numbers are given by the number bar and the matching key. """
+        mask_expected = l.number_mask | l.left_key_masks["S"] | l.right_key_masks["L"]
+        self.assertEqual(l.parse_stroke("1-8"), mask_expected)
+        self.assertEqual(l.parse_stroke("#S-L"), mask_expected)
+
+    @parameterized.expand(["TPQ", "ZS", "-", "", "GS-T"])
+    def test_invalid(self, stroke):
+        """ Raise an error for keys that are out of steno order or missing. """
+        with self.assertRaises(ValueError):
+            l.parse_stroke(stroke)
+
+    def test_multiple_strokes(self):
+        """ Strokes are separated by a slash. """
+        strokes_test = l.parse_strokes("TPHO/E")
+        strokes_expected = (l.parse_stroke("TPHO"), l.parse_stroke("-E"))
+        self.assertEqual(strokes_test, strokes_expected)
+
+    @parameterized.expand(
+        ["TPHOE", "-PBTD", "P-BT", "S-S", "-S", "A*L", "*", "#S-L", "STKPWHRAO*EUFRZ"]
+    )
+    def test_steno_round_trip(self, stroke):
+        """ Strokes written in steno notation are read back to the same keys. """
+        mask = l.parse_stroke(stroke)
+        self.assertEqual(l.stroke_to_steno(mask), stroke)
+        self.assertEqual(l.parse_stroke(l.stroke_to_steno(mask)), mask)
@@ -2,7 +2,13 @@
 import unittest
 from pathlib import Path
 
+import shutil
 import tempfile
+from multiprocessing import Pool
+from unittest.mock import patch
+from parameterized import parameterized
+
+from steno_summary import generate
 from steno_summary import parse_dict as parse
 from steno_summary.brief_info import Brief
 
@@ -102,6 +108,185 @@ class TestWriteDict(unittest.TestCase):
         self.assertEqual(names_test, names_expected)
 
 
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        """ Copy the test dictionary so that the journal is kept out of the tree. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        test_dir_path = Path(__file__).parent
+        self.dict_path = Path(self.tmp_dir.name) / "test_dict.tsv"
+        shutil.copy(test_dir_path / "data/test_dict.tsv", self.dict_path)
+        self.journal_path = parse.journal_path(self.dict_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_journal(self):
+        """ Entries in the journal are merged with the dictionary when read. """
+        parse.append_to_journal(Brief("Easy", "EZ"), self.dict_path)
+
+        names_test = [b.name for b in parse.read_dict(self.dict_path)]
+        self.assertEqual(names_test, ["Ask", "Easy", "Forget", "Now"])
+
+    def test_dictionary_unchanged(self):
+        """ Adding an entry only writes to the journal. """
+        source = self.dict_path.read_text()
+        parse.append_to_journal(Brief("Easy", "EZ"), self.dict_path)
+
+        self.assertEqual(self.dict_path.read_text(), source)
+        self.assertEqual(self.journal_path.read_text(), "Easy\tEZ\tEZ\t\n")
+
+    def test_conflict(self):
+        """ Keys already in the dictionary or the journal are rejected. """
+        parse.append_to_journal(Brief("Easy", "EZ"), self.dict_path)
+        with self.assertRaises(ValueError):
+            parse.append_to_journal(Brief("Now", "NOE"), self.dict_path)
+        with self.assertRaises(ValueError):
+            parse.append_to_journal(Brief("Easy", "EZ"), self.dict_path)
+
+    def test_compact(self):
+        """ Compacting sorts the journal into the dictionary. """
+        parse.append_to_journal(Brief("Easy", "EZ"), self.dict_path)
+        parse.compact_dict(self.dict_path)
+
+        self.assertEqual(self.journal_path.read_text(), "")
+        with open(self.dict_path) as f:
+            names_test = [l.split("\t")[0] for l in f if parse.is_valid(l)]
+        self.assertEqual(names_test, ["Ask", "Easy", "Forget", "Now"])
+
+    def test_compact_threshold(self):
+        """ The journal is compacted once it reaches the threshold. """
+        keys = ["EZ", "BAK", "DOG", "TOE"]
+        with patch.object(parse, "compact_threshold", len(keys)):
+            for n, k in enumerate(keys):
+                parse.append_to_journal(Brief(f"Word {n}", k), self.dict_path)
+
+        self.assertEqual(self.journal_path.read_text(), "")
+        self.assertEqual(len(parse.read_dict(self.dict_path)), 3 + len(keys))
+
+    def test_concurrent_add(self):
+        """ Entries added by several processes at once are all kept. """
+        keys = ["EZ", "BAK", "DOG", "TOE", "KAT", "RAT", "HAT", "PAT"]
+        args = [(self.dict_path, f"Word {n}", k) for n, k in enumerate(keys)]
+        with Pool(4) as pool:
+            pool.starmap(_append, args)
+
+        self.assertEqual(len(parse.read_dict(self.dict_path)), 3 + len(keys))
+
+
+class TestAddBatch(unittest.TestCase):
+    def setUp(self):
+        """ Copy the test dictionary so that it may be changed. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        test_dir_path = Path(__file__).parent
+        self.dict_path = Path(self.tmp_dir.name) / "test_dict.tsv"
+        shutil.copy(test_dir_path / "data/test_dict.tsv", self.dict_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_add_batch(self):
+        """ The rows are merged into the sorted dictionary. """
+        rows = ["Zoo\tSAO\tanimal,place\n", "# Comment\n", "\n", "Easy\tEZ\n"]
+        report = parse.add_batch(rows, self.dict_path)
+
+        briefs = parse.read_dict(self.dict_path)
+        self.assertEqual(report, parse.BatchReport(2, []))
+        names_test = [b.name for b in briefs]
+        self.assertEqual(names_test, ["Ask", "Easy", "Forget", "Now", "Zoo"])
+        self.assertEqual(briefs[-1].tags, ("animal", "place"))
+
+    def test_file_sorted(self):
+        """ The lines of the dictionary are written in order of their names. """
+        parse.add_batch(["Easy\tEZ\n", "Bake\tBAK"], self.dict_path)
+        lines = self.dict_path.read_text().splitlines()
+
+        self.assertEqual(lines[0], parse.dict_header.rstrip("\n"))
+        names_test = [l.split("\t")[0] for l in lines[1:]]
+        self.assertEqual(names_test, ["Ask", "Bake", "Easy", "Forget", "Now"])
+
+    def test_duplicates(self):
+        """ Rows with keys already in the dictionary, or the batch, are skipped. """
+        rows = ["Now\tNOE\n", "Easy\tEZ\n", "Easier\tEZ\n", "Bad\tQQ\n", "Name\n"]
+        report = parse.add_batch(rows, self.dict_path)
+
+        skipped_rows = [row for row, _ in report.skipped]
+        self.assertEqual(report.added, 1)
+        self.assertEqual(skipped_rows, ["Now\tNOE", "Easier\tEZ", "Bad\tQQ", "Name"])
+
+    def test_journal_merged(self):
+        """ Entries in the journal are written to the dictionary along with the batch. """
+        parse.append_to_journal(Brief("Bake", "BAK"), self.dict_path)
+        parse.add_batch(["Easy\tEZ\n"], self.dict_path)
+
+        self.assertEqual(parse.journal_path(self.dict_path).read_text(), "")
+        names_test = [b.name for b in parse.read_dict(self.dict_path)]
+        self.assertEqual(names_test, ["Ask", "Bake", "Easy", "Forget", "Now"])
+
+
+class TestParallelRead(unittest.TestCase):
+    def setUp(self):
+        """ Write a generated dictionary, with an entry in the journal. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dict_path = Path(self.tmp_dir.name) / "generated.tsv"
+        with open(self.dict_path, "w") as f:
+            generate.write_dict(1000, f)
+        parse.append_to_journal(Brief("Bake", "BAK/-D"), self.dict_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def entries(self, briefs):
+        return [(b.name, b.keys, b.keys_full, b.tags, b.strokes) for b in briefs]
+
+    def test_same_as_serial(self):
+        """ The entries are read in the same order as when parsed serially. """
+        briefs_serial = parse.read_dict(self.dict_path, processes=1)
+        briefs_parallel = parse.read_dict(self.dict_path, processes=2)
+
+        self.assertEqual(len(briefs_parallel), 1001)
+        self.assertEqual(self.entries(briefs_parallel), self.entries(briefs_serial))
+        cannonical = [b.cannonical for b in briefs_parallel]
+        self.assertEqual(cannonical, [b.cannonical for b in briefs_serial])
+
+    def test_repeated_names(self):
+        """ Entries with the same name are kept in file order, then journal order. """
+        # The journal already holds "Bake", from ``setUp``
+        keys = [b.keys_full for b in generate.generate_briefs(200, seed=1)]
+        with open(self.dict_path, "w") as f:
+            f.write(parse.dict_header)
+            f.writelines(f"Same\t{k}\t\t\n" for k in keys[:-1])
+        parse.append_to_journal(Brief("Same", keys[-1]), self.dict_path)
+
+        for processes in (1, 2):
+            briefs = parse.read_dict(self.dict_path, processes=processes)
+            self.assertEqual([b.keys_full for b in briefs], ["BAK/-D"] + keys)
+
+    @parameterized.expand([(1,), (3,), (16,), (5000,)])
+    def test_chunk_ranges(self, n_chunks):
+        """ The ranges cover the file and each starts a line. """
+        data = self.dict_path.read_bytes()
+        ranges = parse._chunk_ranges(self.dict_path, n_chunks)
+
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        self.assertLessEqual(len(ranges), n_chunks)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[start - 1 : start], b"\n")
+
+    def test_parse_fail(self):
+        """ Errors in the workers are raised. """
+        with open(self.dict_path, "a") as f:
+            f.write("Bad\tQQ\n")
+        with self.assertRaises(ValueError):
+            parse.read_dict(self.dict_path, processes=2)
+
+
+def _append(dict_path, name, keys):
+    """ Append an entry from a worker process. """
+    parse.append_to_journal(Brief(name, keys), dict_path)
+
+
 class TestSaveDict(unittest.TestCase):
     @unittest.skip
     def test_save_dict(self):
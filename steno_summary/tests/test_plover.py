@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+import unittest
+from pathlib import Path
+import io
+import json
+import shutil
+import tempfile
+
+from parameterized import parameterized
+from steno_summary import letters
+from steno_summary import parse_dict as parse
+from steno_summary import plover
+from steno_summary.brief_info import Brief
+
+data_path = Path(__file__).parent / "data"
+
+
+class TestReadPlover(unittest.TestCase):
+    """ Streaming the entries of Plover dictionaries. """
+
+    @parameterized.expand([(1,), (7,), (1 << 16,)])
+    def test_json(self, chunk_size):
+        """ The streamed pairs match those of the full JSON parser. """
+        json_path = data_path / "plover_dict.json"
+        with open(json_path) as f:
+            pairs_expected = list(json.load(f).items())
+        with open(json_path) as f:
+            pairs_test = list(plover.iter_json(f, chunk_size))
+
+        self.assertEqual(pairs_test, pairs_expected)
+
+    def test_json_empty(self):
+        """ An empty dictionary gives no entries. """
+        self.assertEqual(list(plover.iter_json(io.StringIO(" { } "))), [])
+
+    @parameterized.expand(['{"A": "a" "B": "b"}', '{"A": "a', '["A"]', '{"A": 1}'])
+    def test_json_invalid(self, text):
+        """ Malformed files raise an error. """
+        with self.assertRaises(ValueError):
+            list(plover.iter_json(io.StringIO(text), 2))
+
+    def test_rtf(self):
+        """ Read the entries of a RTF/CRE dictionary. """
+        with open(data_path / "plover_dict.rtf") as f:
+            pairs_test = list(plover.iter_rtf(f))
+        pairs_expected = [("TPHOE", "now"), ("KR-L", "curl {brace}"), ("QZ", "bad")]
+
+        self.assertEqual(pairs_test, pairs_expected)
+
+
+class TestValidateEntry(unittest.TestCase):
+    @parameterized.expand(
+        ["TPHOE", "A*EU", "-PBG", "*", "SKWR-PBLG", "STKPWHRAO*EUFRPBLGTSDZ"]
+    )
+    def test_keys_give_stroke(self, stroke):
+        """ The keys written for the stroke are parsed back to the same stroke. """
+        keys, _ = plover.validate_entry(stroke, "word")
+        self.assertEqual(Brief("word", keys).stroke, letters.parse_stroke(stroke))
+
+    def test_multiple_strokes(self):
+        """ Each stroke is written separately. """
+        keys, cannonical = plover.validate_entry("TPHO/E", "word")
+        self.assertEqual(keys, "TPHO/-E")
+        self.assertEqual(Brief("word", keys).strokes, letters.parse_strokes("TPHO/E"))
+
+    @parameterized.expand(
+        [
+            ("QZ", "word"),
+            ("1-9", "nineteen"),
+            ("TPHOE", ""),
+            ("TPHOE", "a\tb"),
+            ("SPAEUS", " "),
+            ("TPHOE", "word "),
+            ("HAERB", "#hash"),
+        ]
+    )
+    def test_invalid(self, stroke, translation):
+        """ Entries that cannot be stored raise an error. """
+        with self.assertRaises(ValueError):
+            plover.validate_entry(stroke, translation)
+
+
+class TestImportDict(unittest.TestCase):
+    def setUp(self):
+        """ Import into a copy of the test dictionary. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dict_path = Path(self.tmp_dir.name) / "test_dict.tsv"
+        shutil.copy(data_path / "test_dict.tsv", self.dict_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_import_json(self):
+        """ Valid entries are added and the rest are reported. """
+        report = plover.import_dict(data_path / "plover_dict.json", self.dict_path)
+
+        names_test = [b.name for b in parse.read_dict(self.dict_path)]
+        self.assertEqual(report.imported, 5)
+        self.assertEqual(len(names_test), 3 + 5)
+        self.assertIn("judge", names_test)
+        self.assertEqual({b.stroke for b in report.bad}, {"1-9", "XX", "STK"})
+
+    def test_import_rtf_tags(self):
+        """ Imported entries are given the tags. """
+        source = data_path / "plover_dict.rtf"
+        plover.import_dict(source, self.dict_path, tags=["plover"])
+
+        briefs = parse.read_dict(self.dict_path)
+        names_test = [b.name for b in briefs if "plover" in b.tags]
+        self.assertEqual(names_test, ["curl {brace}", "now"])
+
+    def test_import_twice(self):
+        """ Entries already in the dictionary are reported. """
+        source = data_path / "plover_dict.rtf"
+        plover.import_dict(source, self.dict_path)
+        report = plover.import_dict(source, self.dict_path)
+
+        self.assertEqual(report.imported, 0)
+        self.assertEqual(len(report.bad), 3)
+
+    def test_import_unstorable(self):
+        """ Translations that would be read back differently are reported. """
+        source = Path(self.tmp_dir.name) / "plover.json"
+        source.write_text(json.dumps({"SPAEUS": " ", "HAERB": "#hash", "TPHO": "no"}))
+        report = plover.import_dict(source, self.dict_path)
+
+        names_test = [b.name for b in parse.read_dict(self.dict_path)]
+        self.assertEqual(report.imported, 1)
+        self.assertEqual(len(names_test), 3 + 1)
+        self.assertEqual({b.stroke for b in report.bad}, {"SPAEUS", "HAERB"})
+
+    def test_unknown_format(self):
+        """ Only JSON and RTF dictionaries may be imported. """
+        with self.assertRaises(ValueError):
+            plover.import_dict(self.dict_path, self.dict_path)
+
+
+class TestExportDict(unittest.TestCase):
+    def setUp(self):
+        """ Export a copy of the test dictionary. """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dict_path = Path(self.tmp_dir.name) / "test_dict.tsv"
+        self.output = Path(self.tmp_dir.name) / "export.json"
+        shutil.copy(data_path / "test_dict.tsv", self.dict_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def exported(self):
+        """ The entries of the export, as read by Plover. """
+        with open(self.output) as f:
+            return json.load(f)
+
+    def test_export(self):
+        """ Each entry is written with its stroke in steno notation. """
+        report = plover.export_dict(self.output, self.dict_path)
+
+        exported_expected = {"TPHOE": "Now", "TPORGT": "Forget", "SK": "Ask"}
+        self.assertEqual(report, plover.ExportReport(3, "rewritten"))
+        self.assertEqual(self.exported(), exported_expected)
+
+    def test_repeated_stroke(self):
+        """ Only the first entry with a stroke is exported. """
+        parse.append_to_journal(Brief("Zzz", "TPHOE"), self.dict_path)
+        plover.export_dict(self.output, self.dict_path)
+
+        self.assertEqual(self.exported()["TPHOE"], "Now")
+
+    def test_incremental_unchanged(self):
+        """ Nothing is written if the dictionary has not changed. """
+        plover.export_dict(self.output, self.dict_path, incremental=True)
+        report = plover.export_dict(self.output, self.dict_path, incremental=True)
+
+        self.assertEqual(report, plover.ExportReport(0, "unchanged"))
+
+    def test_incremental_append(self):
+        """ Added entries are appended to the previous export. """
+        plover.export_dict(self.output, self.dict_path, incremental=True)
+        exported_before = self.exported()
+        parse.append_to_journal(Brief("Easy", "EZ"), self.dict_path)
+        report = plover.export_dict(self.output, self.dict_path, incremental=True)
+
+        exported_expected = dict(exported_before, EZ="Easy")
+        self.assertEqual(report, plover.ExportReport(1, "appended"))
+        self.assertEqual(self.exported(), exported_expected)
+
+    def test_incremental_rewrite(self):
+        """ The export is rewritten if an entry is removed. """
+        plover.export_dict(self.output, self.dict_path, incremental=True)
+        briefs = parse.read_dict(self.dict_path)
+        parse.save_dict_to_file(briefs[1:], self.dict_path)
+        report = plover.export_dict(self.output, self.dict_path, incremental=True)
+
+        self.assertEqual(report.mode, "rewritten")
+        self.assertNotIn(briefs[0].name, self.exported().values())
+
+    def test_incremental_edited_output(self):
+        """ The export is rewritten if it has been changed since it was written. """
+        plover.export_dict(self.output, self.dict_path, incremental=True)
+        self.output.write_text("{}")
+        report = plover.export_dict(self.output, self.dict_path, incremental=True)
+
+        self.assertEqual(report.mode, "rewritten")
+        self.assertEqual(len(self.exported()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+from steno_summary import profiling
+from steno_summary.profiling import stage
+
+
+class TestOptions(unittest.TestCase):
+    @parameterized.expand(
+        [
+            (["cont", "-s", "ent"], {}, ["cont", "-s", "ent"], None),
+            (["cont", "--profile", "-s", "ent"], {}, ["cont", "-s", "ent"], ""),
+            (["all", "--profile=out.json"], {}, ["all"], "out.json"),
+            (["all"], {"STENO_PROFILE": "out.prof"}, ["all"], "out.prof"),
+            (["all"], {"STENO_PROFILE": ""}, ["all"], None),
+            (["all", "--profile"], {"STENO_PROFILE": "out.json"}, ["all"], ""),
+        ]
+    )
+    def test_options(self, argv, env, argv_expected, destination_expected):
+        """ The option is removed from the arguments, and overrides the environment. """
+        with patch.dict("os.environ", env, clear=True):
+            argv, destination = profiling.options(argv)
+        self.assertEqual(argv, argv_expected)
+        self.assertEqual(destination, destination_expected)
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_stages(self):
+        self.kept = []
+        with stage("load"):
+            for _ in range(3):
+                with stage("parse"):
+                    self.kept.extend(str(i) for i in range(1000, 1100))
+        with stage("render"):
+            pass
+
+    def test_disabled(self):
+        with profiling.session(["all"], None) as profile:
+            self.run_stages()
+        self.assertIsNone(profile)
+
+    def test_summary(self):
+        """ Nested stages are named by their path, in the order they were entered. """
+        stream = io.StringIO()
+        with patch.dict(profiling._stats_sources, clear=True):
+            with profiling.session(["all"], "", stream) as profile:
+                self.run_stages()
+
+        self.assertEqual(list(profile.stats), ["load", "load/parse", "render"])
+        self.assertEqual(profile.stats["load/parse"].calls, 3)
+        self.assertGreater(profile.stats["load/parse"].heap_growth, 0)
+        self.assertGreaterEqual(profile.seconds, profile.stats["load"].seconds)
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[2].startswith("load/parse"))
+        self.assertTrue(lines[-1].startswith("total"))
+
+    def test_extra_stats(self):
+        """ Stats given by other modules are reported with the stages. """
+        stream = io.StringIO()
+        with patch.dict(profiling._stats_sources, clear=True):
+            profiling.add_stats("cache", lambda: {"hits": 3, "hit_rate": 0.75})
+            with profiling.session(["all"], "", stream) as profile:
+                self.run_stages()
+
+        self.assertEqual(profile.extra, {"cache": {"hits": 3, "hit_rate": 0.75}})
+        self.assertEqual(stream.getvalue().splitlines()[-1], "cache hits=3 hit_rate=0.75")
+
+    def test_nested_session(self):
+        """ Only the outer session is reported. """
+        stream = io.StringIO()
+        with profiling.session(["all"], "", stream):
+            with profiling.session(["all"], "", stream) as inner:
+                self.run_stages()
+        self.assertIsNone(inner)
+        self.assertEqual(stream.getvalue().count("total"), 1)
+
+    def test_json(self):
+        """ The results of each run are appended as a line of JSON. """
+        destination = str(Path(self.tmp_dir.name) / "profile.json")
+        for _ in range(2):
+            with profiling.session(["all"], destination):
+                self.run_stages()
+
+        with open(destination) as f:
+            results = [json.loads(l) for l in f]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["command"], ["all"])
+        stages = [s["name"] for s in results[0]["stages"]]
+        self.assertEqual(stages, ["load", "load/parse", "render"])
+
+    def test_cprofile(self):
+        """ The cProfile stats are dumped along with the summary. """
+        import pstats
+
+        destination = str(Path(self.tmp_dir.name) / "profile.prof")
+        stream = io.StringIO()
+        with profiling.session(["all"], destination, stream):
+            self.run_stages()
+
+        stats = pstats.Stats(destination)
+        functions = {f[2] for f in stats.stats}
+        self.assertIn("run_stages", functions)
+        self.assertIn("total", stream.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()